@@ -0,0 +1,198 @@
+# src/analysis/bootstrap.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from src.analysis.instrumentation import instrumented
+from src.analysis.summarize_performance import align_strategy_returns
+
+# Statistics with bootstrap confidence intervals
+BOOTSTRAP_METRICS = ("Sharpe_Ratio_Arithmetic", "Alpha_Arithmetic")
+
+BOOTSTRAP_METHODS = ("stationary", "block")
+
+# Per-process state set up once by _init_worker
+_WORKER_STATE = {}
+
+
+def stationary_bootstrap_indices(n_periods, n_draws, mean_block_length, rng):
+    """
+    Draws resampled month indices with the stationary bootstrap of Politis and Romano (1994).
+
+    Blocks start at uniformly drawn months and have geometrically distributed lengths with
+    mean mean_block_length, wrapping around the end of the sample. All draws are built at
+    once as one matrix.
+
+    Parameters:
+    - n_periods (int): Months in the sample.
+    - n_draws (int): Bootstrap replications.
+    - mean_block_length (float): Expected block length in months (1 gives the iid bootstrap).
+    - rng (np.random.Generator): Random number generator.
+
+    Returns:
+    - np.ndarray: n_draws x n_periods month indices.
+    """
+    positions = np.arange(n_periods)
+    starts = rng.integers(0, n_periods, size=(n_draws, n_periods))
+    new_block = rng.random((n_draws, n_periods)) < 1.0 / mean_block_length
+    new_block[:, 0] = True
+    # Position at which the block covering each month started
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    first_month = np.take_along_axis(starts, block_start, axis=1)
+    return (first_month + positions - block_start) % n_periods
+
+
+def block_bootstrap_indices(n_periods, n_draws, block_length, rng):
+    """
+    Draws resampled month indices with the circular moving block bootstrap.
+
+    Parameters:
+    - n_periods (int): Months in the sample.
+    - n_draws (int): Bootstrap replications.
+    - block_length (int): Months per block.
+    - rng (np.random.Generator): Random number generator.
+
+    Returns:
+    - np.ndarray: n_draws x n_periods month indices.
+    """
+    block_length = int(block_length)
+    n_blocks = -(-n_periods // block_length)
+    starts = rng.integers(0, n_periods, size=(n_draws, n_blocks))
+    offsets = np.tile(np.arange(block_length), n_blocks)[:n_periods]
+    return (np.repeat(starts, block_length, axis=1)[:, :n_periods] + offsets) % n_periods
+
+
+def resampled_statistics(xs, factors, indices, annualization_factor, metrics=BOOTSTRAP_METRICS):
+    """
+    Computes Sharpe ratios and alphas of every strategy on every resampled history at once.
+
+    Parameters:
+    - xs (np.ndarray): months x strategies excess returns.
+    - factors (np.ndarray): months x factors factor excess returns.
+    - indices (np.ndarray): draws x months resampled month indices.
+    - annualization_factor (int): Periods per year.
+    - metrics (iterable of str): Statistics from BOOTSTRAP_METRICS.
+
+    Returns:
+    - dict: Metric -> draws x strategies array, defined as in summarize_performance.
+    """
+    resampled = xs[indices]  # draws x months x strategies
+    results = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if "Sharpe_Ratio_Arithmetic" in metrics:
+            mean = resampled.mean(axis=1)
+            std = resampled.std(axis=1, ddof=1)
+            results["Sharpe_Ratio_Arithmetic"] = mean / std * np.sqrt(annualization_factor)
+        if "Alpha_Arithmetic" in metrics:
+            # One batched solve of the normal equations per draw, shared by all strategies
+            X = np.concatenate((np.ones(indices.shape + (1,)), factors[indices]), axis=2)
+            Xt = X.transpose(0, 2, 1)
+            try:
+                coefficients = np.linalg.solve(Xt @ X, Xt @ resampled)
+            except np.linalg.LinAlgError:
+                # A draw with a constant factor has no unique solution; fall back to least squares
+                coefficients = np.stack([np.linalg.lstsq(x, y, rcond=None)[0] for x, y in zip(X, resampled)])
+            results["Alpha_Arithmetic"] = coefficients[:, 0, :] * annualization_factor * 100
+    return results
+
+
+def _bootstrap_chunk(xs, factors, n_draws, method, block_length, seed_sequence, annualization_factor, metrics):
+    """
+    Draws one chunk of replications from its own seed and returns their statistics.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    if method == "stationary":
+        indices = stationary_bootstrap_indices(xs.shape[0], n_draws, block_length, rng)
+    else:
+        indices = block_bootstrap_indices(xs.shape[0], n_draws, block_length, rng)
+    return resampled_statistics(xs, factors, indices, annualization_factor, metrics)
+
+
+def _init_worker(xs, factors, method, block_length, annualization_factor, metrics):
+    _WORKER_STATE.update(
+        xs=xs,
+        factors=factors,
+        method=method,
+        block_length=block_length,
+        annualization_factor=annualization_factor,
+        metrics=metrics,
+    )
+
+
+def _run_chunk(task):
+    n_draws, seed_sequence = task
+    state = _WORKER_STATE
+    return _bootstrap_chunk(state["xs"], state["factors"], n_draws, state["method"], state["block_length"],
+                            seed_sequence, state["annualization_factor"], state["metrics"])
+
+
+@instrumented()
+def bootstrap_confidence_intervals(xs_returns, rf, factor_xs_returns, annualization_factor=12, n_draws=10000,
+                                   method="stationary", block_length=6, confidence=0.95, metrics=BOOTSTRAP_METRICS,
+                                   seed=0, n_jobs=None, chunk_size=1000, market_data=None):
+    """
+    Percentile bootstrap confidence intervals for Sharpe ratios and alphas of many strategies.
+
+    Monthly returns are resampled in blocks (stationary or circular moving block bootstrap)
+    to keep their autocorrelation. All strategies share the same resampled months, and the
+    statistics of a whole chunk of draws are computed in one vectorized pass. Chunks are
+    spread over worker processes; each chunk has its own seed spawned from seed, so the
+    intervals do not depend on n_jobs.
+
+    Parameters:
+    - xs_returns: pd.DataFrame, months x strategies excess returns (a Series is one strategy).
+    - rf: pd.DataFrame or pd.Series, monthly risk-free returns, used for the alignment only.
+    - factor_xs_returns: pd.DataFrame or pd.Series, factor excess returns for the alphas.
+    - annualization_factor: int, periods per year.
+    - n_draws: int, bootstrap replications.
+    - method: str, "stationary" (random block lengths) or "block" (fixed block lengths).
+    - block_length: float, mean (stationary) or fixed (block) block length in months.
+    - confidence: float, coverage of the intervals.
+    - metrics: iterable of str, statistics from BOOTSTRAP_METRICS.
+    - seed: int, seed of the random number generator.
+    - n_jobs: int, number of worker processes. None uses all CPUs, 1 runs in-process.
+    - chunk_size: int, draws per chunk; bounds memory at chunk_size x months x strategies floats.
+    - market_data: MarketData, optional; its pre-aligned rf and benchmark excess returns are used instead of rf and factor_xs_returns.
+
+    Returns:
+    - pd.DataFrame: One row per strategy with, for each metric, the point estimate and the
+      '<metric>_CI_Lower' and '<metric>_CI_Upper' bounds.
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method '{method}'. Choose from {BOOTSTRAP_METHODS}.")
+    metrics = [metric for metric in BOOTSTRAP_METRICS if metric in set(metrics)]
+    if not metrics:
+        raise ValueError(f"No bootstrap metrics requested. Choose from {BOOTSTRAP_METRICS}.")
+
+    xs_returns, rf, factor_xs_returns = align_strategy_returns(xs_returns, rf, factor_xs_returns, market_data=market_data)
+    xs = np.ascontiguousarray(xs_returns.to_numpy(dtype=float))
+    factors = np.ascontiguousarray(factor_xs_returns.to_numpy(dtype=float))
+
+    chunk_draws = [min(chunk_size, n_draws - start) for start in range(0, n_draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_draws))
+    tasks = list(zip(chunk_draws, seeds))
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(tasks)))
+
+    if n_jobs == 1:
+        chunks = [_bootstrap_chunk(xs, factors, n, method, block_length, seed_sequence, annualization_factor, metrics)
+                  for n, seed_sequence in tasks]
+    else:
+        initargs = (xs, factors, method, block_length, annualization_factor, metrics)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs) as executor:
+            chunks = list(executor.map(_run_chunk, tasks))
+
+    point = resampled_statistics(xs, factors, np.arange(len(xs))[None, :], annualization_factor, metrics)
+    tail = 100 * (1 - confidence) / 2
+    results = {}
+    for metric in metrics:
+        draws = np.concatenate([chunk[metric] for chunk in chunks])
+        lower, upper = np.nanpercentile(draws, [tail, 100 - tail], axis=0)
+        results[metric] = point[metric][0]
+        results[f"{metric}_CI_Lower"] = lower
+        results[f"{metric}_CI_Upper"] = upper
+    return pd.DataFrame(results, index=xs_returns.columns)
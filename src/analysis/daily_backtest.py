@@ -0,0 +1,162 @@
+# src/analysis/daily_backtest.py
+
+import numpy as np
+import pandas as pd
+from src.analysis.vectorized_backtest import run_vectorized_backtest
+
+# Trading days per chunk; bounds the temporaries at chunk_size x assets floats
+DEFAULT_CHUNK_SIZE = 252
+
+
+def rebalance_dates(trading_days, schedule="ME"):
+    """
+    Resolves a rebalance schedule to trading days.
+
+    Parameters:
+    - trading_days: pd.DatetimeIndex, sorted trading days of the price panel.
+    - schedule: str or sequence of dates. A pandas frequency ('W-FRI', 'ME', 'QE', ...)
+      rebalances on the last trading day of every period; explicit dates rebalance on the
+      last trading day on or before each date.
+
+    Returns:
+    - np.ndarray of int: positions of the rebalance days in trading_days, increasing and unique.
+    """
+    trading_days = pd.DatetimeIndex(trading_days)
+    if isinstance(schedule, str):
+        positions = pd.Series(np.arange(len(trading_days)), index=trading_days).resample(schedule).last()
+        positions = positions.dropna().to_numpy(dtype=np.int64)
+    else:
+        dates = pd.DatetimeIndex(pd.to_datetime(list(schedule))).sort_values()
+        positions = trading_days.searchsorted(dates, side='right') - 1
+        positions = positions[positions >= 0]
+    return np.unique(positions)
+
+
+def _forward_filled_chunks(price_data_daily, chunk_size):
+    """
+    Yields (first row, forward-filled prices) for consecutive chunks of trading days.
+
+    Gaps are filled with the last price of earlier chunks, so the chunks together equal
+    price_data_daily.ffill() without materializing it.
+    """
+    carry = np.full(price_data_daily.shape[1], np.nan)
+    for start in range(0, len(price_data_daily), chunk_size):
+        chunk = price_data_daily.iloc[start:start + chunk_size].ffill().to_numpy(dtype=float)
+        chunk = np.where(np.isnan(chunk), carry, chunk)
+        carry = chunk[-1]
+        yield start, chunk
+
+
+def daily_momentum_strategy(price_data_daily, lookback_period, nLong, nShort, holding_period, rf_monthly, trx_cost,
+                            schedule="ME", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Momentum strategy with daily return accounting and a configurable rebalance schedule.
+
+    The strategy is the one of momentum_strategy with periods between rebalance days in
+    place of months: at every rebalance day assets are ranked on their compounded return
+    over the lookback_period preceding periods, and each cohort is held for
+    holding_period rebalances. With the monthly schedule the target weights equal those of
+    momentum_strategy. Between rebalance days the positions are not reset: each day's
+    return is earned by the holdings as they drifted since the last rebalance, and
+    compounding the daily returns of a period gives the period's return (before the
+    [-0.5, 0.5] clipping, which only applies to the ranking).
+
+    Prices are read in chunks of chunk_size trading days, once to collect the rebalance-day
+    prices and once to compute the daily returns, so memory grows with the number of
+    rebalance days x assets, not with the number of trading days x assets.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset.
+    - lookback_period: int, number of rebalance periods to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of rebalance periods to hold the positions before they roll off.
+    - rf_monthly: pd.Series or pd.DataFrame, monthly risk-free rate (indexed by date), spread
+      geometrically over the trading days of each month.
+    - trx_cost: float, cost per unit of turnover, charged on the rebalance day.
+    - schedule: str or sequence of dates, rebalance schedule (see rebalance_dates).
+    - chunk_size: int, trading days processed at once.
+
+    Returns:
+    - excess_returns: pd.DataFrame, daily net excess returns ('Strategy_Returns').
+    - portfolio_weights: pd.DataFrame, target weights set on each rebalance day.
+    - turnover_series: pd.DataFrame, turnover ('Turnover') on each rebalance day.
+    - portfolio_returns: pd.DataFrame, daily net portfolio returns ('Portfolio_Returns').
+    """
+    trading_days = price_data_daily.index
+    rebalance_positions = rebalance_dates(trading_days, schedule)
+    if len(rebalance_positions) == 0:
+        raise ValueError("The rebalance schedule has no dates within the price history.")
+
+    # Pass 1: forward-filled prices on the rebalance days
+    rebalance_prices = np.empty((len(rebalance_positions), price_data_daily.shape[1]))
+    for start, chunk in _forward_filled_chunks(price_data_daily, chunk_size):
+        lo, hi = rebalance_positions.searchsorted([start, start + len(chunk)])
+        rebalance_prices[lo:hi] = chunk[rebalance_positions[lo:hi] - start]
+
+    # Ranking and cohorts on the period returns, as momentum_strategy does on monthly returns
+    with np.errstate(divide='ignore', invalid='ignore'):
+        period_returns = np.full(rebalance_prices.shape, np.nan)
+        period_returns[1:] = np.clip(rebalance_prices[1:] / rebalance_prices[:-1] - 1, -0.5, 0.5)
+    weights, turnover, _ = run_vectorized_backtest(period_returns, lookback_period, nLong, nShort, holding_period)
+
+    # Pass 2: daily returns of the holdings, drifting from the last rebalance day
+    daily_returns = np.zeros(len(trading_days))
+    growth_before = 1.0
+    for start, chunk in _forward_filled_chunks(price_data_daily, chunk_size):
+        days = np.arange(start, start + len(chunk))
+        # Weights set on rebalance day k are held from the following day on
+        active = rebalance_positions.searchsorted(days, side='left') - 1
+        for k in np.unique(active):
+            rows = np.flatnonzero(active == k)
+            if k < 0 or not weights[k].any():
+                growth_before = 1.0
+                continue
+            held = np.flatnonzero(weights[k])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                relative = chunk[rows[:, None], held] / rebalance_prices[k, held] - 1
+            # Value of one unit of capital invested at the rebalance, marked to each day's close
+            growth = 1 + np.nan_to_num(relative, nan=0.0, posinf=0.0, neginf=0.0) @ weights[k, held]
+            if days[rows[0]] == rebalance_positions[k] + 1:
+                growth_before = 1.0
+            previous = np.concatenate(([growth_before], growth[:-1]))
+            daily_returns[start + rows] = growth / previous - 1
+            growth_before = growth[-1]
+
+    rebalance_index = trading_days[rebalance_positions]
+    turnover_series = pd.Series(0.0, index=trading_days)
+    turnover_series.iloc[rebalance_positions] = turnover
+    costs = turnover_series * trx_cost
+
+    portfolio_returns = pd.Series(daily_returns, index=trading_days) - costs
+    if nShort == 0:
+        excess_returns = portfolio_returns - daily_risk_free_rate(rf_monthly, trading_days)
+    else:
+        excess_returns = portfolio_returns.copy()
+
+    portfolio_weights = pd.DataFrame(weights, index=rebalance_index, columns=price_data_daily.columns)
+    return (
+        excess_returns.to_frame(name='Strategy_Returns'),
+        portfolio_weights,
+        turnover_series.iloc[rebalance_positions].to_frame(name='Turnover'),
+        portfolio_returns.to_frame(name='Portfolio_Returns'),
+    )
+
+
+def daily_risk_free_rate(rf_monthly, trading_days):
+    """
+    Spreads monthly risk-free returns over the trading days of each month.
+
+    Parameters:
+    - rf_monthly: pd.Series or pd.DataFrame, monthly risk-free rate indexed by month-end.
+    - trading_days: pd.DatetimeIndex, trading days of the price panel.
+
+    Returns:
+    - pd.Series: daily rates that compound to the monthly rate over each month (0 where the rate is missing).
+    """
+    if isinstance(rf_monthly, pd.DataFrame):
+        rf_monthly = rf_monthly.iloc[:, 0]
+    month_ends = pd.DatetimeIndex(trading_days).to_period('M').to_timestamp(how='end').normalize()
+    monthly_rate = rf_monthly.reindex(month_ends).fillna(0.0).to_numpy(dtype=float)
+    days_in_month = pd.Series(1, index=month_ends).groupby(level=0).transform('size').to_numpy()
+    return pd.Series((1 + monthly_rate) ** (1 / days_in_month) - 1, index=trading_days)
@@ -0,0 +1,196 @@
+# src/analysis/instrumentation.py
+
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Linux exposes a resettable peak RSS (VmHWM); elsewhere the process-wide maximum is reported
+_STATUS_PATH = Path("/proc/self/status")
+_CLEAR_REFS_PATH = Path("/proc/self/clear_refs")
+
+REPORT_COLUMNS = ["stage", "parent", "calls", "wall_s", "cpu_s", "peak_rss_mb"]
+
+
+def _peak_rss_bytes():
+    """
+    Peak resident set size since the last reset (Linux) or since the process started, in bytes.
+    """
+    try:
+        with open(_STATUS_PATH) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak RSS to the current RSS where the kernel allows it.
+    """
+    try:
+        with open(_CLEAR_REFS_PATH, "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+class Instrumentation:
+    """
+    Records wall time, CPU time, peak RSS and call counts per named stage.
+
+    Stages are timed with the stage context manager or the instrumented decorator and may
+    be nested; a stage's times include those of its nested stages. Nothing is recorded
+    until enable is called, so instrumented library functions cost one flag check when the
+    instrumentation is off. CPU time covers this process only, not worker processes. The
+    peak RSS of a stage is exact on Linux, where the kernel's high-water mark is reset when
+    a stage starts; elsewhere it is the process maximum reached by the end of the stage.
+    Stages are expected to be entered from one thread.
+
+    Attributes:
+    - enabled (bool): Whether stages are recorded.
+    - stages (dict): Stage name -> dict with 'parent' (the stage it was first entered from),
+      'calls', 'wall_s', 'cpu_s' and 'peak_rss' (bytes), in the order the stages were first entered.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self._stack = []
+        self._started = None
+
+    def enable(self):
+        self.enabled = True
+        if self._started is None:
+            self._started = (datetime.now(), time.perf_counter())
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.stages = {}
+        self._stack = []
+        self._started = (datetime.now(), time.perf_counter()) if self.enabled else None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block as stage name.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        # The enclosing stage keeps the peak reached so far before the counter is reset
+        peak_before = _peak_rss_bytes()
+        if self._stack and peak_before is not None:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"] or 0, peak_before)
+        _reset_peak_rss()
+        frame = {"name": name, "peak": _peak_rss_bytes()}
+        parent = self._stack[-1]["name"] if self._stack else None
+        record = self.stages.setdefault(name, {"parent": parent, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss": None})
+        self._stack.append(frame)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak_now = _peak_rss_bytes()
+            peak = max(frame["peak"] or 0, peak_now or 0) if peak_now is not None else None
+            self._stack.pop()
+            if self._stack and peak is not None:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"] or 0, peak)
+
+            record["calls"] += 1
+            record["wall_s"] += wall
+            record["cpu_s"] += cpu
+            if peak is not None:
+                record["peak_rss"] = max(record["peak_rss"] or 0, peak)
+
+    def instrumented(self, name=None):
+        """
+        Decorator that records every call of a function as a stage (named after the function by default).
+        """
+        def decorator(func):
+            stage_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.stage(stage_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def report(self):
+        """
+        Returns the recorded stages in the order they were first entered.
+
+        Returns:
+        - pd.DataFrame: One row per stage with its parent stage, number of calls, total wall
+          and CPU seconds and the peak RSS in megabytes over all calls.
+        """
+        rows = [
+            {
+                "stage": name,
+                "parent": record["parent"],
+                "calls": record["calls"],
+                "wall_s": record["wall_s"],
+                "cpu_s": record["cpu_s"],
+                "peak_rss_mb": record["peak_rss"] / 1024 ** 2 if record["peak_rss"] is not None else None,
+            }
+            for name, record in self.stages.items()
+        ]
+        return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+    def save_report(self, path):
+        """
+        Writes the report as JSON (with run metadata) and CSV.
+
+        Parameters:
+        - path (str or Path): Output path without suffix; '.json' and '.csv' are appended.
+
+        Returns:
+        - pd.DataFrame: the report.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = self.report()
+        started_at, started = self._started or (datetime.now(), time.perf_counter())
+        payload = {
+            "started": started_at.isoformat(timespec="seconds"),
+            "total_wall_s": time.perf_counter() - started,
+            "peak_rss_mb": report["peak_rss_mb"].max() if report["peak_rss_mb"].notna().any() else None,
+            "stages": report.astype(object).where(report.notna(), None).to_dict(orient="records"),
+        }
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump(payload, f, indent=2)
+        report.to_csv(path.with_suffix(".csv"), index=False)
+        return report
+
+
+# Shared instance used by src/main.py and the instrumented library functions
+PROFILER = Instrumentation()
+stage = PROFILER.stage
+instrumented = PROFILER.instrumented
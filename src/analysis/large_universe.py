@@ -0,0 +1,150 @@
+# src/analysis/large_universe.py
+
+import numpy as np
+import pandas as pd
+from src.analysis.vectorized_backtest import COHORT_BLOCK_MONTHS, LARGE_UNIVERSE_BLOCK
+
+# Bytes per month x asset cell of the formation-return temporaries (float64 copy, log growth,
+# three prefix arrays, result, masks), which only exist for one block of assets at a time
+_BLOCK_CELL_BYTES = 8 * 6 + 3
+
+# Approximate bytes per month x asset cell held at the peak of each backtest stage, beyond
+# the return panel itself (float64 unless noted)
+_STAGE_CELL_BYTES = {
+    # scores and eligibility of the whole universe
+    "Formation returns": 8 + 1,
+    # keys, partitioned copy, tie ranks (int64), selection masks, allocations
+    "Leg selection": 8 * 4 + 3,
+    # allocations, cumulative sum, weights, rounding and turnover temporaries
+    "Overlapping weights": 8 * 5,
+}
+
+
+def estimate_backtest_memory(n_days, n_months, n_assets, float32=False, sparse_weights=False, nLong=0, nShort=0, holding_period=1):
+    """
+    Rough memory estimate of a momentum_strategy run with engine="large".
+
+    Parameters:
+    - n_days: int, trading days of the daily price panel.
+    - n_months: int, months of the monthly panels.
+    - n_assets: int, assets in the universe.
+    - float32: bool, whether the price and return panels are stored as float32.
+    - sparse_weights: bool, whether the weights are returned as SparseWeights.
+    - nLong, nShort, holding_period: int, used for the size of sparse weights.
+
+    Returns:
+    - pd.DataFrame: estimated megabytes per item ('MB') and whether it is held for the
+      whole run or only during one stage ('Kind'), with the estimated peak in the last row.
+    """
+    itemsize = 4 if float32 else 8
+    cells = n_months * n_assets
+    persistent = {
+        "Daily price panel": n_days * n_assets * itemsize,
+        "Monthly price and return panels": 3 * cells * itemsize,
+    }
+    if sparse_weights:
+        # Row pointers plus (position, weight) pairs of at most every held cohort's names
+        persistent["Weights (sparse)"] = n_months * (8 + min(n_assets, (nLong + nShort) * holding_period) * 16)
+    else:
+        persistent["Weights (dense)"] = cells * 8
+    transient = {stage: cells * cell_bytes for stage, cell_bytes in _STAGE_CELL_BYTES.items()}
+    transient["Formation returns"] += n_months * min(n_assets, LARGE_UNIVERSE_BLOCK) * _BLOCK_CELL_BYTES
+    if sparse_weights:
+        # Cohorts are selected a block of months at a time while the scores are held, and the
+        # weights are accumulated from holding_period + 1 dense rows
+        scores_bytes = cells * _STAGE_CELL_BYTES["Formation returns"]
+        transient["Leg selection"] = scores_bytes + min(n_months, COHORT_BLOCK_MONTHS) * n_assets * _STAGE_CELL_BYTES["Leg selection"]
+        transient["Overlapping weights"] = scores_bytes + (holding_period + 4) * n_assets * 8
+
+    rows = [(name, size, "held") for name, size in persistent.items()]
+    rows += [(name, size, "stage") for name, size in transient.items()]
+    rows.append(("Estimated peak", sum(persistent.values()) + max(transient.values()), "total"))
+    report = pd.DataFrame(rows, columns=["Item", "Bytes", "Kind"]).set_index("Item")
+    report["MB"] = report["Bytes"] / 1024 ** 2
+    return report[["MB", "Kind"]]
+
+
+def print_memory_report(price_data_daily, nLong=0, nShort=0, holding_period=1, sparse_weights=False):
+    """
+    Prints estimate_backtest_memory for a daily price panel before a run.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - nLong, nShort, holding_period: int, strategy parameters (for sparse weights).
+    - sparse_weights: bool, whether the weights are returned as SparseWeights.
+
+    Returns:
+    - pd.DataFrame: the report.
+    """
+    if isinstance(price_data_daily, pd.DataFrame):
+        n_days, n_assets = price_data_daily.shape
+        n_months = len(pd.date_range(price_data_daily.index.min(), price_data_daily.index.max(), freq='ME')) + 1
+        float32 = all(dtype == np.float32 for dtype in price_data_daily.dtypes)
+    else:
+        # MarketData: the daily panel is no longer needed
+        n_days = 0
+        n_months, n_assets = price_data_daily.returns.shape
+        float32 = price_data_daily.returns.dtype == np.float32
+    report = estimate_backtest_memory(n_days, n_months, n_assets, float32, sparse_weights, nLong, nShort, holding_period)
+    print(f"Memory estimate for {n_assets} assets x {n_months} months ({'float32' if float32 else 'float64'} panels):")
+    print(report.round(1).to_string())
+    return report
+
+
+def synthetic_universe(n_assets, start="2000-01-01", end="2024-12-31", seed=0, float32=True, listing_fraction=0.3,
+                       block_size=1000):
+    """
+    Generates a synthetic daily price panel for scaling runs without vendor data.
+
+    Daily log returns combine a market factor, per-asset betas and volatilities, and an
+    expected return that drifts slowly from month to month (so past winners tend to keep
+    winning for a while). A listing_fraction of the assets starts trading late and the same
+    fraction stops early, leaving NaNs as in the constituent data. Assets are generated in
+    blocks of block_size columns so the float64 temporaries stay small.
+
+    Parameters:
+    - n_assets: int, number of assets.
+    - start, end: date-like, first and last calendar day (business days are used).
+    - seed: int, seed of the random number generator.
+    - float32: bool, return float32 prices (as load_data(float32=True)).
+    - listing_fraction: float, share of assets listed late and of assets delisted early.
+    - block_size: int, assets generated at once.
+
+    Returns:
+    - price_data_daily: pd.DataFrame, days x assets prices with a 'date' index.
+    - rf_monthly: pd.DataFrame, monthly risk-free returns ('monthly_return') indexed by month-end.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, end, name='date')
+    n_days = len(days)
+    month_of_day = np.asarray(days.year * 12 + days.month)
+    month_of_day -= month_of_day[0]
+    n_months = month_of_day[-1] + 1
+
+    market = rng.normal(0.0003, 0.01, n_days)
+    prices = np.empty((n_days, n_assets), dtype=np.float32 if float32 else np.float64)
+    for first in range(0, n_assets, block_size):
+        width = min(block_size, n_assets - first)
+        beta = rng.uniform(0.5, 1.5, width)
+        volatility = rng.uniform(0.01, 0.03, width)
+        # Monthly expected daily return following a persistent AR(1) process
+        drift = np.empty((n_months, width))
+        drift[0] = rng.normal(0.0, 0.0005, width)
+        for month in range(1, n_months):
+            drift[month] = 0.9 * drift[month - 1] + rng.normal(0.0, 0.0002, width)
+        log_returns = drift[month_of_day] + beta * market[:, None] + volatility * rng.standard_normal((n_days, width))
+        block = 100 * np.exp(np.cumsum(log_returns, axis=0))
+
+        listed = rng.random(width) < listing_fraction
+        delisted = rng.random(width) < listing_fraction
+        first_day = np.where(listed, rng.integers(0, n_days // 2, width), 0)
+        last_day = np.where(delisted, rng.integers(n_days // 2, n_days, width), n_days)
+        rows = np.arange(n_days)[:, None]
+        block[(rows < first_day) | (rows >= last_day)] = np.nan
+        prices[:, first:first + width] = block
+
+    price_data_daily = pd.DataFrame(prices, index=days, columns=[f"SYN{i:05d}" for i in range(n_assets)], copy=False)
+    month_ends = pd.date_range(days[0], days[-1] + pd.offsets.MonthEnd(0), freq='ME', name='date')
+    rf_monthly = pd.DataFrame({'monthly_return': np.clip(rng.normal(0.001, 0.0005, len(month_ends)), 0.0, None)},
+                              index=month_ends)
+    return price_data_daily, rf_monthly
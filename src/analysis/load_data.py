@@ -1,21 +1,68 @@
+import csv
+import hashlib
+import os
+import warnings
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+from src.analysis.instrumentation import instrumented
+from src.data_processing.columnar_storage import is_columnar_path, load_frame, save_frame
 
-def load_data(data_path):
+@instrumented()
+def load_data(data_path, columns=None, float32=False, cache=False, fast=True):
     """
     Load and preprocess data for the momentum strategy.
-    
+
     Parameters:
-    - data_path (str or Path): The file path to the CSV data file.
-    
+    - data_path (str or Path): The file path to the data file. CSV files are parsed; Feather
+      (.feather/.arrow) and Parquet (.parquet) files are memory-mapped and already typed.
+    - columns (list, optional): Asset columns to load besides 'date'. Loads all columns if None.
+    - float32 (bool): Return the asset columns as float32 instead of float64.
+    - cache (bool): Keep a binary (Feather) sidecar next to a CSV file, keyed on the file's size,
+      modification time and the load options, so repeat loads skip parsing. Needs pyarrow.
+    - fast (bool): Parse CSV files with float dtypes declared up front, using the multithreaded
+      pyarrow parser on multi-core machines. Files with non-numeric entries fall back to the generic
+      parser, which coerces them to NaN.
+
     Returns:
     - pd.DataFrame: A DataFrame with a DateTime index ('date'), sorted in ascending order.
       All other columns are treated as numeric asset data.
-    
+
     Raises:
     - ValueError: If the 'date' column is missing or improperly formatted.
     """
+    float_dtype = np.float32 if float32 else np.float64
+
+    if is_columnar_path(data_path):
+        return _load_columnar(data_path, columns, float_dtype)
+
+    cache_path = _sidecar_path(data_path, columns, float_dtype) if cache else None
+    if cache_path is not None and cache_path.exists():
+        try:
+            return _load_columnar(cache_path, None, float_dtype)
+        except ImportError:
+            cache_path = None
+
+    data = _read_csv_typed(data_path, columns, float_dtype) if fast else None
+    if data is None:
+        data = _read_csv_generic(data_path, columns)
+        if float32:
+            data = data.astype(float_dtype)
+
+    if cache_path is not None:
+        _write_sidecar(data, cache_path, data_path)
+
+    return data
+
+
+def _read_csv_generic(data_path, columns=None):
+    """
+    Reads a CSV file as generic objects and coerces every column to numeric afterwards.
+    """
     # Load the CSV file
-    data = pd.read_csv(data_path, low_memory=False)
+    usecols = None if columns is None else ['date'] + [c for c in columns if c != 'date']
+    data = pd.read_csv(data_path, low_memory=False, usecols=usecols)
 
     # Check if the 'date' column is present
     if 'date' not in data.columns:
@@ -26,7 +73,7 @@ def load_data(data_path):
         data['date'] = pd.to_datetime(data['date'])
     except Exception as e:
         raise ValueError(f"Error parsing 'date' column: {e}")
-    
+
     data.set_index('date', inplace=True)
 
     # Sort the index by date
@@ -43,3 +90,125 @@ def load_data(data_path):
         data = data.to_frame()
 
     return data
+
+
+def _read_csv_typed(data_path, columns=None, float_dtype=np.float64):
+    """
+    Reads a CSV file with float dtypes declared for every asset column.
+
+    Uses pyarrow's multithreaded CSV reader when pyarrow is installed and more than one CPU
+    is available, and pandas' C parser otherwise. Returns None if the file cannot be parsed
+    this way (e.g. it contains non-numeric entries), so the caller can fall back to the
+    generic parser.
+    """
+    with open(data_path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f), [])
+    if 'date' not in header:
+        raise ValueError("The data must contain a 'date' column.")
+    # Unnamed or repeated columns are renamed by pandas; leave those files to the generic parser
+    if '' in header or len(set(header)) != len(header):
+        return None
+
+    asset_columns = [c for c in header if c != 'date'] if columns is None else [c for c in columns if c != 'date']
+
+    data = None
+    # pyarrow's reader only beats the C parser when it can spread the work over several cores
+    if (os.cpu_count() or 1) > 1:
+        try:
+            data = _read_csv_arrow(data_path, asset_columns, float_dtype)
+        except ImportError:
+            pass
+        except ValueError:
+            return None
+    if data is None:
+        try:
+            dtypes = {column: float_dtype for column in asset_columns}
+            data = pd.read_csv(data_path, engine='c', usecols=['date'] + asset_columns, dtype=dtypes)
+        except (ValueError, TypeError):
+            return None
+
+    try:
+        data['date'] = pd.to_datetime(data['date'])
+    except Exception as e:
+        raise ValueError(f"Error parsing 'date' column: {e}")
+
+    data = data.set_index('date')[asset_columns]
+    if not data.index.is_monotonic_increasing:
+        data = data.sort_index(kind='stable')
+    return data.dropna(how='all')
+
+
+def _read_csv_arrow(data_path, asset_columns, float_dtype):
+    """
+    Parses a CSV file with pyarrow.csv, typing the asset columns on read. Raises ImportError
+    without pyarrow and ValueError (ArrowInvalid) on entries that are not numbers.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as arrow_csv
+
+    arrow_type = pa.float32() if np.dtype(float_dtype) == np.float32 else pa.float64()
+    convert_options = arrow_csv.ConvertOptions(
+        column_types={column: arrow_type for column in asset_columns},
+        include_columns=['date'] + asset_columns,
+        strings_can_be_null=True,
+    )
+    read_options = arrow_csv.ReadOptions(use_threads=True)
+    table = arrow_csv.read_csv(data_path, read_options=read_options, convert_options=convert_options)
+    return table.to_pandas()
+
+
+def _sidecar_path(data_path, columns, float_dtype):
+    """
+    Path of the binary cache for data_path, fingerprinted by file size, modification time and load options.
+    """
+    data_path = Path(data_path)
+    stat = data_path.stat()
+    key = repr((stat.st_size, stat.st_mtime_ns, np.dtype(float_dtype).str, None if columns is None else list(columns)))
+    fingerprint = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return data_path.with_name(f".{data_path.name}.{fingerprint}.cache.feather")
+
+
+def _write_sidecar(data, cache_path, data_path):
+    """
+    Writes the binary cache and removes caches written before the source file last changed.
+    """
+    try:
+        save_frame(data, cache_path)
+    except ImportError as e:
+        warnings.warn(f"load_data cache disabled: {e}")
+        return
+    source_path = Path(data_path)
+    source_mtime = source_path.stat().st_mtime_ns
+    for stale in cache_path.parent.glob(f".{source_path.name}.*.cache.feather"):
+        if stale != cache_path and stale.stat().st_mtime_ns < source_mtime:
+            stale.unlink(missing_ok=True)
+
+
+def _load_columnar(data_path, columns=None, float_dtype=None):
+    """
+    Loads a Feather or Parquet file written by save_frame; columns keep their stored dtypes
+    unless float_dtype is given.
+    """
+    data = load_frame(data_path, columns=columns, index_col='date')
+
+    if data.index.name != 'date':
+        raise ValueError("The data must contain a 'date' column.")
+    if not isinstance(data.index, pd.DatetimeIndex):
+        try:
+            data.index = pd.to_datetime(data.index)
+        except Exception as e:
+            raise ValueError(f"Error parsing 'date' column: {e}")
+
+    if not data.index.is_monotonic_increasing:
+        data = data.sort_index()
+
+    # Only non-numeric columns need converting (e.g. files written from untyped frames)
+    non_numeric = [c for c in data.columns if not pd.api.types.is_numeric_dtype(data[c])]
+    if non_numeric:
+        data[non_numeric] = data[non_numeric].apply(pd.to_numeric, errors='coerce')
+
+    if float_dtype is not None and (data.dtypes != float_dtype).any():
+        data = data.astype(float_dtype)
+
+    # Drop rows with all NaN values
+    return data.dropna(how='all')
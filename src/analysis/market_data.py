@@ -0,0 +1,165 @@
+# src/analysis/market_data.py
+
+import numpy as np
+import pandas as pd
+from src.analysis.summarize_performance import prepare_rf_and_factors
+
+
+def monthly_returns_from_prices(price_data_daily):
+    """
+    Resamples daily prices to month-ends and computes clipped monthly returns.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset.
+
+    Returns:
+    - pd.DataFrame: monthly returns clipped to [-0.5, 0.5].
+    """
+    # Resample data to monthly frequency and calculate returns
+    monthly_prices = price_data_daily.resample('ME').last()
+    monthly_returns = monthly_prices.pct_change()
+    # Avoid massive outliers
+    return np.clip(monthly_returns, -0.5, 0.5)
+
+
+class MarketData:
+    """
+    Monthly prices, returns, risk-free and benchmark series, aligned once per run.
+
+    The constituent panels are stored as contiguous months x assets arrays that share one
+    date index and one asset index. The risk-free and benchmark excess returns are also
+    pre-aligned for summarize_performance, so the resampling, index intersection and gap
+    filling happen once instead of on every backtest and every statistics call.
+
+    Attributes:
+    - dates: pd.DatetimeIndex, month-end dates shared by all arrays.
+    - assets: pd.Index, asset names shared by the price and return panels.
+    - prices: np.ndarray, months x assets month-end prices (float64, or float32 with float32=True).
+    - returns: np.ndarray, months x assets clipped monthly returns (same dtype as prices).
+    - rf: np.ndarray, monthly risk-free return per date (NaN where missing).
+    - benchmark_returns: np.ndarray, clipped monthly benchmark return per date (NaN if no benchmark).
+    - benchmark_xs_returns: np.ndarray, monthly benchmark excess return per date (NaN if no benchmark).
+    - rf_monthly: pd.DataFrame, the risk-free frame as loaded.
+    - benchmark_returns_monthly: pd.DataFrame, benchmark returns ('Benchmark') on the benchmark's own month-ends.
+    - benchmark_xs_returns_monthly: pd.DataFrame, benchmark excess returns ('Benchmark').
+    """
+
+    def __init__(self, monthly_prices, monthly_returns, rf_monthly, benchmark_returns_monthly=None, benchmark_xs_returns_monthly=None, float32=False):
+        float_dtype = np.float32 if float32 else np.float64
+        self.dates = monthly_returns.index
+        self.assets = monthly_returns.columns
+        self.prices = np.ascontiguousarray(monthly_prices.to_numpy(dtype=float_dtype))
+        self.returns = np.ascontiguousarray(monthly_returns.to_numpy(dtype=float_dtype))
+
+        self.rf_monthly = rf_monthly
+        self.benchmark_returns_monthly = benchmark_returns_monthly
+        self.benchmark_xs_returns_monthly = benchmark_xs_returns_monthly
+
+        self.rf = _first_column(rf_monthly).reindex(self.dates).to_numpy(dtype=float)
+        if benchmark_returns_monthly is not None:
+            self.benchmark_returns = _first_column(benchmark_returns_monthly).reindex(self.dates).to_numpy(dtype=float)
+            self.benchmark_xs_returns = _first_column(benchmark_xs_returns_monthly).reindex(self.dates).to_numpy(dtype=float)
+        else:
+            self.benchmark_returns = np.full(len(self.dates), np.nan)
+            self.benchmark_xs_returns = np.full(len(self.dates), np.nan)
+
+        self._prepare_statistics()
+
+    @classmethod
+    def from_daily(cls, price_data_daily, rf_monthly, benchmark_price_daily=None, benchmark_column=None, float32=False):
+        """
+        Builds MarketData from the output of load_data.
+
+        Parameters:
+        - price_data_daily: pd.DataFrame, daily constituent prices.
+        - rf_monthly: pd.DataFrame, monthly risk-free returns with a 'monthly_return' column.
+        - benchmark_price_daily: pd.DataFrame or pd.Series, optional daily benchmark prices.
+        - benchmark_column: str, benchmark column to use. Defaults to the first column.
+        - float32: bool, store the price and return panels as float32 (halves their memory for large universes).
+
+        Returns:
+        - MarketData
+        """
+        monthly_prices = price_data_daily.resample('ME').last()
+        monthly_returns = monthly_returns_from_prices(price_data_daily)
+
+        benchmark_returns_monthly = None
+        benchmark_xs_returns_monthly = None
+        if benchmark_price_daily is not None:
+            benchmark_returns = monthly_returns_from_prices(benchmark_price_daily)
+            if isinstance(benchmark_returns, pd.DataFrame):
+                benchmark_returns = benchmark_returns[benchmark_column or benchmark_returns.columns[0]]
+            benchmark_xs_returns = benchmark_returns - _first_column(rf_monthly)
+            benchmark_returns_monthly = benchmark_returns.to_frame(name='Benchmark')
+            benchmark_xs_returns_monthly = benchmark_xs_returns.to_frame(name='Benchmark')
+
+        return cls(monthly_prices, monthly_returns, rf_monthly, benchmark_returns_monthly, benchmark_xs_returns_monthly, float32)
+
+    @property
+    def prices_frame(self):
+        """Month-end prices as a DataFrame view on the shared array."""
+        return pd.DataFrame(self.prices, index=self.dates, columns=self.assets, copy=False)
+
+    @property
+    def returns_frame(self):
+        """Monthly returns as a DataFrame view on the shared array."""
+        return pd.DataFrame(self.returns, index=self.dates, columns=self.assets, copy=False)
+
+    @property
+    def rf_frame(self):
+        """Risk-free returns on the shared date index ('monthly_return')."""
+        return pd.DataFrame({'monthly_return': self.rf}, index=self.dates)
+
+    def _prepare_statistics(self):
+        """
+        Aligns risk-free and factor returns the way summarize_performance does, once.
+        """
+        self._stats_rf = None
+        self._stats_factor = None
+        if self.benchmark_xs_returns_monthly is None:
+            return
+        rf, factor = prepare_rf_and_factors(self.rf_monthly, self.benchmark_xs_returns_monthly)
+        self._stats_rf = rf.asfreq('ME')
+        self._stats_factor = factor.asfreq('ME')
+        self._stats_months = self._stats_rf.index.intersection(self._stats_factor.index)
+
+        self.stats_index = self.dates.intersection(self._stats_months)
+        self.stats_rf = self._stats_rf.loc[self.stats_index].ffill().bfill()
+        self.stats_factor = self._stats_factor.loc[self.stats_index].ffill().bfill()
+
+    def align_for_statistics(self, xs_returns):
+        """
+        Aligns strategy returns with the pre-aligned risk-free and benchmark excess returns.
+
+        Gives the same result as summarize_performance's own alignment with rf_monthly and
+        benchmark_xs_returns_monthly. When xs_returns covers the backtest months, only
+        xs_returns itself needs to be filled.
+
+        Parameters:
+        - xs_returns: pd.DataFrame, strategy excess returns with their final column names.
+
+        Returns:
+        - xs_returns, rf, factor_xs_returns: pd.DataFrame, aligned on common month-ends.
+        """
+        if self._stats_rf is None:
+            raise ValueError("MarketData was built without a benchmark; pass rf and factor returns explicitly.")
+
+        xs_returns = xs_returns.asfreq('ME')
+        common_index = xs_returns.index.intersection(self._stats_months)
+        if common_index.equals(self.stats_index):
+            rf = self.stats_rf.copy()
+            factor_xs_returns = self.stats_factor.copy()
+        else:
+            rf = self._stats_rf.loc[common_index].ffill().bfill()
+            factor_xs_returns = self._stats_factor.loc[common_index].ffill().bfill()
+        xs_returns = xs_returns.loc[common_index].ffill().bfill()
+        return xs_returns, rf, factor_xs_returns
+
+
+def _first_column(data):
+    """
+    Returns a Series, taking the first column of a DataFrame.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[:, 0]
+    return data
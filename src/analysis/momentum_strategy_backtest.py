@@ -1,52 +1,112 @@
 import pandas as pd
 import numpy as np
 from src.analysis.load_data import load_data
+from src.analysis.market_data import MarketData, monthly_returns_from_prices
+from src.analysis.rolling_returns import rolling_compounded_returns
+from src.analysis.sparse_weights import SparseWeights
+from src.analysis.large_universe import print_memory_report
+from src.analysis.vectorized_backtest import run_vectorized_backtest, run_large_universe_backtest, run_drift_backtest, run_holding_period_backtests, run_top_k_backtests, trading_costs
+from src.analysis.instrumentation import instrumented
 
-def momentum_strategy(price_data_daily, lookback_period, nLong, nShort, holding_period, rf_monthly, trx_cost):
+ENGINES = ("loop", "vectorized", "large")
+
+def compute_monthly_returns(price_data_daily):
+    """
+    Resamples daily prices to month-ends and computes clipped monthly returns.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame of daily prices, or a MarketData whose precomputed
+      monthly returns are returned as is.
+
+    Returns:
+    - pd.DataFrame: monthly returns clipped to [-0.5, 0.5].
+    """
+    if isinstance(price_data_daily, MarketData):
+        return price_data_daily.returns_frame
+    return monthly_returns_from_prices(price_data_daily)
+
+@instrumented()
+def momentum_strategy(price_data_daily, lookback_period, nLong, nShort, holding_period, rf_monthly, trx_cost, engine="loop", sparse_weights=False, report_memory=False):
     """
     Implements a momentum strategy with a rolling rebalancing approach.
 
     Parameters:
-    - data_path: str, path to the CSV file containing the data.
+    - price_data_daily: pd.DataFrame of daily prices, or a MarketData built once per run.
     - lookback_period: int, number of months to look back for momentum calculation.
     - nLong: int, number of assets to go long.
     - nShort: int, number of assets to short.
     - holding_period: int, number of months to hold the positions before they roll off.
     - rf_monthly: pd.Series, monthly risk-free rate (indexed by date).
+    - engine: str, "loop" for the month-by-month reference implementation or "vectorized"
+      for the array-based engine in src.analysis.vectorized_backtest. Both select the same
+      assets, with ties in the momentum ranking broken by column order, but the vectorized
+      engine sums the cohorts in a different order before weights are rounded to 10
+      decimals, so its weights and returns can differ from the loop engine's by a few
+      1e-10 and its turnover by about 1e-9. "large" is the
+      vectorized engine for wide universes: the legs are picked with partial sorts instead
+      of ranking every cross-section, and float32 panels (load_data(float32=True),
+      MarketData.from_daily(..., float32=True)) are kept in float32.
+    - sparse_weights: bool, return the weights as SparseWeights (non-zero positions only)
+      instead of a dense months x assets DataFrame. Every engine then builds the weights
+      month by month without a dense months x assets weight matrix. The peak memory of
+      engine="vectorized" is still set by ranking every cross-section; engine="large"
+      keeps no months x assets matrix beyond the scores and eligibility.
+    - report_memory: bool, print an estimate of the memory the run needs before starting
+      (see estimate_backtest_memory).
 
     Returns:
     - excess_returns: pd.Series, strategy's returns after accounting for the risk-free rate.
-    - portfolio_weights: pd.DataFrame, weights allocated to each asset over time.
+    - portfolio_weights: pd.DataFrame or SparseWeights, weights allocated to each asset over time.
     - turnover_series: pd.Series, turnover for each month.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose one of {ENGINES}.")
+
+    if report_memory:
+        print_memory_report(price_data_daily, nLong, nShort, holding_period, sparse_weights)
+
+    monthly_returns = compute_monthly_returns(price_data_daily)
 
-    # Load data 
-    data = price_data_daily
-    
-    # Resample data to monthly frequency and calculate returns
-    monthly_prices = data.resample('ME').last()
-    monthly_returns = monthly_prices.pct_change()
-    # Avoid massive outliers
-    monthly_returns = np.clip(monthly_returns, -0.5, 0.5)
-
-    # Calculate cumulative returns over the lookback period
-    cum_returns = (1 + monthly_returns).rolling(window=lookback_period).apply(np.prod, raw=True) - 1
-    
-    # Avoid massive outliers
-    cum_returns = np.clip(cum_returns, -0.5, 0.5)
-    
-
-    # Initialize portfolio weights and returns
-    portfolio_weights = pd.DataFrame(0.0, index=monthly_returns.index, columns=monthly_returns.columns)
-    excess_returns = pd.Series(0.0, index=monthly_returns.index)
+    if engine in ("vectorized", "large"):
+        if engine == "large":
+            weights, turnover, gross_returns = run_large_universe_backtest(
+                monthly_returns.to_numpy(), lookback_period, nLong, nShort, holding_period, sparse=sparse_weights
+            )
+        else:
+            weights, turnover, gross_returns = run_vectorized_backtest(
+                monthly_returns.to_numpy(dtype=float), lookback_period, nLong, nShort, holding_period, sparse=sparse_weights
+            )
+        if sparse_weights:
+            portfolio_weights = SparseWeights.from_rows(weights, monthly_returns.index, monthly_returns.columns)
+        else:
+            portfolio_weights = pd.DataFrame(weights, index=monthly_returns.index, columns=monthly_returns.columns)
+        turnover_series = pd.Series(turnover, index=monthly_returns.index)
+        portfolio_returns = pd.Series(gross_returns, index=monthly_returns.index)
+        return _assemble_outputs(portfolio_weights, turnover_series, portfolio_returns, rf_monthly, nShort, trx_cost)
+
+    # Compounded returns over the lookback window [t - lookback_period, t) for every month t
+    formation_returns = rolling_compounded_returns(monthly_returns, lookback_period).shift(1)
+
+    # Current and previous month's weights; earlier months are kept as sparse rows
+    portfolio_weights = pd.Series(0.0, index=monthly_returns.columns)
+    weight_rows = [(np.zeros(0, dtype=np.int64), np.zeros(0))] * len(monthly_returns)
     turnover_series = pd.Series(0.0, index=monthly_returns.index)
-    new_weights_allocation = pd.DataFrame(0.0, index=monthly_returns.index, columns=monthly_returns.columns)
+    portfolio_returns = pd.Series(0.0, index=monthly_returns.index)
+
+    # Ring buffer of the last holding_period cohorts: slot t % holding_period holds the cohort
+    # formed in month t, which is replaced by the cohort of month t + holding_period when it rolls off
+    new_weights_allocation = [None] * holding_period
 
     nMonths = len(monthly_returns)
     start_month = lookback_period
 
     for t in range(start_month, nMonths):
         date = monthly_returns.index[t]
+        previous_weights = portfolio_weights
+
+        # Returns earned by last month's weights (missing returns contribute zero)
+        portfolio_returns[date] = (previous_weights * monthly_returns.iloc[t]).sum()
+
         # Define the lookback period
         lookback_start = t - lookback_period
         lookback_end = t
@@ -56,112 +116,252 @@ def momentum_strategy(price_data_daily, lookback_period, nLong, nShort, holding_
         valid_assets &= monthly_returns.iloc[t].notna()
         valid_assets = valid_assets[valid_assets].index
 
-        # Skip if no valid assets
+        slot = t % holding_period
+
+        # Skip if no valid assets: keep the weights and form no cohort this month
         if len(valid_assets) == 0:
-            portfolio_weights.loc[date] = portfolio_weights.loc[monthly_returns.index[t - 1]]
+            new_weights_allocation[slot] = None
+            weight_rows[t] = weight_rows[t - 1]
             turnover_series[date] = 0.0
             continue
 
-        # Calculate cumulative returns over the lookback period
-        lookback_returns = (1 + monthly_returns.loc[monthly_returns.index[lookback_start:lookback_end], valid_assets]).prod() - 1
+        # Cumulative returns over the lookback period
+        lookback_returns = formation_returns.loc[date, valid_assets]
 
-        # Rank assets by momentum
-        ranked_assets = lookback_returns.sort_values(ascending=False)
+        # Rank assets by momentum (stable sort: ties keep column order)
+        ranked_assets = lookback_returns.sort_values(ascending=False, kind='stable')
         long_assets = ranked_assets.head(nLong).index
         if nShort != 0:
             short_assets = ranked_assets.tail(nShort).index
 
         # Reduce weights from assets that are being replaced (after holding_period)
-        if t >= holding_period:
-            prev_date = monthly_returns.index[t - holding_period]
-            weights_to_remove = new_weights_allocation.loc[prev_date]
-            portfolio_weights.loc[date] = portfolio_weights.loc[monthly_returns.index[t - 1]] - weights_to_remove
-        else:
-            portfolio_weights.loc[date] = portfolio_weights.loc[monthly_returns.index[t - 1]]
+        portfolio_weights = previous_weights.copy()
+        weights_to_remove = new_weights_allocation[slot]
+        if weights_to_remove is not None:
+            portfolio_weights[weights_to_remove.index] -= weights_to_remove
 
-        # Assign new weights to long and short positions
-        new_weights = pd.Series(0.0, index=monthly_returns.columns)
-        new_weights.loc[long_assets] = 1 / (nLong * holding_period)
+        # Assign new weights to long and short positions (only the selected assets are stored)
+        new_weights = dict.fromkeys(long_assets, 1 / (nLong * holding_period)) if nLong != 0 else {}
         if nShort != 0:
-            new_weights.loc[short_assets] = -1 / (nShort * holding_period)
-            
-        new_weights_allocation.loc[date] = new_weights
+            new_weights.update(dict.fromkeys(short_assets, -1 / (nShort * holding_period)))
+        new_weights = pd.Series(new_weights, dtype=float)
+
+        new_weights_allocation[slot] = new_weights
 
         # Update portfolio weights
-        portfolio_weights.loc[date] += new_weights
+        portfolio_weights[new_weights.index] += new_weights
 
         # Handle very small weights by rounding
-        portfolio_weights.loc[date] = portfolio_weights.loc[date].round(10)
+        portfolio_weights = portfolio_weights.round(10)
 
         # Set very small weights to zero
         small_weight_threshold = 1e-8
-        mask = portfolio_weights.loc[date].abs() < small_weight_threshold
-        portfolio_weights.loc[date, mask] = 0.0
+        portfolio_weights[portfolio_weights.abs() < small_weight_threshold] = 0.0
 
         # Calculate turnover
-        if t > start_month:
-            turnover_series[date] = (portfolio_weights.loc[date] - portfolio_weights.loc[monthly_returns.index[t - 1]]).abs().sum()
+        turnover_series[date] = (portfolio_weights - previous_weights).abs().sum()
+
+        held = np.flatnonzero(portfolio_weights.to_numpy())
+        weight_rows[t] = (held, portfolio_weights.to_numpy()[held])
+
+    portfolio_weights = SparseWeights.from_rows(weight_rows, monthly_returns.index, monthly_returns.columns)
+    if not sparse_weights:
+        portfolio_weights = portfolio_weights.to_dense()
+
+    return _assemble_outputs(portfolio_weights, turnover_series, portfolio_returns, rf_monthly, nShort, trx_cost)
+
+
+@instrumented()
+def momentum_strategy_cost_sweep(price_data_daily, lookback_period, nLong, nShort, holding_period, rf_monthly, trx_costs=(0.0,), cost_schedules=None, drift=False):
+    """
+    Runs the momentum backtest once and returns net returns for many transaction cost assumptions.
+
+    Costs only enter after the weights are known, so every cost level reuses the same
+    weights and turnover instead of rerunning momentum_strategy per level.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of months to hold the positions before they roll off.
+    - rf_monthly: pd.Series, monthly risk-free rate (indexed by date).
+    - trx_costs: sequence of float, flat costs per unit of turnover. Columns are named 'trx_cost_<cost>'.
+    - cost_schedules: dict, optional mapping of column name to per-asset costs per unit traded,
+      either a pd.Series indexed by asset or a pd.DataFrame of months x assets. Assets that are
+      missing from a schedule are traded at zero cost.
+    - drift: bool, let positions drift with their returns until their cohort rolls off
+      (see drifted_weights) instead of resetting the weights to target every month. Returns
+      then come from the drifted holdings and trades are measured against them.
+
+    Returns:
+    - excess_returns: pd.DataFrame, net excess returns with one column per cost assumption.
+    - portfolio_returns: pd.DataFrame, net portfolio returns with one column per cost assumption.
+    - turnover_series: pd.DataFrame, turnover for each month.
+    """
+    cost_schedules = cost_schedules or {}
+    monthly_returns = compute_monthly_returns(price_data_daily)
+    if drift:
+        weights, pre_trade_weights, turnover, gross_returns = run_drift_backtest(
+            monthly_returns.to_numpy(dtype=float), lookback_period, nLong, nShort, holding_period
+        )
+    else:
+        weights, turnover, gross_returns = run_vectorized_backtest(
+            monthly_returns.to_numpy(dtype=float), lookback_period, nLong, nShort, holding_period
+        )
+        pre_trade_weights = None
+
+    schedules = []
+    for schedule in cost_schedules.values():
+        if isinstance(schedule, pd.DataFrame):
+            schedule = schedule.reindex(index=monthly_returns.index, columns=monthly_returns.columns)
         else:
-            turnover_series[date] = portfolio_weights.loc[date].abs().sum()
+            schedule = schedule.reindex(monthly_returns.columns)
+        schedules.append(schedule.fillna(0.0).to_numpy(dtype=float))
+
+    columns = [f'trx_cost_{trx}' for trx in trx_costs] + list(cost_schedules)
+    costs = pd.DataFrame(trading_costs(weights, trx_costs, schedules, pre_trade_weights), index=monthly_returns.index, columns=columns)
 
-    # Calculate portfolio returns
-    portfolio_returns = (portfolio_weights.shift(1) * monthly_returns).sum(axis=1)
+    portfolio_returns = pd.Series(gross_returns, index=monthly_returns.index)
+    excess_returns, _, turnover_series, _ = _assemble_outputs(
+        None, pd.Series(turnover, index=monthly_returns.index), portfolio_returns, rf_monthly, nShort, 0
+    )
+    net_excess_returns = costs.rsub(excess_returns['Strategy_Returns'], axis=0)
+    net_portfolio_returns = costs.rsub(portfolio_returns, axis=0)
 
+    return net_excess_returns, net_portfolio_returns, turnover_series
+
+
+@instrumented()
+def momentum_strategy_holding_periods(price_data_daily, lookback_period, nLong, nShort, holding_periods, rf_monthly, trx_cost):
+    """
+    Runs the momentum strategy for several holding periods from one ranking pass.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_periods: sequence of int, holding periods to evaluate.
+    - rf_monthly: pd.Series, monthly risk-free rate (indexed by date).
+    - trx_cost: float, cost per unit of turnover.
+
+    Returns:
+    - excess_returns: pd.DataFrame, strategy returns with one column per holding period.
+    - turnover_series: pd.DataFrame, turnover with one column per holding period.
+    - portfolio_returns: pd.DataFrame, portfolio returns with one column per holding period.
+    """
+    holding_periods = list(holding_periods)
+    monthly_returns = compute_monthly_returns(price_data_daily)
+    turnover, gross_returns = run_holding_period_backtests(
+        monthly_returns.to_numpy(dtype=float), lookback_period, nLong, nShort, holding_periods
+    )
+
+    excess_returns = {}
+    turnover_series = {}
+    portfolio_returns = {}
+    for j, holding_period in enumerate(holding_periods):
+        excess, _, turnover_h, portfolio = _assemble_outputs(
+            None,
+            pd.Series(turnover[:, j], index=monthly_returns.index),
+            pd.Series(gross_returns[:, j], index=monthly_returns.index),
+            rf_monthly,
+            nShort,
+            trx_cost
+        )
+        excess_returns[holding_period] = excess['Strategy_Returns']
+        turnover_series[holding_period] = turnover_h['Turnover']
+        portfolio_returns[holding_period] = portfolio['Portfolio_Returns']
+
+    return pd.DataFrame(excess_returns), pd.DataFrame(turnover_series), pd.DataFrame(portfolio_returns)
+
+
+@instrumented()
+def momentum_strategy_number_assets(price_data_daily, lookback_period, nLong_range, nShort_range, holding_period, rf_monthly, trx_cost):
+    """
+    Runs the momentum strategy for a grid of long and short leg sizes from one ranking pass.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong_range: sequence of int, numbers of assets to go long.
+    - nShort_range: sequence of int, numbers of assets to short (use [0] for long-only).
+    - holding_period: int, number of months to hold the positions before they roll off.
+    - rf_monthly: pd.Series, monthly risk-free rate (indexed by date).
+    - trx_cost: float, cost per unit of turnover.
+
+    Returns:
+    - excess_returns: pd.DataFrame, strategy returns with (nLong, nShort) column pairs.
+    - turnover_series: pd.DataFrame, turnover with (nLong, nShort) column pairs.
+    - portfolio_returns: pd.DataFrame, portfolio returns with (nLong, nShort) column pairs.
+    """
+    nLong_range = list(nLong_range)
+    nShort_range = list(nShort_range)
+    monthly_returns = compute_monthly_returns(price_data_daily)
+    turnover, gross_returns = run_top_k_backtests(
+        monthly_returns.to_numpy(dtype=float), lookback_period, nLong_range, nShort_range, holding_period
+    )
+
+    excess_returns = {}
+    turnover_series = {}
+    portfolio_returns = {}
+    for a, nLong in enumerate(nLong_range):
+        for b, nShort in enumerate(nShort_range):
+            excess, _, turnover_k, portfolio = _assemble_outputs(
+                None,
+                pd.Series(turnover[:, a, b], index=monthly_returns.index),
+                pd.Series(gross_returns[:, a, b], index=monthly_returns.index),
+                rf_monthly,
+                nShort,
+                trx_cost
+            )
+            excess_returns[(nLong, nShort)] = excess['Strategy_Returns']
+            turnover_series[(nLong, nShort)] = turnover_k['Turnover']
+            portfolio_returns[(nLong, nShort)] = portfolio['Portfolio_Returns']
+
+    names = ['nLong', 'nShort']
+    excess_returns = pd.DataFrame(excess_returns)
+    turnover_series = pd.DataFrame(turnover_series)
+    portfolio_returns = pd.DataFrame(portfolio_returns)
+    for frame in (excess_returns, turnover_series, portfolio_returns):
+        frame.columns.names = names
+    return excess_returns, turnover_series, portfolio_returns
+
+
+def _assemble_outputs(portfolio_weights, turnover_series, portfolio_returns, rf_monthly, nShort, trx_cost):
+    """
+    Builds the excess return, weight, turnover and return frames returned by momentum_strategy.
+
+    Parameters:
+    - portfolio_weights: pd.DataFrame or SparseWeights, weights allocated to each asset over time.
+    - turnover_series: pd.Series, turnover for each month.
+    - portfolio_returns: pd.Series, gross portfolio return for each month.
+    - rf_monthly: pd.Series or pd.DataFrame, monthly risk-free rate (indexed by date).
+    - nShort: int, number of assets to short (long-only returns are reported in excess of rf).
+    - trx_cost: float, cost per unit of turnover.
+
+    Returns:
+    - excess_returns, portfolio_weights, turnover_series, portfolio_returns as in momentum_strategy.
+    """
     # Align rf_monthly with portfolio_returns index
     rf_monthly_aligned = rf_monthly.reindex(portfolio_returns.index).fillna(0.0)
 
-    # Ensure both are a Series
+    # Ensure rf is a Series
     if isinstance(rf_monthly_aligned, pd.DataFrame):
         rf_monthly_aligned = rf_monthly_aligned.iloc[:, 0]
-    if isinstance(rf_monthly_aligned, pd.Series):
-        rf_monthly_aligned = rf_monthly_aligned.to_frame()
-        rf_monthly_aligned.columns = ['rf']         
-    if isinstance(portfolio_returns, pd.Series):
-        portfolio_returns = portfolio_returns.to_frame()
-        portfolio_returns.columns = ['Portfolio_Returns']      
-    
-    # Rename
-    rf_monthly_aligned.columns = ['rf']
-    portfolio_returns.columns = ['Portfolio_Returns']
 
     # Calculate excess returns
     if nShort == 0:
-        excess_returns = portfolio_returns['Portfolio_Returns'] - rf_monthly_aligned['rf']
-        
+        excess_returns = portfolio_returns - rf_monthly_aligned
     else:
         excess_returns = portfolio_returns.copy()
-        
-    if isinstance(excess_returns, pd.Series):
-        excess_returns = excess_returns.to_frame()
-        excess_returns.columns = ['Strategy_Returns']
-    if isinstance(portfolio_weights, pd.Series):
-        portfolio_weights = portfolio_weights.to_frame()
-    if isinstance(turnover_series, pd.Series):
-        turnover_series = turnover_series.to_frame()
-    if isinstance(monthly_returns, pd.Series):
-        monthly_returns = monthly_returns.to_frame()
-    if isinstance(portfolio_returns, pd.Series):
-        portfolio_returns = portfolio_returns.to_frame()
-    
-    excess_returns.columns = ['Strategy_Returns']
-    turnover_series.columns = ['Turnover']
-    portfolio_returns.columns = ['Portfolio_Returns']
-    
-    if isinstance(excess_returns, pd.Series):
-        excess_returns = excess_returns.to_frame()
-        excess_returns.columns = ['Strategy_Returns']
-        
+
     # subtract trx cost
-    excess_returns.columns = ['Strategy_Returns']
-    excess_returns = excess_returns['Strategy_Returns'] - turnover_series['Turnover'] * trx_cost
-    portfolio_returns = portfolio_returns['Portfolio_Returns'] - turnover_series['Turnover'] * trx_cost
-    
-    if isinstance(excess_returns, pd.Series):
-        excess_returns = excess_returns.to_frame()
-        excess_returns.columns = ['Strategy_Returns']
-    if isinstance(portfolio_returns, pd.Series):
-        portfolio_returns = portfolio_returns.to_frame()
-        portfolio_returns.columns = ['Portfolio_Returns']        
-    
-        
+    excess_returns = excess_returns - turnover_series * trx_cost
+    portfolio_returns = portfolio_returns - turnover_series * trx_cost
+
+    excess_returns = excess_returns.to_frame(name='Strategy_Returns')
+    turnover_series = turnover_series.to_frame(name='Turnover')
+    portfolio_returns = portfolio_returns.to_frame(name='Portfolio_Returns')
+
     return excess_returns, portfolio_weights, turnover_series, portfolio_returns
@@ -0,0 +1,346 @@
+# src/analysis/online_backtest.py
+
+import json
+
+import numpy as np
+import pandas as pd
+from src.analysis.vectorized_backtest import SMALL_WEIGHT_THRESHOLD, rank_assets
+
+# Version of the checkpoint layout written by MomentumState.save (version 1 had no pending prices)
+CHECKPOINT_VERSION = 2
+SUPPORTED_CHECKPOINT_VERSIONS = (1, 2)
+
+
+class MomentumState:
+    """
+    Resumable state of the momentum backtest, advanced one month at a time.
+
+    The state keeps only what the next month needs: the last (forward-filled) month-end
+    prices, running sums of log returns, missing and wiped-out months over the last
+    lookback_period + 1 months, the cohorts formed in the last holding_period months, the
+    current weights and running statistics of the net excess returns. append therefore
+    costs the same for every month, however long the history is, and reproduces the
+    weights, turnover and returns of momentum_strategy (engine="loop") on the full history.
+
+    A month is only processed once it is complete: daily prices that end before the last
+    business day of their month are held back until prices of a later month arrive (or
+    append is called with close_month=True), so a month-end is never taken from a
+    mid-month price.
+
+    Attributes:
+    - assets: pd.Index, asset universe (fixed when the state is created).
+    - lookback_period, nLong, nShort, holding_period: int, strategy parameters.
+    - trx_cost: float, cost per unit of turnover.
+    - n_months: int, months processed so far.
+    - last_date: pd.Timestamp, last month-end processed (None before the first month).
+    - weights: np.ndarray, current portfolio weights per asset.
+    - pending_prices: pd.DataFrame, daily prices of the incomplete month held back (None if there are none).
+    - statistics: dict, running count, sum and sum of squares of the net excess returns and total turnover.
+    """
+
+    def __init__(self, assets, lookback_period, nLong, nShort, holding_period, trx_cost=0.0):
+        self.assets = pd.Index(assets)
+        self.lookback_period = int(lookback_period)
+        self.nLong = int(nLong)
+        self.nShort = int(nShort)
+        self.holding_period = int(holding_period)
+        self.trx_cost = float(trx_cost)
+
+        n_assets = len(self.assets)
+        self.n_months = 0
+        self.last_date = None
+        self.last_prices = np.full(n_assets, np.nan)
+        self.weights = np.zeros(n_assets)
+        self.pending_prices = None
+        # Prefix sums over months [0, k) for the last lookback_period + 1 values of k, slot k % (lookback_period + 1)
+        self.log_prefix = np.zeros((self.lookback_period + 1, n_assets))
+        self.missing_prefix = np.zeros((self.lookback_period + 1, n_assets), dtype=np.int64)
+        self.wiped_prefix = np.zeros((self.lookback_period + 1, n_assets), dtype=np.int64)
+        # Cohort formed in month t in slot t % holding_period as (asset positions, weights), None if skipped
+        self.cohorts = [None] * self.holding_period
+        self.statistics = {"count": 0, "sum": 0.0, "sum_sq": 0.0, "turnover": 0.0}
+
+    @classmethod
+    def from_prices(cls, price_data_daily, rf_monthly, lookback_period, nLong, nShort, holding_period, trx_cost=0.0,
+                    close_month=False):
+        """
+        Builds the state by replaying a price history.
+
+        Parameters:
+        - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset.
+        - rf_monthly: pd.Series or pd.DataFrame, monthly risk-free rate (indexed by date).
+        - lookback_period, nLong, nShort, holding_period, trx_cost: strategy parameters.
+        - close_month: bool, treat a history ending mid-month as complete (as momentum_strategy
+          does) instead of holding its last month back.
+
+        Returns:
+        - state: MomentumState, advanced to the last complete month of the history.
+        - outputs: excess_returns, portfolio_weights, turnover_series, portfolio_returns for
+          the whole history, as returned by append.
+        """
+        state = cls(price_data_daily.columns, lookback_period, nLong, nShort, holding_period, trx_cost)
+        outputs = state.append(price_data_daily, rf_monthly, close_month=close_month)
+        return state, outputs
+
+    def append(self, new_prices, rf=None, close_month=False):
+        """
+        Advances the backtest by the months in new_prices.
+
+        Parameters:
+        - new_prices: pd.DataFrame of daily prices for one or more months after last_date
+          (the last price of each month is used), or a pd.Series of month-end prices named
+          by its date. Days already held back are replaced by new prices for the same days.
+        - rf: float, or pd.Series / pd.DataFrame of monthly risk-free rates indexed by date.
+          Missing rates count as zero, as in momentum_strategy.
+        - close_month: bool, process the last month of new_prices even if its prices end
+          before the month's last business day. A Series of month-end prices is always
+          treated as complete.
+
+        Returns:
+        - excess_returns: pd.DataFrame, net excess returns ('Strategy_Returns') of the newly completed months.
+        - portfolio_weights: pd.DataFrame, weights at the end of each new month.
+        - turnover_series: pd.DataFrame, turnover ('Turnover') of the new months.
+        - portfolio_returns: pd.DataFrame, net portfolio returns ('Portfolio_Returns') of the new months.
+
+        Raises:
+        - ValueError: If new_prices has unknown assets or months that were already processed.
+        """
+        monthly_prices, pending_prices = self._month_end_prices(new_prices, close_month)
+        self.pending_prices = pending_prices
+        if isinstance(rf, pd.DataFrame):
+            rf = rf.iloc[:, 0]
+
+        rows = []
+        weight_rows = []
+        for date, prices in zip(monthly_prices.index, monthly_prices.to_numpy(dtype=float)):
+            if isinstance(rf, pd.Series):
+                rate = rf.get(date, 0.0)
+                rate = 0.0 if pd.isna(rate) else float(rate)
+            else:
+                rate = 0.0 if rf is None else float(rf)
+            rows.append(self._step(date, prices, rate))
+            weight_rows.append(self.weights.copy())
+
+        index = pd.DatetimeIndex([row[0] for row in rows], name=monthly_prices.index.name)
+        portfolio_weights = pd.DataFrame(np.array(weight_rows).reshape(len(rows), len(self.assets)), index=index, columns=self.assets)
+        excess_returns = pd.DataFrame({'Strategy_Returns': [row[3] for row in rows]}, index=index)
+        turnover_series = pd.DataFrame({'Turnover': [row[1] for row in rows]}, index=index)
+        portfolio_returns = pd.DataFrame({'Portfolio_Returns': [row[2] for row in rows]}, index=index)
+        return excess_returns, portfolio_weights, turnover_series, portfolio_returns
+
+    def _month_end_prices(self, new_prices, close_month):
+        """
+        Month-end prices of the completed months, with all-missing rows for skipped months,
+        and the daily prices of an incomplete trailing month to hold back.
+        """
+        if isinstance(new_prices, pd.Series):
+            new_prices = new_prices.to_frame().T
+            new_prices.index = pd.DatetimeIndex(new_prices.index)
+            close_month = True
+        unknown = new_prices.columns.difference(self.assets)
+        if len(unknown) > 0:
+            raise ValueError(f"Assets {list(unknown[:5])} are not part of the backtest universe.")
+
+        new_prices = new_prices.reindex(columns=self.assets).sort_index()
+        if self.pending_prices is not None:
+            held = self.pending_prices[self.pending_prices.index < new_prices.index[0]]
+            new_prices = pd.concat([held, new_prices])
+
+        monthly_prices = new_prices.resample('ME').last()
+        if self.last_date is not None and monthly_prices.index[0] <= self.last_date:
+            raise ValueError(f"Prices for {monthly_prices.index[0].date()} were already processed.")
+
+        # The trailing month is complete once its prices reach the month's last business day
+        last_day = new_prices.index[-1].normalize()
+        last_business_day = pd.offsets.BMonthEnd().rollback(last_day + pd.offsets.MonthEnd(0))
+        pending_prices = None
+        if not close_month and last_day < last_business_day:
+            pending_prices = new_prices[new_prices.index.to_period('M') == last_day.to_period('M')]
+            monthly_prices = monthly_prices.iloc[:-1]
+
+        if self.last_date is not None and len(monthly_prices) > 0:
+            # Months without any prices between two appends, as resampling the full history would produce
+            gap = pd.date_range(self.last_date, monthly_prices.index[0], freq='ME')[1:-1]
+            if len(gap) > 0:
+                monthly_prices = pd.concat([pd.DataFrame(np.nan, index=gap, columns=self.assets), monthly_prices])
+        return monthly_prices, pending_prices
+
+    def _step(self, date, prices, rate):
+        """
+        Processes one month: returns, ranking, cohort roll-over and statistics.
+        """
+        t = self.n_months
+        L = self.lookback_period
+
+        # Monthly return from forward-filled month-end prices, clipped as in monthly_returns_from_prices
+        filled = np.where(np.isnan(prices), self.last_prices, prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.clip(filled / self.last_prices - 1, -0.5, 0.5)
+        self.last_prices = filled
+
+        # Formation window [t - L, t) from the prefix sums before adding this month
+        if t >= L:
+            current, oldest = t % (L + 1), (t - L) % (L + 1)
+            window_missing = self.missing_prefix[current] - self.missing_prefix[oldest]
+            window_wiped = self.wiped_prefix[current] - self.wiped_prefix[oldest]
+            scores = np.expm1(self.log_prefix[current] - self.log_prefix[oldest])
+            scores[window_wiped > 0] = -1.0
+            valid = (window_missing == 0) & ~np.isnan(returns)
+
+        # Extend the prefix sums with this month (sequential sums, as np.cumsum)
+        missing = np.isnan(returns)
+        wiped_out = ~missing & (returns <= -1)
+        current, following = t % (L + 1), (t + 1) % (L + 1)
+        self.log_prefix[following] = self.log_prefix[current] + np.log1p(np.where(missing | wiped_out, 0.0, returns))
+        self.missing_prefix[following] = self.missing_prefix[current] + missing
+        self.wiped_prefix[following] = self.wiped_prefix[current] + wiped_out
+
+        portfolio_return = 0.0
+        turnover = 0.0
+        if t >= L:
+            previous_weights = self.weights
+            # Returns earned by last month's weights (missing returns contribute zero)
+            portfolio_return = float(np.where(np.isnan(returns), 0.0, previous_weights * returns).sum())
+            slot = t % self.holding_period
+            if not valid.any():
+                # Keep the weights and form no cohort this month
+                self.cohorts[slot] = None
+            else:
+                order, n_valid = rank_assets(scores[None, :], valid[None, :])
+                ranked = order[0, :n_valid[0]]
+                new_weights = {}
+                if self.nLong != 0:
+                    new_weights.update(dict.fromkeys(ranked[:self.nLong].tolist(), 1 / (self.nLong * self.holding_period)))
+                if self.nShort != 0:
+                    new_weights.update(dict.fromkeys(ranked[-self.nShort:].tolist(), -1 / (self.nShort * self.holding_period)))
+                cohort = (np.fromiter(new_weights.keys(), dtype=np.int64, count=len(new_weights)),
+                          np.fromiter(new_weights.values(), dtype=float, count=len(new_weights)))
+
+                weights = previous_weights.copy()
+                if self.cohorts[slot] is not None:
+                    weights[self.cohorts[slot][0]] -= self.cohorts[slot][1]
+                self.cohorts[slot] = cohort
+                weights[cohort[0]] += cohort[1]
+                weights = np.round(weights, 10)
+                weights[np.abs(weights) < SMALL_WEIGHT_THRESHOLD] = 0.0
+
+                turnover = float(np.abs(weights - previous_weights).sum())
+                self.weights = weights
+
+        # Net returns as in _assemble_outputs: long-only returns are reported in excess of rf
+        excess_return = portfolio_return - rate if self.nShort == 0 else portfolio_return
+        excess_return -= turnover * self.trx_cost
+        portfolio_return -= turnover * self.trx_cost
+
+        self.statistics["count"] += 1
+        self.statistics["sum"] += excess_return
+        self.statistics["sum_sq"] += excess_return ** 2
+        self.statistics["turnover"] += turnover
+
+        self.n_months += 1
+        self.last_date = pd.Timestamp(date)
+        return self.last_date, turnover, portfolio_return, excess_return
+
+    def summary(self, annualization_factor=12):
+        """
+        Running performance of the net excess returns so far.
+
+        Returns:
+        - dict: 'Months', 'Monthly_Excess_Return', 'Std_Dev_of_Excess_Returns',
+          'Sharpe_Ratio_Arithmetic' (defined as in summarize_performance) and 'Average_Turnover'.
+        """
+        n = self.statistics["count"]
+        mean = self.statistics["sum"] / n if n else np.nan
+        variance = (self.statistics["sum_sq"] - n * mean ** 2) / (n - 1) if n > 1 else np.nan
+        std = np.sqrt(max(variance, 0.0)) if n > 1 else np.nan
+        return {
+            'Months': n,
+            'Monthly_Excess_Return': mean,
+            'Std_Dev_of_Excess_Returns': std,
+            'Sharpe_Ratio_Arithmetic': mean / std * np.sqrt(annualization_factor) if n > 1 and std > 0 else np.nan,
+            'Average_Turnover': self.statistics["turnover"] / n if n else np.nan,
+        }
+
+    @property
+    def weights_series(self):
+        """Current weights indexed by asset."""
+        return pd.Series(self.weights, index=self.assets)
+
+    def save(self, path):
+        """
+        Writes a checkpoint (numpy .npz with JSON metadata, no pickled objects).
+
+        Asset labels keep their dtype when the universe is a numeric or datetime index;
+        otherwise they must be strings.
+
+        Raises:
+        - ValueError: If the asset labels cannot be stored without pickling.
+        """
+        if self.assets.dtype == object:
+            if not all(isinstance(asset, str) for asset in self.assets):
+                raise ValueError("Asset labels must be strings, or all of one numeric or datetime type, to be saved.")
+            assets = np.array(self.assets.tolist(), dtype=str)
+        else:
+            assets = np.asarray(self.assets)
+        pending = self.pending_prices if self.pending_prices is not None else pd.DataFrame(columns=self.assets, dtype=float)
+        present = np.array([cohort is not None for cohort in self.cohorts])
+        cohorts = [cohort if cohort is not None else (np.zeros(0, dtype=np.int64), np.zeros(0)) for cohort in self.cohorts]
+        cohort_indptr = np.zeros(len(cohorts) + 1, dtype=np.int64)
+        np.cumsum([len(indices) for indices, _ in cohorts], out=cohort_indptr[1:])
+        metadata = {
+            "version": CHECKPOINT_VERSION,
+            "lookback_period": self.lookback_period,
+            "nLong": self.nLong,
+            "nShort": self.nShort,
+            "holding_period": self.holding_period,
+            "trx_cost": self.trx_cost,
+            "n_months": self.n_months,
+            "last_date": None if self.last_date is None else self.last_date.isoformat(),
+            "statistics": self.statistics,
+        }
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                metadata=np.array(json.dumps(metadata)),
+                assets=assets,
+                last_prices=self.last_prices,
+                weights=self.weights,
+                log_prefix=self.log_prefix,
+                missing_prefix=self.missing_prefix,
+                wiped_prefix=self.wiped_prefix,
+                cohort_present=present,
+                cohort_indptr=cohort_indptr,
+                cohort_indices=np.concatenate([indices for indices, _ in cohorts]),
+                cohort_values=np.concatenate([values for _, values in cohorts]),
+                pending_dates=pending.index.to_numpy(dtype='datetime64[ns]'),
+                pending_prices=pending.to_numpy(dtype=float),
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a checkpoint written by save.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata["version"] not in SUPPORTED_CHECKPOINT_VERSIONS:
+                raise ValueError(f"Unsupported checkpoint version {metadata['version']}.")
+            state = cls(pd.Index(data["assets"]), metadata["lookback_period"], metadata["nLong"], metadata["nShort"],
+                        metadata["holding_period"], metadata["trx_cost"])
+            state.n_months = metadata["n_months"]
+            state.last_date = None if metadata["last_date"] is None else pd.Timestamp(metadata["last_date"])
+            state.statistics = metadata["statistics"]
+            state.last_prices = data["last_prices"]
+            state.weights = data["weights"]
+            state.log_prefix = data["log_prefix"]
+            state.missing_prefix = data["missing_prefix"]
+            state.wiped_prefix = data["wiped_prefix"]
+            indptr, indices, values = data["cohort_indptr"], data["cohort_indices"], data["cohort_values"]
+            state.cohorts = [
+                (indices[indptr[k]:indptr[k + 1]], values[indptr[k]:indptr[k + 1]]) if data["cohort_present"][k] else None
+                for k in range(state.holding_period)
+            ]
+            if "pending_dates" in data.files and len(data["pending_dates"]) > 0:
+                state.pending_prices = pd.DataFrame(data["pending_prices"], columns=state.assets,
+                                                    index=pd.DatetimeIndex(data["pending_dates"]))
+        return state
@@ -0,0 +1,290 @@
+# src/analysis/parameter_sweep.py
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from src.analysis.bootstrap import BOOTSTRAP_METRICS, bootstrap_confidence_intervals
+from src.analysis.instrumentation import instrumented
+from src.analysis.market_data import MarketData
+from src.analysis.momentum_strategy_backtest import compute_monthly_returns, _assemble_outputs
+from src.analysis.summarize_performance import summarize_performance_batch
+from src.analysis.vectorized_backtest import rank_cross_sections, top_k_backtests
+
+SWEEP_PARAMETERS = ("lookback_period", "nLong", "nShort", "holding_period", "trx_cost")
+
+# Per-process state set up once by _init_worker
+_WORKER_STATE = {}
+
+
+def expand_param_grid(param_grid):
+    """
+    Expands a parameter grid into a list of configurations.
+
+    Parameters:
+    - param_grid (dict or list): Either a dict mapping parameter names to iterables of values
+      (the cartesian product is taken) or a list of dicts with one configuration each.
+
+    Returns:
+    - list of dict: One dict per configuration.
+    """
+    if isinstance(param_grid, dict):
+        names = list(param_grid)
+        configs = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    else:
+        configs = [dict(config) for config in param_grid]
+
+    for config in configs:
+        unknown = set(config) - set(SWEEP_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters {sorted(unknown)}. Choose from {SWEEP_PARAMETERS}.")
+    return configs
+
+
+def _attach_shared_array(name, shape, dtype):
+    """
+    Attaches to an existing shared memory block and returns it with a read-only array view.
+    """
+    # Pool workers share the parent's resource tracker, which unlinks the block only once
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    array.flags.writeable = False
+    return shm, array
+
+
+def _init_worker(shm_name, shape, dtype, index, rf_monthly, factor_xs_returns, annualization_factor, metrics):
+    shm, monthly_returns = _attach_shared_array(shm_name, shape, dtype)
+    _WORKER_STATE.update(
+        shm=shm,
+        monthly_returns=monthly_returns,
+        index=index,
+        rf_monthly=rf_monthly,
+        factor_xs_returns=factor_xs_returns,
+        annualization_factor=annualization_factor,
+        metrics=metrics,
+    )
+
+
+def group_configs(configs):
+    """
+    Groups configurations that share a ranking, i.e. have the same lookback_period.
+
+    Parameters:
+    - configs (list of dict): Full configurations.
+
+    Returns:
+    - list of list: Groups of (position, config) pairs, in order of first appearance.
+    """
+    groups = {}
+    for position, config in enumerate(configs):
+        groups.setdefault(config["lookback_period"], []).append((position, config))
+    return list(groups.values())
+
+
+def _evaluate_group(group):
+    """
+    Backtests one group of configurations on the worker's shared return matrix and summarizes them.
+
+    The cross-sections are ranked once for the whole group. For each holding period, all
+    nLong x nShort combinations come out of one top-k pass and all cost levels reuse the
+    same turnover. The group's statistics come out of one summarize_performance_batch call.
+    """
+    state = _WORKER_STATE
+    monthly_returns = state["monthly_returns"]
+    lookback_period = group[0][1]["lookback_period"]
+    order, n_valid, skipped = rank_cross_sections(monthly_returns, lookback_period)
+
+    by_holding_period = {}
+    for position, config in group:
+        by_holding_period.setdefault(config["holding_period"], []).append((position, config))
+
+    evaluated = []
+    excess_columns = []
+    for holding_period, members in by_holding_period.items():
+        long_counts = sorted({config["nLong"] for _, config in members})
+        short_counts = sorted({config["nShort"] for _, config in members})
+        turnover, gross_returns = top_k_backtests(
+            monthly_returns, order, n_valid, skipped, long_counts, short_counts, holding_period
+        )
+        for position, config in members:
+            a = long_counts.index(config["nLong"])
+            b = short_counts.index(config["nShort"])
+            excess_returns, _, _, _ = _assemble_outputs(
+                None,
+                pd.Series(turnover[:, a, b], index=state["index"]),
+                pd.Series(gross_returns[:, a, b], index=state["index"]),
+                state["rf_monthly"],
+                config["nShort"],
+                config["trx_cost"],
+            )
+            evaluated.append((position, config))
+            excess_columns.append(excess_returns.iloc[:, 0].to_numpy())
+
+    # Summarize the whole group in one vectorized pass
+    excess_returns = pd.DataFrame(np.column_stack(excess_columns), index=state["index"], columns=range(len(evaluated)))
+    if state["metrics"] is not None and len(state["metrics"]) == 0:
+        rows = [(position, dict(config)) for position, config in evaluated]
+    else:
+        stats = summarize_performance_batch(excess_returns, state["rf_monthly"], state["factor_xs_returns"],
+                                            state["annualization_factor"], metrics=state["metrics"])
+        rows = [(position, {**config, **stats.iloc[i].to_dict()}) for i, (position, config) in enumerate(evaluated)]
+    excess_returns.columns = [position for position, _ in evaluated]
+    return rows, excess_returns
+
+
+@instrumented()
+def run_parameter_sweep(price_data_daily, param_grid, rf_monthly, factor_xs_returns, lookback_period=6, nLong=20,
+                        nShort=0, holding_period=6, trx_cost=0, annualization_factor=12, n_jobs=None, metrics=None,
+                        bootstrap_draws=0, bootstrap_block_length=6, bootstrap_seed=0):
+    """
+    Backtests and summarizes the momentum strategy for every configuration of a parameter grid.
+
+    Monthly returns are computed once and placed in a shared memory block that all worker
+    processes map read-only, so only the small configuration dicts and results are pickled.
+    Configurations with the same lookback_period are evaluated together from one ranking
+    pass (see group_configs), with every nLong x nShort combination of a holding period
+    coming out of a single top-k pass.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - param_grid: dict or list, parameters to vary (see expand_param_grid). Allowed names are
+      lookback_period, nLong, nShort, holding_period and trx_cost.
+    - rf_monthly: pd.DataFrame, monthly risk-free rate (indexed by date). May be None for a MarketData.
+    - factor_xs_returns: pd.DataFrame, benchmark excess returns used in summarize_performance.
+      May be None for a MarketData, whose benchmark excess returns are used.
+    - lookback_period, nLong, nShort, holding_period, trx_cost: values used for parameters
+      that are not part of the grid.
+    - annualization_factor: int, periods per year.
+    - n_jobs: int, number of worker processes. None uses all CPUs, 1 runs in-process.
+    - metrics: iterable of str, statistics to compute (see PERFORMANCE_METRICS). All if None;
+      statistics that the requested ones do not depend on are skipped.
+    - bootstrap_draws: int, if positive, adds stationary bootstrap 95% confidence intervals
+      ('<metric>_CI_Lower', '<metric>_CI_Upper') for the requested metrics in BOOTSTRAP_METRICS.
+      All configurations share the same resampled months; the draws run on n_jobs processes.
+    - bootstrap_block_length: float, mean block length of the bootstrap in months.
+    - bootstrap_seed: int, seed of the bootstrap.
+
+    Returns:
+    - pd.DataFrame: One row per configuration with the parameters followed by the
+      flattened performance statistics.
+    """
+    configs = _full_configs(param_grid, lookback_period, nLong, nShort, holding_period, trx_cost)
+    if isinstance(price_data_daily, MarketData):
+        if rf_monthly is None:
+            rf_monthly = price_data_daily.rf_monthly
+        if factor_xs_returns is None:
+            factor_xs_returns = price_data_daily.benchmark_xs_returns_monthly
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    results = _run_groups(price_data_daily, configs, rf_monthly, factor_xs_returns, annualization_factor, n_jobs, metrics)
+
+    table = _collect_rows([rows for rows, _ in results])
+    if bootstrap_draws > 0:
+        bootstrap_metrics = [m for m in BOOTSTRAP_METRICS if metrics is None or m in metrics]
+        if bootstrap_metrics:
+            excess_returns = pd.concat([excess for _, excess in results], axis=1).sort_index(axis=1)
+            intervals = bootstrap_confidence_intervals(
+                excess_returns, rf_monthly, factor_xs_returns, annualization_factor, n_draws=bootstrap_draws,
+                block_length=bootstrap_block_length, metrics=bootstrap_metrics, seed=bootstrap_seed, n_jobs=n_jobs,
+            )
+            bounds = [column for column in intervals.columns if column not in bootstrap_metrics]
+            table = table.join(intervals[bounds])
+    return table
+
+
+def _full_configs(param_grid, lookback_period, nLong, nShort, holding_period, trx_cost):
+    """
+    Expands a parameter grid and fills in the parameters it does not vary.
+    """
+    base_config = {
+        "lookback_period": lookback_period,
+        "nLong": nLong,
+        "nShort": nShort,
+        "holding_period": holding_period,
+        "trx_cost": trx_cost,
+    }
+    return [{**base_config, **config} for config in expand_param_grid(param_grid)]
+
+
+def _run_groups(price_data_daily, configs, rf_monthly, factor_xs_returns, annualization_factor, n_jobs, metrics):
+    """
+    Evaluates all configuration groups, in-process or on worker processes sharing the return matrix.
+
+    Returns:
+    - list: (rows, excess_returns) per group, see _evaluate_group.
+    """
+    groups = group_configs(configs)
+    monthly_returns = compute_monthly_returns(price_data_daily)
+    values = np.ascontiguousarray(monthly_returns.to_numpy(dtype=float))
+    n_jobs = max(1, min(n_jobs, len(groups)))
+
+    if n_jobs == 1:
+        _WORKER_STATE.update(
+            monthly_returns=values,
+            index=monthly_returns.index,
+            rf_monthly=rf_monthly,
+            factor_xs_returns=factor_xs_returns,
+            annualization_factor=annualization_factor,
+            metrics=metrics,
+        )
+        try:
+            return [_evaluate_group(group) for group in groups]
+        finally:
+            _WORKER_STATE.clear()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        initargs = (shm.name, values.shape, values.dtype, monthly_returns.index,
+                    rf_monthly, factor_xs_returns, annualization_factor, metrics)
+        chunksize = max(1, len(groups) // (4 * n_jobs))
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs) as executor:
+            return list(executor.map(_evaluate_group, groups, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@instrumented()
+def sweep_excess_returns(price_data_daily, param_grid, rf_monthly, lookback_period=6, nLong=20, nShort=0,
+                         holding_period=6, trx_cost=0, n_jobs=None):
+    """
+    Backtests every configuration of a parameter grid and returns the monthly net excess returns.
+
+    Uses the same grouped, shared-memory backtests as run_parameter_sweep but skips the
+    performance statistics, e.g. to evaluate the configurations on many windows afterwards.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - param_grid: dict or list, parameters to vary (see expand_param_grid).
+    - rf_monthly: pd.DataFrame, monthly risk-free rate (indexed by date). May be None for a MarketData.
+    - lookback_period, nLong, nShort, holding_period, trx_cost: values used for parameters
+      that are not part of the grid.
+    - n_jobs: int, number of worker processes. None uses all CPUs, 1 runs in-process.
+
+    Returns:
+    - configs: pd.DataFrame, one row per configuration with its parameters.
+    - excess_returns: pd.DataFrame, months x configurations net excess returns, with the
+      row positions of configs as column labels.
+    """
+    configs = _full_configs(param_grid, lookback_period, nLong, nShort, holding_period, trx_cost)
+    if isinstance(price_data_daily, MarketData) and rf_monthly is None:
+        rf_monthly = price_data_daily.rf_monthly
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    # No statistics are needed, so the summary step is skipped
+    results = _run_groups(price_data_daily, configs, rf_monthly, None, 12, n_jobs, metrics=[])
+    excess_returns = pd.concat([excess for _, excess in results], axis=1).sort_index(axis=1)
+    return pd.DataFrame(configs), excess_returns
+
+
+def _collect_rows(results):
+    """
+    Flattens per-group results into a table in the original grid order.
+    """
+    rows = sorted((row for group_rows in results for row in group_rows), key=lambda item: item[0])
+    return pd.DataFrame([row for _, row in rows])
@@ -1,26 +1,44 @@
 # src/analysis/robustness_checks.py
 
-import pandas as pd
-from src.analysis.momentum_strategy_backtest import momentum_strategy
-from src.analysis.summarize_performance import summarize_performance
+from src.analysis.momentum_strategy_backtest import momentum_strategy_cost_sweep
+from src.analysis.parameter_sweep import run_parameter_sweep
 from src.visualization.plotRobustnessChecks import plotRobustnessChecks
 from src.visualization.plotPerformance import plot_cumulative_returns
 
-def run_holding_period_check(price_data_daily, lookback_period, nLong, rf_monthly, spi_XsReturns_monthly, visualization_path):
-    rc_holding_period = pd.DataFrame(index=range(1, 13), columns=['Sharpe_Ratio'])
-    for i in range(1, 13):
-        excess_returns_temp, _, _, _ = momentum_strategy(
-            price_data_daily=price_data_daily,
-            lookback_period=lookback_period,
-            nLong=nLong,
-            nShort=0,
-            holding_period=i,
-            rf_monthly=rf_monthly,
-            trx_cost=0
-        )
-        excess_returns_temp.columns = ['Strategy_Returns']
-        stats_temp = summarize_performance(excess_returns_temp, rf_monthly, spi_XsReturns_monthly, 12)
-        rc_holding_period.loc[i, 'Sharpe_Ratio'] = stats_temp['Sharpe_Ratio_Arithmetic']['xs_Return']
+def _sharpe_ratios(sweep, parameter):
+    """
+    Extracts the arithmetic Sharpe ratio per value of the swept parameter from a sweep table.
+    """
+    rc = sweep.set_index(parameter)[['Sharpe_Ratio_Arithmetic']]
+    rc.columns = ['Sharpe_Ratio']
+    return rc
+
+def _sharpe_ratio_bands(sweep, parameter):
+    """
+    Extracts the bootstrap confidence interval of the Sharpe ratio from a sweep table, if it was computed.
+    """
+    bounds = ['Sharpe_Ratio_Arithmetic_CI_Lower', 'Sharpe_Ratio_Arithmetic_CI_Upper']
+    if not set(bounds) <= set(sweep.columns):
+        return None
+    return sweep.set_index(parameter)[bounds]
+
+def run_holding_period_check(price_data_daily, lookback_period, nLong, rf_monthly, spi_XsReturns_monthly, visualization_path, n_jobs=None, bootstrap_draws=10000):
+    sweep = run_parameter_sweep(
+        price_data_daily=price_data_daily,
+        param_grid={'holding_period': range(1, 13)},
+        rf_monthly=rf_monthly,
+        factor_xs_returns=spi_XsReturns_monthly,
+        lookback_period=lookback_period,
+        nLong=nLong,
+        nShort=0,
+        trx_cost=0,
+        annualization_factor=12,
+        n_jobs=n_jobs,
+        metrics=['Sharpe_Ratio_Arithmetic'],
+        bootstrap_draws=bootstrap_draws
+    )
+    rc_holding_period = _sharpe_ratios(sweep, 'holding_period')
+    bands = _sharpe_ratio_bands(sweep, 'holding_period')
 
     plotRobustnessChecks(
         rc_holding_period,
@@ -29,25 +47,27 @@ def run_holding_period_check(price_data_daily, lookback_period, nLong, rf_monthl
         x_label='Holding Period',
         y_label='Sharpe Ratio',
         savefig=True,
-        filename=visualization_path / 'rc_holding_period.png'
+        filename=visualization_path / 'rc_holding_period.png',
+        bands=bands
     )
 
-def run_lookback_period_check(price_data_daily, lookback_period_range, nLong, nShort, holding_period, rf_monthly, spi_XsReturns_monthly, visualization_path):
-    rc_lookback_period = pd.DataFrame(index=lookback_period_range, columns=['Sharpe_Ratio'])
-    for i in lookback_period_range:
-        excess_returns_temp, _, _, _ = momentum_strategy(
-            price_data_daily=price_data_daily,
-            lookback_period=i,
-            nLong=nLong,
-            nShort=nShort,
-            holding_period=holding_period,
-            rf_monthly=rf_monthly,
-            trx_cost=0
-        )
-        excess_returns_temp.columns = ['Strategy_Returns']
-        stats_temp = summarize_performance(excess_returns_temp, rf_monthly, spi_XsReturns_monthly, 12)
-        rc_lookback_period.loc[i, 'Sharpe_Ratio'] = stats_temp['Sharpe_Ratio_Arithmetic']['xs_Return']
-
+def run_lookback_period_check(price_data_daily, lookback_period_range, nLong, nShort, holding_period, rf_monthly, spi_XsReturns_monthly, visualization_path, n_jobs=None, bootstrap_draws=10000):
+    sweep = run_parameter_sweep(
+        price_data_daily=price_data_daily,
+        param_grid={'lookback_period': lookback_period_range},
+        rf_monthly=rf_monthly,
+        factor_xs_returns=spi_XsReturns_monthly,
+        nLong=nLong,
+        nShort=nShort,
+        holding_period=holding_period,
+        trx_cost=0,
+        annualization_factor=12,
+        n_jobs=n_jobs,
+        metrics=['Sharpe_Ratio_Arithmetic'],
+        bootstrap_draws=bootstrap_draws
+    )
+    rc_lookback_period = _sharpe_ratios(sweep, 'lookback_period')
+    bands = _sharpe_ratio_bands(sweep, 'lookback_period')
 
     plotRobustnessChecks(
         rc_lookback_period,
@@ -56,26 +76,27 @@ def run_lookback_period_check(price_data_daily, lookback_period_range, nLong, nS
         x_label='Lookback Period',
         y_label='Sharpe Ratio',
         savefig=True,
-        filename=visualization_path / 'rc_lookback_period.png'
+        filename=visualization_path / 'rc_lookback_period.png',
+        bands=bands
     )
 
-def run_number_assets_check(price_data_daily, lookback_period, nLong_range, nShort, holding_period, rf_monthly, spi_XsReturns_monthly, visualization_path):
-    rc_number_assets = pd.DataFrame(index=nLong_range, columns=['Sharpe_Ratio'])
-    for i in nLong_range:
-        excess_returns_temp, _, _, _ = momentum_strategy(
-            price_data_daily=price_data_daily,
-            lookback_period=lookback_period,
-            nLong=i,
-            nShort=nShort,
-            holding_period=holding_period,
-            rf_monthly=rf_monthly,
-            trx_cost=0
-        )
-        excess_returns_temp.columns = ['Strategy_Returns']
-        stats_temp = summarize_performance(excess_returns_temp, rf_monthly, spi_XsReturns_monthly, 12)
-        rc_number_assets.loc[i, 'Sharpe_Ratio'] = stats_temp['Sharpe_Ratio_Arithmetic']['xs_Return']
-
-
+def run_number_assets_check(price_data_daily, lookback_period, nLong_range, nShort, holding_period, rf_monthly, spi_XsReturns_monthly, visualization_path, n_jobs=None, bootstrap_draws=10000):
+    sweep = run_parameter_sweep(
+        price_data_daily=price_data_daily,
+        param_grid={'nLong': nLong_range},
+        rf_monthly=rf_monthly,
+        factor_xs_returns=spi_XsReturns_monthly,
+        lookback_period=lookback_period,
+        nShort=nShort,
+        holding_period=holding_period,
+        trx_cost=0,
+        annualization_factor=12,
+        n_jobs=n_jobs,
+        metrics=['Sharpe_Ratio_Arithmetic'],
+        bootstrap_draws=bootstrap_draws
+    )
+    rc_number_assets = _sharpe_ratios(sweep, 'nLong')
+    bands = _sharpe_ratio_bands(sweep, 'nLong')
 
     plotRobustnessChecks(
         rc_number_assets,
@@ -84,11 +105,11 @@ def run_number_assets_check(price_data_daily, lookback_period, nLong_range, nSho
         x_label='Number Assets Long',
         y_label='Sharpe Ratio',
         savefig=True,
-        filename=visualization_path / 'rc_number_assets.png'
+        filename=visualization_path / 'rc_number_assets.png',
+        bands=bands
     )
 
 def run_trx_cost_check(price_data_daily, lookback_period, nLong, nShort, holding_period, rf_monthly, spi_returns_monthly, visualization_path):
-    rc_trxCost_return = pd.DataFrame()
     trx_costs = [0.001, 0.005, 0.01]
     labels = {
         'Strategy_Returns': 'Long Only Strategy',
@@ -100,35 +121,19 @@ def run_trx_cost_check(price_data_daily, lookback_period, nLong, nShort, holding
         'trx_cost_0.01': 'Long Only with Trx Cost: 1.0%',
     }
 
-    # Initialize with base strategy returns
-    _, _, _, portfolio_returns_longOnly = momentum_strategy(
+    # Run the backtest once and derive the net returns for every cost level from its turnover,
+    # measured against the holdings as they drifted since the last rebalance
+    _, rc_trxCost_return, _ = momentum_strategy_cost_sweep(
         price_data_daily=price_data_daily,
         lookback_period=lookback_period,
         nLong=nLong,
         nShort=nShort,
         holding_period=holding_period,
         rf_monthly=rf_monthly,
-        trx_cost=0
+        trx_costs=[0] + trx_costs,
+        drift=True
     )
-    if isinstance(portfolio_returns_longOnly, pd.Series):
-        portfolio_returns_longOnly = portfolio_returns_longOnly.to_frame()
-    portfolio_returns_longOnly.columns = ['Strategy_Returns']
-    rc_trxCost_return = portfolio_returns_longOnly.copy()
-
-    for trx in trx_costs:
-        _, _, _, portfolio_returns_temp = momentum_strategy(
-            price_data_daily=price_data_daily,
-            lookback_period=lookback_period,
-            nLong=nLong,
-            nShort=nShort,
-            holding_period=holding_period,
-            rf_monthly=rf_monthly,
-            trx_cost=trx
-        )
-        if isinstance(portfolio_returns_temp, pd.Series):
-            portfolio_returns_temp = portfolio_returns_temp.to_frame()
-        portfolio_returns_temp.columns = [f'trx_cost_{trx}']
-        rc_trxCost_return = pd.concat([rc_trxCost_return, portfolio_returns_temp], axis=1)
+    rc_trxCost_return = rc_trxCost_return.rename(columns={'trx_cost_0': 'Strategy_Returns'})
 
     plot_cumulative_returns(
         rc_trxCost_return,
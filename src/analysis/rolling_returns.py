@@ -0,0 +1,60 @@
+# src/analysis/rolling_returns.py
+
+import numpy as np
+import pandas as pd
+
+
+def rolling_compounded_returns(returns, window):
+    """
+    Compounded returns over a trailing window, computed from cumulative log returns.
+
+    The value in row t compounds rows [t - window + 1, t], like
+    (1 + returns).rolling(window).apply(np.prod) - 1, but each step costs O(1) instead of
+    a Python call per window. Windows that contain a missing return are NaN, as are the
+    first window - 1 rows. A return of -100% or worse wipes out the whole window (-1).
+
+    Parameters:
+    - returns: pd.DataFrame, pd.Series or np.ndarray, periods x assets returns (NaN = missing).
+    - window: int, number of periods to compound.
+
+    Returns:
+    - Same type and shape as returns, with the compounded window returns.
+    """
+    if window < 1:
+        raise ValueError("window must be a positive integer.")
+
+    values = np.asarray(returns, dtype=float)
+    is_vector = values.ndim == 1
+    if is_vector:
+        values = values[:, None]
+    n_periods, n_assets = values.shape
+
+    missing = np.isnan(values)
+    wiped_out = ~missing & (values <= -1)
+    log_growth = np.log1p(np.where(missing | wiped_out, 0.0, values))
+
+    # Prefix sums with a leading zero row: window sum over rows [a, b) = prefix[b] - prefix[a]
+    log_prefix = np.zeros((n_periods + 1, n_assets))
+    np.cumsum(log_growth, axis=0, out=log_prefix[1:])
+    missing_prefix = np.zeros((n_periods + 1, n_assets), dtype=np.int64)
+    np.cumsum(missing, axis=0, out=missing_prefix[1:])
+    wiped_prefix = np.zeros((n_periods + 1, n_assets), dtype=np.int64)
+    np.cumsum(wiped_out, axis=0, out=wiped_prefix[1:])
+
+    compounded = np.full((n_periods, n_assets), np.nan)
+    if n_periods >= window:
+        window_log = log_prefix[window:] - log_prefix[:-window]
+        window_missing = missing_prefix[window:] - missing_prefix[:-window]
+        window_wiped = wiped_prefix[window:] - wiped_prefix[:-window]
+        result = np.expm1(window_log)
+        result[window_wiped > 0] = -1.0
+        result[window_missing > 0] = np.nan
+        compounded[window - 1:] = result
+
+    if is_vector:
+        compounded = compounded[:, 0]
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(compounded, index=returns.index, columns=returns.columns)
+    if isinstance(returns, pd.Series):
+        return pd.Series(compounded, index=returns.index, name=returns.name)
+    return compounded
@@ -0,0 +1,210 @@
+# src/analysis/sparse_weights.py
+
+import numpy as np
+import pandas as pd
+from src.data_processing.columnar_storage import is_columnar_path, save_frame, load_frame
+
+# Column names of the long date / asset / weight table
+LONG_COLUMNS = ("date", "asset", "weight")
+
+
+class SparseWeights:
+    """
+    Portfolio weights in compressed sparse row (CSR) form: one row per month, non-zero entries only.
+
+    A momentum portfolio holds at most (nLong + nShort) * holding_period names out of the whole
+    universe, so storing only the non-zero weights makes memory and file size scale with the
+    positions held instead of months x constituents.
+
+    Row t holds the weights in indices[indptr[t]:indptr[t + 1]] (asset positions, ascending)
+    and values[indptr[t]:indptr[t + 1]].
+
+    Attributes:
+    - dates: pd.Index, one entry per row.
+    - assets: pd.Index, asset names the column positions refer to.
+    - indptr: np.ndarray of int64, row offsets of length len(dates) + 1.
+    - indices: np.ndarray of int64, asset positions of the non-zero weights.
+    - values: np.ndarray of float, non-zero weights.
+    """
+
+    def __init__(self, dates, assets, indptr, indices, values):
+        self.dates = pd.Index(dates)
+        self.assets = pd.Index(assets)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.values = np.asarray(values, dtype=float)
+        if len(self.indptr) != len(self.dates) + 1:
+            raise ValueError("indptr must have one entry more than dates.")
+
+    @classmethod
+    def from_rows(cls, rows, dates, assets):
+        """
+        Builds SparseWeights from one (asset positions, weights) pair per month.
+
+        Parameters:
+        - rows: list of (np.ndarray of int, np.ndarray of float), one pair per date.
+        - dates: pd.Index, dates of the rows.
+        - assets: pd.Index, asset names.
+
+        Returns:
+        - SparseWeights
+        """
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(positions) for positions, _ in rows], out=indptr[1:])
+        if rows:
+            indices = np.concatenate([positions for positions, _ in rows]).astype(np.int64)
+            values = np.concatenate([weights for _, weights in rows]).astype(float)
+        else:
+            indices = np.zeros(0, dtype=np.int64)
+            values = np.zeros(0)
+        return cls(dates, assets, indptr, indices, values)
+
+    @classmethod
+    def from_dense(cls, weights, dates=None, assets=None):
+        """
+        Compresses a dense weight matrix, keeping its non-zero entries.
+
+        Parameters:
+        - weights: pd.DataFrame (dates x assets) or np.ndarray.
+        - dates, assets: indexes for an np.ndarray input; taken from the DataFrame otherwise.
+
+        Returns:
+        - SparseWeights
+        """
+        if isinstance(weights, pd.DataFrame):
+            dates = weights.index
+            assets = weights.columns
+        values = np.asarray(weights, dtype=float)
+        row_ids, indices = np.nonzero(values)
+        indptr = np.zeros(values.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ids, minlength=values.shape[0]), out=indptr[1:])
+        return cls(dates, assets, indptr, indices, values[row_ids, indices])
+
+    @classmethod
+    def from_long(cls, long_table, dates=None, assets=None):
+        """
+        Builds SparseWeights from a long table with 'date', 'asset' and 'weight' columns.
+
+        Parameters:
+        - long_table: pd.DataFrame, one row per non-zero weight.
+        - dates: pd.Index, optional full date index (dates without positions become empty rows).
+          Defaults to the dates in the table.
+        - assets: pd.Index, optional asset universe. Defaults to the assets in the table,
+          in order of first appearance.
+
+        Returns:
+        - SparseWeights
+        """
+        date_col, asset_col, weight_col = LONG_COLUMNS
+        if dates is None:
+            dates = pd.Index(long_table[date_col].unique()).sort_values()
+        if assets is None:
+            assets = pd.Index(long_table[asset_col].unique())
+        dates = pd.Index(dates)
+        assets = pd.Index(assets)
+
+        row_ids = dates.get_indexer(long_table[date_col])
+        positions = assets.get_indexer(long_table[asset_col])
+        if (row_ids < 0).any() or (positions < 0).any():
+            raise ValueError("long_table contains dates or assets outside the given index.")
+
+        order = np.lexsort((positions, row_ids))
+        indptr = np.zeros(len(dates) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ids, minlength=len(dates)), out=indptr[1:])
+        weights = long_table[weight_col].to_numpy(dtype=float)
+        return cls(dates, assets, indptr, positions[order], weights[order])
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.assets)
+
+    @property
+    def nnz(self):
+        """Number of stored (non-zero) weights."""
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        """Bytes used by the sparse arrays, excluding the date and asset indexes."""
+        return self.indptr.nbytes + self.indices.nbytes + self.values.nbytes
+
+    def row(self, t):
+        """
+        Asset positions and weights held in row t.
+        """
+        start, end = self.indptr[t], self.indptr[t + 1]
+        return self.indices[start:end], self.values[start:end]
+
+    def to_dense(self):
+        """
+        Expands to a dates x assets DataFrame with zeros for assets not held.
+        """
+        dense = np.zeros(self.shape)
+        row_ids = np.repeat(np.arange(len(self.dates)), np.diff(self.indptr))
+        dense[row_ids, self.indices] = self.values
+        return pd.DataFrame(dense, index=self.dates, columns=self.assets)
+
+    def to_long(self):
+        """
+        Long table with one row per non-zero weight and columns 'date', 'asset' and 'weight'.
+        """
+        date_col, asset_col, weight_col = LONG_COLUMNS
+        row_ids = np.repeat(np.arange(len(self.dates)), np.diff(self.indptr))
+        return pd.DataFrame({
+            date_col: self.dates[row_ids],
+            asset_col: self.assets[self.indices],
+            weight_col: self.values,
+        })
+
+    def portfolio_returns(self, monthly_returns):
+        """
+        Portfolio return in each month from the previous month's weights.
+
+        Missing asset returns contribute zero, as in the dense (weights.shift(1) * returns).sum(axis=1).
+
+        Parameters:
+        - monthly_returns: pd.DataFrame or np.ndarray, dates x assets returns on the same indexes.
+
+        Returns:
+        - np.ndarray, portfolio return per date (0 in the first month).
+        """
+        returns = np.asarray(monthly_returns, dtype=float)
+        row_ids = np.repeat(np.arange(len(self.dates)), np.diff(self.indptr))
+        # Weights held at the end of row t earn the returns of row t + 1
+        held = row_ids < len(self.dates) - 1
+        contributions = self.values[held] * returns[row_ids[held] + 1, self.indices[held]]
+        contributions[np.isnan(contributions)] = 0.0
+        portfolio_returns = np.zeros(len(self.dates))
+        np.add.at(portfolio_returns, row_ids[held] + 1, contributions)
+        return portfolio_returns
+
+
+def write_sparse_weights(weights, path):
+    """
+    Writes portfolio weights as a long table of non-zero positions (date, asset, weight).
+
+    Parameters:
+    - weights: SparseWeights or pd.DataFrame of dense weights.
+    - path: str or Path, output file. The suffix selects CSV, Feather or Parquet (see save_frame).
+    """
+    if not isinstance(weights, SparseWeights):
+        weights = SparseWeights.from_dense(weights)
+    save_frame(weights.to_long(), path, index=False)
+
+
+def read_sparse_weights(path, dates=None, assets=None):
+    """
+    Reads a long weight table written by write_sparse_weights.
+
+    Parameters:
+    - path: str or Path, CSV, Feather or Parquet file with 'date', 'asset' and 'weight' columns.
+    - dates, assets: optional full indexes, see SparseWeights.from_long.
+
+    Returns:
+    - SparseWeights
+    """
+    if is_columnar_path(path):
+        long_table = load_frame(path, index_col=None)
+    else:
+        long_table = pd.read_csv(path, parse_dates=[LONG_COLUMNS[0]])
+    return SparseWeights.from_long(long_table, dates=dates, assets=assets)
@@ -1,32 +1,31 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import skew, kurtosis
+from src.analysis.instrumentation import instrumented
 
-def summarize_performance(xs_returns, rf, factor_xs_returns, annualization_factor, isBenchmark=False):
-    # Make copies to prevent modification of originals
-    xs_returns = xs_returns.copy()
+def prepare_rf_and_factors(rf, factor_xs_returns):
+    """
+    Copies the risk-free and factor returns into DataFrames with the column names used by summarize_performance.
+    """
     rf = rf.copy()
     factor_xs_returns = factor_xs_returns.copy()
     
     # Convert Series to DataFrame if necessary
-    if isinstance(xs_returns, pd.Series):
-        xs_returns = xs_returns.to_frame(name='Return')
     if isinstance(rf, pd.Series):
         rf = rf.to_frame(name='Return')
     if isinstance(factor_xs_returns, pd.Series):
         factor_xs_returns = factor_xs_returns.to_frame(name='Return')
     
     # Rename columns
-    xs_returns.columns = ['xs_Return']
     rf.columns = ['rf_Return']
     if 'Return' in factor_xs_returns.columns:
         factor_xs_returns = factor_xs_returns.rename(columns={'Return': 'Factor_Return'})
-        # Rename columns
-    if isBenchmark:
-        xs_returns.columns = ['Benchmark_Return']
-    else:
-        xs_returns.columns = ['xs_Return']
-    
+    return rf, factor_xs_returns
+
+def align_to_common_months(xs_returns, rf, factor_xs_returns):
+    """
+    Aligns returns, risk-free and factor returns on their common month-ends and fills gaps.
+    """
     # Align frequencies to month-end using 'ME'
     xs_returns = xs_returns.asfreq('ME')
     rf = rf.asfreq('ME')
@@ -39,9 +38,32 @@ def summarize_performance(xs_returns, rf, factor_xs_returns, annualization_facto
     factor_xs_returns = factor_xs_returns.loc[common_index]
     
     # Handle missing values
-    rf = rf.fillna(method='ffill').fillna(method='bfill')
-    xs_returns = xs_returns.fillna(method='ffill').fillna(method='bfill')
-    factor_xs_returns = factor_xs_returns.fillna(method='ffill').fillna(method='bfill')
+    rf = rf.ffill().bfill()
+    xs_returns = xs_returns.ffill().bfill()
+    factor_xs_returns = factor_xs_returns.ffill().bfill()
+    return xs_returns, rf, factor_xs_returns
+
+@instrumented()
+def summarize_performance(xs_returns, rf, factor_xs_returns, annualization_factor, isBenchmark=False, market_data=None):
+    # Make copies to prevent modification of originals
+    xs_returns = xs_returns.copy()
+    
+    # Convert Series to DataFrame if necessary
+    if isinstance(xs_returns, pd.Series):
+        xs_returns = xs_returns.to_frame(name='Return')
+    
+    # Rename columns
+    if isBenchmark:
+        xs_returns.columns = ['Benchmark_Return']
+    else:
+        xs_returns.columns = ['xs_Return']
+    
+    if market_data is not None:
+        # Risk-free and factor returns were aligned once when market_data was built
+        xs_returns, rf, factor_xs_returns = market_data.align_for_statistics(xs_returns)
+    else:
+        rf, factor_xs_returns = prepare_rf_and_factors(rf, factor_xs_returns)
+        xs_returns, rf, factor_xs_returns = align_to_common_months(xs_returns, rf, factor_xs_returns)
     
     # Drop rows with NaNs in critical columns
     data_combined = pd.concat([xs_returns, rf, factor_xs_returns], axis=1)
@@ -180,6 +202,241 @@ def summarize_performance(xs_returns, rf, factor_xs_returns, annualization_facto
     
     return results
 
+# Metrics reported by summarize_performance_batch, in output order. 'Beta' expands to one
+# column per factor ('Beta_<factor>') when there are several factors.
+PERFORMANCE_METRICS = (
+    'Arithmetic_Avg_Total_Return',
+    'Arithmetic_Avg_Excess_Return',
+    'Geometric_Avg_Total_Return',
+    'Geometric_Avg_Excess_Return',
+    'Std_of_Excess_Returns_Annualized',
+    'Sharpe_Ratio_Arithmetic',
+    'Sharpe_Ratio_Geometric',
+    'Min_Excess_Return',
+    'Max_Excess_Return',
+    'Skewness_of_Excess_Return',
+    'Kurtosis_of_Excess_Return',
+    'Alpha_Arithmetic',
+    'Alpha_Geometric',
+    'T_stat_of_Alpha',
+    'Beta',
+    'Std_Dev_of_Excess_Returns',
+    'Monthly_Excess_Return',
+    'T_stat_of_Monthly_Excess_Return',
+    'Autocorr_Lag_1',
+    'Autocorr_Lag_2',
+    'Autocorr_Lag_3',
+)
+
+def _geometric_average(returns, c):
+    """
+    Annualized geometric average return in percent of every column.
+    """
+    return 100 * (np.prod(1 + returns, axis=0) ** (c['annualization_factor'] / c['n_periods']) - 1)
+
+def _regression(c):
+    """
+    Regresses every strategy on the factors with one least-squares solve on the shared design matrix.
+
+    Returns (coefficients, t_stats), each (1 + n_factors) x strategies with the intercept first.
+    """
+    xs, n_periods = c['xs'], c['n_periods']
+    n_strategies = xs.shape[1]
+    if c['isBenchmark']:
+        # Benchmark case: alpha 0 and beta 1, t-stats not applicable
+        coefficients = np.vstack((np.zeros(n_strategies), np.ones((c['factors'].shape[1], n_strategies))))
+        return coefficients, np.full_like(coefficients, np.nan)
+
+    X = np.column_stack((np.ones(n_periods), c['factors']))
+    if n_periods < X.shape[1]:
+        raise ValueError("Not enough data points to estimate parameters")
+    has_data = ~np.isnan(xs).any(axis=0)
+    coefficients = np.full((X.shape[1], n_strategies), np.nan)
+    coefficients[:, has_data] = np.linalg.lstsq(X, xs[:, has_data], rcond=None)[0]
+
+    residuals = xs - X @ coefficients
+    sigma_squared = np.sum(residuals ** 2, axis=0) / (n_periods - X.shape[1])
+    try:
+        xtx_inv_diag = np.diag(np.linalg.solve(X.T @ X, np.eye(X.shape[1])))
+    except np.linalg.LinAlgError:
+        raise np.linalg.LinAlgError("Singular matrix encountered during covariance calculation.")
+    standard_errors = np.sqrt(np.outer(xtx_inv_diag, sigma_squared))
+    return coefficients, coefficients / standard_errors
+
+def _alpha_geometric(c):
+    if c['isBenchmark']:
+        return np.zeros(c['xs'].shape[1])
+    betas = c['regression'][0][1:]
+    bm_ret = c['factors'] @ betas + c['rf']
+    return c['Geometric_Avg_Total_Return'] - _geometric_average(bm_ret, c)
+
+def _autocorrelation(values, lag):
+    """
+    Lag-k autocorrelation of every column, as pd.Series.autocorr computes it.
+    """
+    if lag >= len(values):
+        return np.full(values.shape[1], np.nan)
+    head = values[:-lag] - values[:-lag].mean(axis=0)
+    tail = values[lag:] - values[lag:].mean(axis=0)
+    return np.sum(head * tail, axis=0) / np.sqrt(np.sum(head ** 2, axis=0) * np.sum(tail ** 2, axis=0))
+
+# Intermediate quantities and metrics: name -> (dependencies, function of the computed values c).
+# c starts with xs, rf, factors (months x columns arrays), n_periods, annualization_factor and isBenchmark.
+_QUANTITIES = {
+    'total': ((), lambda c: c['xs'] + c['rf']),
+    'mean': ((), lambda c: c['xs'].mean(axis=0)),
+    'std': ((), lambda c: np.std(c['xs'], axis=0, ddof=1)),
+    'geom_avg_rf': ((), lambda c: _geometric_average(c['rf'], c)),
+    'regression': ((), _regression),
+    'Arithmetic_Avg_Total_Return': (('total',), lambda c: c['annualization_factor'] * 100 * c['total'].mean(axis=0)),
+    'Arithmetic_Avg_Excess_Return': (('mean',), lambda c: c['annualization_factor'] * 100 * c['mean']),
+    'Geometric_Avg_Total_Return': (('total',), lambda c: _geometric_average(c['total'], c)),
+    'Geometric_Avg_Excess_Return': (('Geometric_Avg_Total_Return', 'geom_avg_rf'),
+                                    lambda c: c['Geometric_Avg_Total_Return'] - c['geom_avg_rf']),
+    'Std_of_Excess_Returns_Annualized': (('std',), lambda c: c['std'] * np.sqrt(c['annualization_factor'])),
+    'Sharpe_Ratio_Arithmetic': (('Arithmetic_Avg_Excess_Return', 'Std_of_Excess_Returns_Annualized'),
+                                lambda c: c['Arithmetic_Avg_Excess_Return'] / c['Std_of_Excess_Returns_Annualized'] / 100),
+    'Sharpe_Ratio_Geometric': (('Geometric_Avg_Excess_Return', 'Std_of_Excess_Returns_Annualized'),
+                               lambda c: c['Geometric_Avg_Excess_Return'] / c['Std_of_Excess_Returns_Annualized'] / 100),
+    'Min_Excess_Return': ((), lambda c: c['xs'].min(axis=0)),
+    'Max_Excess_Return': ((), lambda c: c['xs'].max(axis=0)),
+    'Skewness_of_Excess_Return': ((), lambda c: skew(c['xs'], axis=0)),
+    'Kurtosis_of_Excess_Return': ((), lambda c: kurtosis(c['xs'], axis=0)),
+    'Alpha_Arithmetic': (('regression',), lambda c: c['regression'][0][0] * c['annualization_factor'] * 100),
+    'Alpha_Geometric': (('regression', 'Geometric_Avg_Total_Return'), _alpha_geometric),
+    'T_stat_of_Alpha': (('regression',), lambda c: c['regression'][1][0]),
+    'Beta': (('regression',), lambda c: c['regression'][0][1:]),
+    'Std_Dev_of_Excess_Returns': (('std',), lambda c: c['std']),
+    'Monthly_Excess_Return': (('mean',), lambda c: c['mean']),
+    'T_stat_of_Monthly_Excess_Return': (('mean', 'std'), lambda c: c['mean'] / (c['std'] / np.sqrt(c['n_periods']))),
+    'Autocorr_Lag_1': ((), lambda c: _autocorrelation(c['xs'], 1)),
+    'Autocorr_Lag_2': ((), lambda c: _autocorrelation(c['xs'], 2)),
+    'Autocorr_Lag_3': ((), lambda c: _autocorrelation(c['xs'], 3)),
+}
+
+def resolve_metric_dependencies(metrics):
+    """
+    Lists the quantities needed for a set of metrics, each after the quantities it depends on.
+
+    Parameters:
+    - metrics (iterable of str): Names from PERFORMANCE_METRICS.
+
+    Returns:
+    - list of str: Metrics and intermediate quantities in computation order.
+
+    Raises:
+    - ValueError: If a metric is unknown.
+    """
+    unknown = [metric for metric in metrics if metric not in PERFORMANCE_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}. Choose from {PERFORMANCE_METRICS}.")
+
+    order = []
+    def visit(name):
+        if name in order:
+            return
+        for dependency in _QUANTITIES[name][0]:
+            visit(dependency)
+        order.append(name)
+
+    for metric in metrics:
+        visit(metric)
+    return order
+
+def align_strategy_returns(xs_returns, rf, factor_xs_returns, market_data=None):
+    """
+    Aligns a months x strategies matrix of excess returns with the risk-free and factor returns.
+
+    Gaps are filled per strategy as in summarize_performance, so each column ends up as if it
+    had been aligned alone; months without a risk-free rate are dropped.
+
+    Parameters:
+    - xs_returns: pd.DataFrame or pd.Series, excess returns, one column per strategy.
+    - rf: pd.DataFrame or pd.Series, monthly risk-free returns (one column).
+    - factor_xs_returns: pd.DataFrame or pd.Series, factor excess returns.
+    - market_data: MarketData, optional; its pre-aligned rf and benchmark excess returns are used instead of rf and factor_xs_returns.
+
+    Returns:
+    - xs_returns, rf, factor_xs_returns: pd.DataFrame, on common month-ends.
+
+    Raises:
+    - ValueError: If strategy names repeat or no month is left.
+    """
+    if isinstance(xs_returns, pd.Series):
+        xs_returns = xs_returns.to_frame(name=xs_returns.name if xs_returns.name is not None else 'Return')
+    if xs_returns.columns.duplicated().any():
+        raise ValueError("Duplicate column names detected in xs_returns. Please ensure all columns are uniquely named.")
+
+    if market_data is not None:
+        xs_returns, rf, factor_xs_returns = market_data.align_for_statistics(xs_returns)
+    else:
+        rf, factor_xs_returns = prepare_rf_and_factors(rf, factor_xs_returns)
+        if rf.shape[1] != 1:
+            raise ValueError('rf must have a single column when summarizing several strategies')
+        xs_returns, rf, factor_xs_returns = align_to_common_months(xs_returns, rf, factor_xs_returns)
+
+    # Gaps were filled per column, so only months without a risk-free rate or strategies
+    # without any data are left with NaNs
+    keep = rf.iloc[:, 0].notna().to_numpy()
+    if not keep.any():
+        raise ValueError("No data available after alignment and NaN handling. Please check your input data.")
+    return xs_returns[keep], rf[keep], factor_xs_returns[keep]
+
+@instrumented()
+def summarize_performance_batch(xs_returns, rf, factor_xs_returns, annualization_factor, isBenchmark=False, market_data=None,
+                                metrics=None):
+    """
+    Computes the statistics of summarize_performance for many strategies in one vectorized pass.
+
+    The returns are aligned once for all strategies, and the alpha/beta regressions share
+    one design matrix: a single least-squares solve covers every strategy, and the
+    coefficient covariance (X'X)^-1 is computed once. Each row matches
+    flatten_performance_stats(summarize_performance(...)) for that strategy alone.
+
+    Only the requested metrics and the quantities they depend on are computed, e.g. the
+    arithmetic Sharpe ratio needs the mean and standard deviation but no regression.
+
+    Parameters:
+    - xs_returns: pd.DataFrame, months x strategies excess returns (a Series is one strategy).
+    - rf: pd.DataFrame or pd.Series, monthly risk-free returns (one column).
+    - factor_xs_returns: pd.DataFrame or pd.Series, factor excess returns.
+    - annualization_factor: int, periods per year.
+    - isBenchmark: bool, report alpha 0, beta 1 and no alpha t-stat, as for the benchmark.
+    - market_data: MarketData, optional; its pre-aligned rf and benchmark excess returns are used instead of rf and factor_xs_returns.
+    - metrics: iterable of str, optional, metrics to compute (see PERFORMANCE_METRICS). All if None.
+
+    Returns:
+    - pd.DataFrame: strategies x metrics, with the metric names of flatten_performance_stats,
+      in PERFORMANCE_METRICS order. Strategies without any data after alignment get NaN statistics.
+    """
+    requested = set(PERFORMANCE_METRICS if metrics is None else metrics)
+    quantities = resolve_metric_dependencies(sorted(requested))
+    metrics = [metric for metric in PERFORMANCE_METRICS if metric in requested]
+
+    xs_returns, rf, factor_xs_returns = align_strategy_returns(xs_returns, rf, factor_xs_returns, market_data=market_data)
+    computed = {
+        'xs': xs_returns.to_numpy(dtype=float),
+        'rf': rf.to_numpy(dtype=float),
+        'factors': factor_xs_returns.to_numpy(dtype=float),
+        'n_periods': len(xs_returns),
+        'annualization_factor': annualization_factor,
+        'isBenchmark': isBenchmark,
+    }
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in quantities:
+            computed[name] = _QUANTITIES[name][1](computed)
+
+    results = {}
+    factor_names = list(factor_xs_returns.columns)
+    for metric in metrics:
+        if metric == 'Beta':
+            for j, factor in enumerate(factor_names):
+                results['Beta' if len(factor_names) == 1 else f'Beta_{factor}'] = computed['Beta'][j]
+        else:
+            results[metric] = computed[metric]
+    return pd.DataFrame(results, index=xs_returns.columns)
+
 def save_summary_to_latex(stats, file_path, isBenchmark=False):
     # Define metrics and their corresponding values
     metrics = [
@@ -239,4 +496,38 @@ def save_summary_to_latex(stats, file_path, isBenchmark=False):
     # Write LaTeX table to file
     with open(file_path, 'w') as f:
         f.write(latex_table)
-    #print(f"Summary saved to {file_path}")
\ No newline at end of file
+    #print(f"Summary saved to {file_path}")
+
+def flatten_performance_stats(stats, column=None):
+    """
+    Flattens the nested output of summarize_performance into a flat dict of scalars.
+
+    Parameters:
+    - stats (dict): Output of summarize_performance.
+    - column (str): Return column to extract ('xs_Return' or 'Benchmark_Return'). Defaults to
+      the first column found in the statistics.
+
+    Returns:
+    - dict: Metric name -> scalar value. Betas become 'Beta' (or 'Beta_<factor>' for several
+      factors) and autocorrelations become 'Autocorr_Lag_1', 'Autocorr_Lag_2', ...
+    """
+    if column is None:
+        column = next(iter(stats['Autocorrelations']))
+
+    flat = {}
+    for key, value in stats.items():
+        if key == 'Beta':
+            # Strategies store betas as returns x factors, the benchmark case as factors x returns
+            betas = value if column in value.index else value.T
+            factors = list(betas.columns) if column in betas.index else []
+            for factor in factors:
+                name = 'Beta' if len(factors) == 1 else f'Beta_{factor}'
+                flat[name] = betas.loc[column, factor]
+        elif key == 'Autocorrelations':
+            for lag, autocorr in value[column].items():
+                flat[f"Autocorr_{lag.replace(' ', '_')}"] = autocorr
+        elif isinstance(value, (pd.Series, dict)):
+            flat[key] = value[column]
+        else:
+            flat[key] = value
+    return flat
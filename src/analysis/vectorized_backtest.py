@@ -0,0 +1,775 @@
+# src/analysis/vectorized_backtest.py
+
+import numpy as np
+from src.analysis.rolling_returns import rolling_compounded_returns
+
+# Weights below this threshold are treated as numerical noise and set to zero
+SMALL_WEIGHT_THRESHOLD = 1e-8
+
+# Assets per block for the formation returns of run_large_universe_backtest
+LARGE_UNIVERSE_BLOCK = 2048
+
+# Months per block when the cohorts of the large-universe engine are selected for sparse weights
+COHORT_BLOCK_MONTHS = 64
+
+
+def eligibility_mask(monthly_returns, lookback_period):
+    """
+    Flags the assets that can be ranked in each month.
+
+    An asset is eligible in month t if it has a return for every month of the
+    lookback window [t - lookback_period, t) and for month t itself. Months before
+    the first full lookback window are never eligible.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of monthly returns (NaN = missing).
+    - lookback_period: int, number of months to look back for momentum calculation.
+
+    Returns:
+    - np.ndarray of bool, months x assets eligibility mask.
+    """
+    n_months, n_assets = monthly_returns.shape
+    observed = ~np.isnan(monthly_returns)
+    valid = np.zeros((n_months, n_assets), dtype=bool)
+    if n_months <= lookback_period:
+        return valid
+
+    # missing_before[k] = number of missing observations in rows [0, k)
+    missing_before = np.zeros((n_months + 1, n_assets), dtype=np.int64)
+    np.cumsum(~observed, axis=0, out=missing_before[1:])
+    window_missing = missing_before[lookback_period:n_months] - missing_before[:n_months - lookback_period]
+
+    valid[lookback_period:] = (window_missing == 0) & observed[lookback_period:]
+    return valid
+
+
+def formation_returns(monthly_returns, lookback_period):
+    """
+    Compounded returns over the lookback window [t - lookback_period, t) for every month t.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of monthly returns.
+    - lookback_period: int, number of months to compound.
+
+    Returns:
+    - np.ndarray, months x assets matrix; rows without a full window are NaN.
+    """
+    scores = np.full(monthly_returns.shape, np.nan)
+    # The window ending in month t - 1 is the formation period for month t
+    scores[1:] = rolling_compounded_returns(monthly_returns, lookback_period)[:-1]
+    return scores
+
+
+def rank_assets(scores, valid):
+    """
+    Ranks eligible assets by score in descending order, month by month.
+
+    Ties are broken by column order. Ineligible assets are placed after all eligible ones.
+
+    Parameters:
+    - scores: np.ndarray, months x assets momentum scores.
+    - valid: np.ndarray of bool, months x assets eligibility mask.
+
+    Returns:
+    - order: np.ndarray of int, months x assets column indices sorted from best to worst.
+    - n_valid: np.ndarray of int, number of eligible assets per month.
+    """
+    keys = np.where(valid, -scores, np.inf)
+    order = np.argsort(keys, axis=1, kind='stable')
+    n_valid = valid.sum(axis=1)
+    return order, n_valid
+
+
+def cohort_allocations(order, n_valid, nLong, nShort, holding_period):
+    """
+    Weights assigned to the cohort formed in each month.
+
+    The top nLong eligible assets receive 1 / (nLong * holding_period) and the bottom
+    nShort eligible assets receive -1 / (nShort * holding_period). If both legs select
+    the same asset, the short leg wins, as in the loop engine.
+
+    Parameters:
+    - order: np.ndarray of int, months x assets ranking from rank_assets.
+    - n_valid: np.ndarray of int, number of eligible assets per month.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of months each cohort is held.
+
+    Returns:
+    - np.ndarray, months x assets matrix of new cohort weights.
+    """
+    n_months, n_assets = order.shape
+    positions = np.arange(n_assets)[None, :]
+    n_valid = n_valid[:, None]
+
+    position_weights = np.zeros((n_months, n_assets))
+    if nLong != 0:
+        long_mask = positions < np.minimum(nLong, n_valid)
+        position_weights[long_mask] = 1 / (nLong * holding_period)
+    if nShort != 0:
+        short_mask = (positions >= n_valid - nShort) & (positions < n_valid)
+        position_weights[short_mask] = -1 / (nShort * holding_period)
+
+    # Scatter from rank positions back to asset columns
+    allocations = np.zeros((n_months, n_assets))
+    np.put_along_axis(allocations, order, position_weights, axis=1)
+    return allocations
+
+
+def select_top_k(keys, k, last_ties=False):
+    """
+    Flags the k smallest keys of every row in O(assets) per row via a partial sort.
+
+    Ties at the cut-off are resolved as a stable sort would: the first columns win, or the
+    last ones with last_ties=True. Infinite keys (ineligible assets) are never selected.
+
+    Parameters:
+    - keys: np.ndarray, months x assets sort keys.
+    - k: int, number of entries to select per row.
+    - last_ties: bool, prefer later columns among tied keys.
+
+    Returns:
+    - np.ndarray of bool, months x assets selection mask.
+    """
+    n_months, n_assets = keys.shape
+    k = min(k, n_assets)
+    if k <= 0:
+        return np.zeros((n_months, n_assets), dtype=bool)
+    cutoff = np.partition(keys, k - 1, axis=1)[:, k - 1:k]
+    below = keys < cutoff
+    tied = (keys == cutoff) & np.isfinite(cutoff)
+    if last_ties:
+        tie_rank = np.cumsum(tied[:, ::-1], axis=1)[:, ::-1]
+    else:
+        tie_rank = np.cumsum(tied, axis=1)
+    return below | (tied & (tie_rank <= k - below.sum(axis=1, keepdims=True)))
+
+
+def top_k_allocations(scores, valid, nLong, nShort, holding_period):
+    """
+    Cohort weights from partial sorts instead of a full ranking of every cross-section.
+
+    Gives the same allocations as cohort_allocations(rank_assets(...)) (top nLong and
+    bottom nShort eligible assets, ties by column order, short leg wins on overlap), but
+    only the legs are selected, which matters when the universe is much larger than
+    nLong + nShort.
+
+    Parameters:
+    - scores: np.ndarray, months x assets momentum scores.
+    - valid: np.ndarray of bool, months x assets eligibility mask.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of months each cohort is held.
+
+    Returns:
+    - np.ndarray, months x assets matrix of new cohort weights.
+    """
+    allocations = np.zeros(scores.shape)
+    if nLong != 0:
+        long_keys = np.where(valid, -scores, np.inf)
+        allocations[select_top_k(long_keys, nLong)] = 1 / (nLong * holding_period)
+    if nShort != 0:
+        # The bottom of the descending stable ranking: lowest scores, later columns first among ties
+        short_keys = np.where(valid, scores, np.inf)
+        allocations[select_top_k(short_keys, nShort, last_ties=True)] = -1 / (nShort * holding_period)
+    return allocations
+
+
+def top_k_cohorts(scores, valid, nLong, nShort, holding_period, block_months=COHORT_BLOCK_MONTHS):
+    """
+    Cohort of every month as (asset positions, weights), selected as in top_k_allocations.
+
+    The selection runs on block_months months at a time, so the dense temporaries cover one
+    block instead of the whole panel.
+
+    Parameters:
+    - scores, valid, nLong, nShort, holding_period: as for top_k_allocations.
+    - block_months: int, months selected at once.
+
+    Yields:
+    - (np.ndarray of int, np.ndarray): asset positions (ascending) and weights of the cohort formed in each month.
+    """
+    for first in range(0, len(scores), block_months):
+        block = slice(first, first + block_months)
+        allocations = top_k_allocations(scores[block], valid[block], nLong, nShort, holding_period)
+        for row in allocations:
+            positions = np.flatnonzero(row)
+            yield positions, row[positions]
+
+
+def run_large_universe_backtest(monthly_returns, lookback_period, nLong, nShort, holding_period, block_size=LARGE_UNIVERSE_BLOCK,
+                                sparse=False):
+    """
+    Equivalent of run_vectorized_backtest that selects the legs with partial sorts.
+
+    The return panel is used in its own dtype (e.g. float32), so a float32 panel is not
+    copied to float64; scores and weights are computed in float64. Formation returns and
+    eligibility are computed for block_size assets at a time, which bounds their
+    temporaries (prefix sums, float64 copies) to months x block_size. With sparse=True the
+    cohorts are selected a block of months at a time and the weights are kept sparse (see
+    sparse_overlapping_backtest), so no months x assets allocation or weight matrix is built.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of months to hold the positions before they roll off.
+    - block_size: int, assets per block for the formation returns.
+    - sparse: bool, return the weights as one (asset positions, weights) pair per month.
+
+    Returns:
+    - weights: np.ndarray, months x assets portfolio weights, or a list of (asset positions,
+      weights) per month with sparse=True.
+    - turnover: np.ndarray, turnover for each month.
+    - portfolio_returns: np.ndarray, gross portfolio return for each month.
+    """
+    monthly_returns = np.asarray(monthly_returns)
+    n_assets = monthly_returns.shape[1]
+    valid = np.empty(monthly_returns.shape, dtype=bool)
+    scores = np.empty(monthly_returns.shape)
+    for first in range(0, n_assets, block_size):
+        block = slice(first, first + block_size)
+        valid[:, block] = eligibility_mask(monthly_returns[:, block], lookback_period)
+        scores[:, block] = formation_returns(monthly_returns[:, block], lookback_period)
+    skipped = ~valid.any(axis=1)
+    skipped[:lookback_period] = False
+    if sparse:
+        cohorts = top_k_cohorts(scores, valid, nLong, nShort, holding_period)
+        return sparse_overlapping_backtest(cohorts, monthly_returns, holding_period, skipped)
+
+    allocations = top_k_allocations(scores, valid, nLong, nShort, holding_period)
+    del scores
+
+    weights = overlapping_weights(allocations, holding_period, skipped)
+    del allocations
+    turnover = turnover_from_weights(weights)
+    portfolio_returns = returns_from_weights(weights, monthly_returns)
+    return weights, turnover, portfolio_returns
+
+
+def _active_cohort_sum(allocations, holding_period, skipped, cumulative=None):
+    """
+    Sum of the rows of allocations whose cohort is held in each month (see overlapping_weights).
+    """
+    if cumulative is None:
+        cumulative = np.cumsum(allocations, axis=0)
+    held = cumulative.copy()
+    held[holding_period:] -= cumulative[:-holding_period]
+
+    stuck_months = np.flatnonzero(skipped)
+    stuck_months = stuck_months[stuck_months >= holding_period]
+    if len(stuck_months) > 0:
+        stuck = np.zeros_like(allocations)
+        stuck[stuck_months] = allocations[stuck_months - holding_period]
+        held += np.cumsum(stuck, axis=0)
+    return held
+
+
+def overlapping_weights(allocations, holding_period, skipped, cumulative=None):
+    """
+    Aggregates overlapping cohorts into portfolio weights.
+
+    The portfolio in month t holds every cohort formed in (t - holding_period, t]. A
+    cohort whose roll-off month is skipped (no eligible assets) is never removed, which
+    mirrors the loop engine carrying the previous weights forward unchanged.
+
+    Parameters:
+    - allocations: np.ndarray, months x assets matrix of cohort weights.
+    - holding_period: int, number of months each cohort is held.
+    - skipped: np.ndarray of bool, months in which no cohort could be formed.
+    - cumulative: np.ndarray, optional precomputed np.cumsum(allocations, axis=0).
+
+    Returns:
+    - np.ndarray, months x assets matrix of portfolio weights.
+    """
+    weights = _active_cohort_sum(allocations, holding_period, skipped, cumulative)
+
+    # Handle very small weights by rounding and setting them to zero
+    weights = np.round(weights, 10)
+    weights[np.abs(weights) < SMALL_WEIGHT_THRESHOLD] = 0.0
+    return weights
+
+
+def turnover_from_weights(weights):
+    """
+    Sum of absolute weight changes per month, starting from an empty portfolio.
+    """
+    trades = np.abs(np.diff(weights, axis=0, prepend=0.0))
+    return trades.sum(axis=1)
+
+
+def returns_from_weights(weights, monthly_returns):
+    """
+    Portfolio returns from last month's weights; missing asset returns contribute zero.
+    """
+    portfolio_returns = np.zeros(len(weights))
+    filled_returns = np.where(np.isnan(monthly_returns), 0.0, monthly_returns)
+    portfolio_returns[1:] = np.einsum('ij,ij->i', weights[:-1], filled_returns[1:])
+    return portfolio_returns
+
+
+def ranked_cohorts(order, n_valid, nLong, nShort, holding_period):
+    """
+    Cohort of every month as (asset positions, weights), as cohort_allocations assigns them.
+
+    Parameters:
+    - order, n_valid: ranking from rank_assets.
+    - nLong, nShort, holding_period: as for cohort_allocations.
+
+    Yields:
+    - (np.ndarray of int, np.ndarray): asset positions and weights of the cohort formed in each month.
+    """
+    for t in range(len(order)):
+        n = int(n_valid[t])
+        position_weights = np.zeros(n)
+        if nLong != 0:
+            position_weights[:nLong] = 1 / (nLong * holding_period)
+        if nShort != 0:
+            # The short leg wins where the legs overlap
+            position_weights[max(n - nShort, 0):] = -1 / (nShort * holding_period)
+        ranks = np.flatnonzero(position_weights)
+        yield order[t, ranks], position_weights[ranks]
+
+
+def sparse_overlapping_backtest(cohorts, monthly_returns, holding_period, skipped):
+    """
+    Weights, turnover and returns of overlapping cohorts without months x assets matrices.
+
+    Runs overlapping_weights, turnover_from_weights and returns_from_weights month by
+    month: the running cohort sums per asset are the rows of the cumulative sums that
+    overlapping_weights builds, so the weights and turnover are identical, but only the
+    sums of the last holding_period months and one month of weights are dense at a time.
+    The non-zero weights of every month are kept. Returns are summed over the held assets
+    only and agree with returns_from_weights to about 1e-16.
+
+    Parameters:
+    - cohorts: iterable of (asset positions, weights), the cohort formed in each month.
+    - monthly_returns: np.ndarray, months x assets matrix of monthly returns (NaN = missing).
+    - holding_period: int, number of months each cohort is held.
+    - skipped: np.ndarray of bool, months in which no cohort could be formed.
+
+    Returns:
+    - rows: list of (asset positions, weights), the non-zero portfolio weights of each month
+      (see SparseWeights.from_rows).
+    - turnover: np.ndarray, turnover for each month.
+    - portfolio_returns: np.ndarray, gross portfolio return for each month.
+    """
+    n_months, n_assets = monthly_returns.shape
+    cumulative = np.zeros(n_assets)
+    # Cumulative sums and cohorts of the last holding_period months, slot t % holding_period
+    past_cumulative = np.zeros((holding_period, n_assets))
+    past_cohorts = [None] * holding_period
+    # Running sum of the cohorts stuck by a skipped roll-off month
+    stuck = np.zeros(n_assets)
+
+    weights = np.zeros(n_assets)
+    held_positions = np.zeros(0, dtype=np.int64)
+    rows = []
+    turnover = np.zeros(n_months)
+    portfolio_returns = np.zeros(n_months)
+    for t, (positions, values) in enumerate(cohorts):
+        slot = t % holding_period
+        cumulative[positions] += values
+        held = cumulative - past_cumulative[slot] if t >= holding_period else cumulative.copy()
+        if t >= holding_period and skipped[t]:
+            stuck_positions, stuck_values = past_cohorts[slot]
+            stuck[stuck_positions] += stuck_values
+        held += stuck
+        past_cumulative[slot] = cumulative
+        past_cohorts[slot] = (positions, values)
+
+        new_weights = np.round(held, 10)
+        new_weights[np.abs(new_weights) < SMALL_WEIGHT_THRESHOLD] = 0.0
+        turnover[t] = np.abs(new_weights - weights).sum()
+        # Returns earned by last month's holdings (missing returns contribute zero)
+        returns = monthly_returns[t, held_positions]
+        portfolio_returns[t] = np.dot(weights[held_positions], np.where(np.isnan(returns), 0.0, returns))
+        weights = new_weights
+        held_positions = np.flatnonzero(weights)
+        rows.append((held_positions, weights[held_positions]))
+    return rows, turnover, portfolio_returns
+
+
+def rank_cross_sections(monthly_returns, lookback_period):
+    """
+    Ranks every monthly cross-section by formation-period return.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - lookback_period: int, number of months to look back for momentum calculation.
+
+    Returns:
+    - order: np.ndarray of int, months x assets column indices sorted from best to worst.
+    - n_valid: np.ndarray of int, number of eligible assets per month.
+    - skipped: np.ndarray of bool, months after the first lookback window without eligible assets.
+    """
+    valid = eligibility_mask(monthly_returns, lookback_period)
+    scores = formation_returns(monthly_returns, lookback_period)
+    order, n_valid = rank_assets(scores, valid)
+
+    skipped = n_valid == 0
+    skipped[:lookback_period] = False
+    return order, n_valid, skipped
+
+
+def run_vectorized_backtest(monthly_returns, lookback_period, nLong, nShort, holding_period, sparse=False):
+    """
+    Array-based equivalent of the momentum_strategy loop.
+
+    With sparse=True the weights are built month by month from the ranking (see
+    sparse_overlapping_backtest) instead of from months x assets allocation and weight matrices.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of months to hold the positions before they roll off.
+    - sparse: bool, return the weights as one (asset positions, weights) pair per month.
+
+    Returns:
+    - weights: np.ndarray, months x assets portfolio weights, or a list of (asset positions,
+      weights) per month with sparse=True.
+    - turnover: np.ndarray, turnover for each month.
+    - portfolio_returns: np.ndarray, gross portfolio return for each month.
+    """
+    monthly_returns = np.asarray(monthly_returns, dtype=float)
+    order, n_valid, skipped = rank_cross_sections(monthly_returns, lookback_period)
+    if sparse:
+        cohorts = ranked_cohorts(order, n_valid, nLong, nShort, holding_period)
+        return sparse_overlapping_backtest(cohorts, monthly_returns, holding_period, skipped)
+    return _backtest_from_ranking(monthly_returns, order, n_valid, skipped, nLong, nShort, holding_period)
+
+
+def _backtest_from_ranking(monthly_returns, order, n_valid, skipped, nLong, nShort, holding_period):
+    """
+    Weights, turnover and returns of one configuration given the output of rank_cross_sections.
+    """
+    allocations = cohort_allocations(order, n_valid, nLong, nShort, holding_period)
+    weights = overlapping_weights(allocations, holding_period, skipped)
+    turnover = turnover_from_weights(weights)
+    portfolio_returns = returns_from_weights(weights, monthly_returns)
+    return weights, turnover, portfolio_returns
+
+
+def drifted_weights(allocations, monthly_returns, holding_period, skipped):
+    """
+    Portfolio weights when each cohort is bought and held instead of reset to target monthly.
+
+    A cohort's positions grow with their asset returns until the cohort rolls off. The
+    long (short) leg of a new cohort is funded by the proceeds of the long (short) leg of
+    the cohort it replaces, so surviving cohorts are never traded; cohorts that replace
+    nothing are bought at their target weights. Holdings are tracked as cumulative asset
+    growth times the sum of the held cohorts' allocations deflated by the growth at their
+    formation, so the accounting is a few months x assets array operations plus one loop
+    over months for the funding chain.
+
+    Parameters:
+    - allocations: np.ndarray, months x assets matrix of cohort target weights (see cohort_allocations).
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - holding_period: int, number of months each cohort is held.
+    - skipped: np.ndarray of bool, months in which no cohort could be formed.
+
+    Returns:
+    - weights: np.ndarray, months x assets weights after trading at each month-end.
+    - pre_trade_weights: np.ndarray, months x assets weights of the previous month's
+      holdings after this month's returns, before trading.
+    - portfolio_returns: np.ndarray, gross portfolio return for each month.
+    """
+    n_months = len(allocations)
+    growth = np.cumprod(1 + np.where(np.isnan(monthly_returns), 0.0, monthly_returns), axis=0)
+    long_legs = np.maximum(allocations, 0.0)
+    short_legs = np.minimum(allocations, 0.0)
+
+    # Growth of each leg of the cohort formed in month s - holding_period until month s
+    long_target = long_legs.sum(axis=1)
+    short_target = short_legs.sum(axis=1)
+    rolled_long = np.zeros(n_months)
+    rolled_short = np.zeros(n_months)
+    if n_months > holding_period:
+        relative = growth[holding_period:] / growth[:-holding_period]
+        rolled_long[holding_period:] = np.einsum('ij,ij->i', long_legs[:-holding_period], relative)
+        rolled_short[holding_period:] = np.einsum('ij,ij->i', short_legs[:-holding_period], relative)
+
+    # Size of each cohort's legs relative to their targets, chained through the cohorts they replace
+    long_scale = np.ones(n_months)
+    short_scale = np.ones(n_months)
+    rolls = ~skipped
+    rolls[:holding_period] = False
+    for s in np.flatnonzero(rolls):
+        if long_target[s] != 0 and rolled_long[s] != 0:
+            long_scale[s] = long_scale[s - holding_period] * rolled_long[s] / long_target[s]
+        if short_target[s] != 0 and rolled_short[s] != 0:
+            short_scale[s] = short_scale[s - holding_period] * rolled_short[s] / short_target[s]
+    invested = long_scale[:, None] * long_legs + short_scale[:, None] * short_legs
+
+    held = _active_cohort_sum(invested / growth, holding_period, skipped)
+    # Positions no held cohort holds any more are exactly zero, not cancellation residue
+    held_count = _active_cohort_sum((allocations != 0).astype(np.int64), holding_period, skipped)
+    held[held_count == 0] = 0.0
+
+    # Cash pays for cohorts bought without a predecessor and receives proceeds not reinvested
+    purchases = invested.sum(axis=1)
+    proceeds = np.zeros(n_months)
+    proceeds[holding_period:] = (long_scale[:-holding_period] * rolled_long[holding_period:]
+                                 + short_scale[:-holding_period] * rolled_short[holding_period:])
+    proceeds[~rolls] = 0.0
+    cash = 1 + np.cumsum(proceeds - purchases)
+
+    holdings = held * growth
+    net_asset_value = cash + holdings.sum(axis=1)
+    weights = holdings / net_asset_value[:, None]
+    pre_trade_weights = np.zeros_like(weights)
+    pre_trade_weights[1:] = held[:-1] * growth[1:] / net_asset_value[1:, None]
+
+    # Trades are paid from cash, so the value before and after trading is the same
+    portfolio_returns = np.zeros(n_months)
+    portfolio_returns[1:] = net_asset_value[1:] / net_asset_value[:-1] - 1
+    return weights, pre_trade_weights, portfolio_returns
+
+
+def run_drift_backtest(monthly_returns, lookback_period, nLong, nShort, holding_period):
+    """
+    Momentum backtest with buy-and-hold cohorts (see drifted_weights).
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_period: int, number of months to hold the positions before they roll off.
+
+    Returns:
+    - weights: np.ndarray, months x assets weights after trading.
+    - pre_trade_weights: np.ndarray, months x assets drifted weights before trading.
+    - turnover: np.ndarray, traded weight for each month, measured against the drifted holdings.
+    - portfolio_returns: np.ndarray, gross portfolio return for each month.
+    """
+    monthly_returns = np.asarray(monthly_returns, dtype=float)
+    order, n_valid, skipped = rank_cross_sections(monthly_returns, lookback_period)
+    allocations = cohort_allocations(order, n_valid, nLong, nShort, holding_period)
+    weights, pre_trade_weights, portfolio_returns = drifted_weights(allocations, monthly_returns, holding_period, skipped)
+    turnover = np.abs(weights - pre_trade_weights).sum(axis=1)
+    return weights, pre_trade_weights, turnover, portfolio_returns
+
+
+def run_holding_period_backtests(monthly_returns, lookback_period, nLong, nShort, holding_periods, return_weights=False):
+    """
+    Backtests several holding periods from a single ranking pass.
+
+    The monthly cohort selection does not depend on the holding period, so the ranking and
+    the cumulative sum of cohort allocations are computed once. Each holding period then
+    only needs a shifted difference of that sum, scaled by 1 / holding_period.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - lookback_period: int, number of months to look back for momentum calculation.
+    - nLong: int, number of assets to go long.
+    - nShort: int, number of assets to short.
+    - holding_periods: sequence of int, holding periods to evaluate.
+    - return_weights: bool, whether to also return the weight matrix of every holding period.
+
+    Returns:
+    - turnover: np.ndarray, months x holding periods turnover.
+    - portfolio_returns: np.ndarray, months x holding periods gross portfolio returns.
+    - weights: list of np.ndarray (one months x assets matrix per holding period), only if
+      return_weights is True.
+    """
+    monthly_returns = np.asarray(monthly_returns, dtype=float)
+    order, n_valid, skipped = rank_cross_sections(monthly_returns, lookback_period)
+
+    # Cohort weights for a one-month holding period; longer holdings scale them by 1 / h
+    unit_allocations = cohort_allocations(order, n_valid, nLong, nShort, 1)
+    unit_cumulative = np.cumsum(unit_allocations, axis=0)
+
+    n_months = monthly_returns.shape[0]
+    turnover = np.zeros((n_months, len(holding_periods)))
+    portfolio_returns = np.zeros((n_months, len(holding_periods)))
+    all_weights = []
+    for j, holding_period in enumerate(holding_periods):
+        weights = overlapping_weights(
+            unit_allocations / holding_period, holding_period, skipped, cumulative=unit_cumulative / holding_period
+        )
+        turnover[:, j] = turnover_from_weights(weights)
+        portfolio_returns[:, j] = returns_from_weights(weights, monthly_returns)
+        if return_weights:
+            all_weights.append(weights)
+
+    if return_weights:
+        return turnover, portfolio_returns, all_weights
+    return turnover, portfolio_returns
+
+
+def _leg_ranking(order, n_valid, width, short=False):
+    """
+    Ranked asset columns and per-asset rank positions for one leg of the portfolio.
+
+    Parameters:
+    - order: np.ndarray of int, months x assets ranking from rank_assets.
+    - n_valid: np.ndarray of int, number of eligible assets per month.
+    - width: int, number of ranks to keep (the largest leg size of interest).
+    - short: bool, rank from the worst eligible asset upwards instead of from the best.
+
+    Returns:
+    - leg_order: np.ndarray of int, months x width asset columns by rank within the leg.
+      Ranks beyond the eligible assets point to the sentinel column n_assets.
+    - positions: np.ndarray of int, months x assets rank of each asset within the leg;
+      assets outside the first width ranks get width.
+    """
+    n_months, n_assets = order.shape
+    ranks = np.arange(width)[None, :]
+    in_leg = ranks < np.minimum(n_valid, n_assets)[:, None]
+
+    if short:
+        source = np.clip(n_valid[:, None] - 1 - ranks, 0, n_assets - 1)
+    else:
+        source = np.minimum(ranks, n_assets - 1).repeat(n_months, axis=0)
+    leg_order = np.where(in_leg, np.take_along_axis(order, source, axis=1), n_assets)
+
+    # One spare column absorbs the writes for the sentinel entries
+    positions = np.full((n_months, n_assets + 1), width)
+    np.put_along_axis(positions, leg_order, np.where(in_leg, ranks, width), axis=1)
+    return leg_order, positions[:, :n_assets]
+
+
+def _top_k_leg(filled_returns, leg_order, positions, n_valid, skipped, counts, holding_period):
+    """
+    Turnover and returns of equal-weight top-k portfolios of one leg for every k in counts.
+
+    Portfolio returns use prefix sums over each cohort's ranked asset returns, and turnover
+    counts how many names the entering and leaving cohorts share, both for all k at once.
+    Weights are positive; the short leg is negated by the caller.
+
+    Returns:
+    - turnover: np.ndarray, months x len(counts).
+    - portfolio_returns: np.ndarray, months x len(counts).
+    """
+    n_months, width = leg_order.shape
+    counts = np.asarray(counts)
+    scale = 1.0 / (np.maximum(counts, 1) * holding_period)
+
+    # Sum of the first k ranked returns of every cohort held in month t - 1, for all k
+    held_prefix = np.zeros((n_months, width))
+    for lag in range(1, min(holding_period, n_months - 1) + 1):
+        gathered = np.take_along_axis(filled_returns[lag:], leg_order[:-lag], axis=1)
+        held_prefix[lag:] += np.cumsum(gathered, axis=1)
+
+    # Cohorts whose roll-off month is skipped stay in the book from then on
+    for cohort in np.flatnonzero(skipped) - holding_period:
+        if cohort < 0 or cohort + holding_period + 1 >= n_months:
+            continue
+        gathered = filled_returns[cohort + holding_period + 1:, leg_order[cohort]]
+        held_prefix[cohort + holding_period + 1:] += np.cumsum(gathered, axis=1)
+
+    column = np.clip(counts - 1, 0, width - 1)
+    portfolio_returns = np.where(counts > 0, held_prefix[:, column] * scale, 0.0)
+
+    # Names entering with cohort t plus names leaving with cohort t - holding_period,
+    # minus twice the names present in both
+    entering = np.minimum(counts[None, :], n_valid[:, None])
+    leaving = np.zeros_like(entering)
+    overlap = np.zeros_like(entering)
+    if n_months > holding_period:
+        leaving[holding_period:] = entering[:-holding_period]
+        both = np.maximum(positions[holding_period:], positions[:-holding_period])
+        codes = both + (width + 1) * np.arange(n_months - holding_period)[:, None]
+        histogram = np.bincount(codes.ravel(), minlength=(n_months - holding_period) * (width + 1))
+        shared = np.cumsum(histogram.reshape(n_months - holding_period, width + 1), axis=1)
+        overlap[holding_period:] = shared[:, column]
+    turnover = (entering + leaving - 2 * overlap) * scale
+    turnover[skipped] = 0.0
+    turnover[:, counts == 0] = 0.0
+
+    return turnover, portfolio_returns
+
+
+def top_k_backtests(monthly_returns, order, n_valid, skipped, long_counts, short_counts, holding_period):
+    """
+    Turnover and returns for a grid of long and short leg sizes from one ranking.
+
+    Each cross-section is sorted once; the equal-weight top-k (long) and bottom-k (short)
+    portfolios for every k come out of prefix sums over that sorted order. Long and short
+    results add up leg by leg. Grid points where the legs could share names (some month has
+    fewer than nLong + nShort eligible assets) are recomputed exactly so that the short leg
+    wins, as in the loop engine. Weights are not rounded, so results can differ from
+    run_vectorized_backtest by about 1e-10.
+
+    Parameters:
+    - monthly_returns: np.ndarray, months x assets matrix of (clipped) monthly returns.
+    - order, n_valid, skipped: output of rank_cross_sections.
+    - long_counts: sequence of int, long leg sizes (0 = no long leg).
+    - short_counts: sequence of int, short leg sizes (0 = no short leg).
+    - holding_period: int, number of months each cohort is held.
+
+    Returns:
+    - turnover: np.ndarray, months x len(long_counts) x len(short_counts).
+    - portfolio_returns: np.ndarray, months x len(long_counts) x len(short_counts).
+    """
+    long_counts = list(long_counts)
+    short_counts = list(short_counts)
+    filled_returns = np.where(np.isnan(monthly_returns), 0.0, monthly_returns)
+    # Sentinel column with zero return for ranks beyond the eligible assets
+    filled_returns = np.hstack([filled_returns, np.zeros((filled_returns.shape[0], 1))])
+
+    legs = []
+    for counts, short in ((long_counts, False), (short_counts, True)):
+        width = max(max(counts, default=0), 1)
+        leg_order, positions = _leg_ranking(order, n_valid, width, short=short)
+        legs.append(_top_k_leg(filled_returns, leg_order, positions, n_valid, skipped, counts, holding_period))
+    (long_turnover, long_returns), (short_turnover, short_returns) = legs
+
+    turnover = long_turnover[:, :, None] + short_turnover[:, None, :]
+    portfolio_returns = long_returns[:, :, None] - short_returns[:, None, :]
+
+    formed = n_valid > 0
+    min_valid = n_valid[formed].min() if formed.any() else 0
+    for a, nLong in enumerate(long_counts):
+        for b, nShort in enumerate(short_counts):
+            if nLong > 0 and nShort > 0 and nLong + nShort > min_valid and formed.any():
+                _, turnover[:, a, b], portfolio_returns[:, a, b] = _backtest_from_ranking(
+                    monthly_returns, order, n_valid, skipped, nLong, nShort, holding_period
+                )
+
+    return turnover, portfolio_returns
+
+
+def run_top_k_backtests(monthly_returns, lookback_period, long_counts, short_counts, holding_period):
+    """
+    Backtests a whole grid of nLong x nShort values from a single ranking pass (see top_k_backtests).
+    """
+    monthly_returns = np.asarray(monthly_returns, dtype=float)
+    order, n_valid, skipped = rank_cross_sections(monthly_returns, lookback_period)
+    return top_k_backtests(monthly_returns, order, n_valid, skipped, long_counts, short_counts, holding_period)
+
+
+def trading_costs(weights, trx_costs=(), cost_schedules=(), pre_trade_weights=None):
+    """
+    Transaction costs per month for many cost assumptions from a single set of weights.
+
+    Parameters:
+    - weights: np.ndarray, months x assets portfolio weights.
+    - trx_costs: sequence of float, flat costs per unit of turnover.
+    - cost_schedules: sequence of np.ndarray, per-asset costs per unit traded, each either a
+      vector with one entry per asset or a months x assets matrix of time-varying costs.
+    - pre_trade_weights: np.ndarray, optional months x assets holdings before trading (e.g.
+      drifted weights from drifted_weights). Defaults to the previous month's weights.
+
+    Returns:
+    - np.ndarray, months x (len(trx_costs) + len(cost_schedules)) matrix of costs, flat
+      cost levels first, followed by the schedules in the given order.
+    """
+    if pre_trade_weights is None:
+        trades = np.abs(np.diff(weights, axis=0, prepend=0.0))
+    else:
+        trades = np.abs(weights - pre_trade_weights)
+    turnover = trades.sum(axis=1)
+
+    costs = [np.outer(turnover, np.asarray(trx_costs, dtype=float))]
+    for schedule in cost_schedules:
+        schedule = np.asarray(schedule, dtype=float)
+        if schedule.ndim == 1:
+            costs.append((trades @ schedule)[:, None])
+        else:
+            costs.append(np.einsum('ij,ij->i', trades, schedule)[:, None])
+    return np.hstack(costs)
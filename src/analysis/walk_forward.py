@@ -0,0 +1,127 @@
+# src/analysis/walk_forward.py
+
+import numpy as np
+import pandas as pd
+from src.analysis.instrumentation import instrumented
+from src.analysis.parameter_sweep import sweep_excess_returns
+
+# In-sample criteria for picking a configuration
+SELECTION_METRICS = ("Sharpe_Ratio_Arithmetic", "Arithmetic_Avg_Excess_Return")
+
+
+def rolling_window_scores(excess_returns, window, metric="Sharpe_Ratio_Arithmetic", annualization_factor=12):
+    """
+    Scores every configuration on every trailing window at once.
+
+    Window sums come from differences of cumulative sums of the returns and squared
+    returns, so moving the window by one month costs one subtraction per configuration
+    instead of a new pass over the window.
+
+    Parameters:
+    - excess_returns: pd.DataFrame, months x configurations excess returns.
+    - window: int, months per in-sample window.
+    - metric: str, one of SELECTION_METRICS, defined as in summarize_performance.
+    - annualization_factor: int, periods per year.
+
+    Returns:
+    - pd.DataFrame: months x configurations scores of the window ending in each month (NaN
+      until a full window is available or where the window has missing returns).
+    """
+    if metric not in SELECTION_METRICS:
+        raise ValueError(f"Unknown selection metric '{metric}'. Choose from {SELECTION_METRICS}.")
+    values = excess_returns.to_numpy(dtype=float)
+    n_months = values.shape[0]
+    scores = np.full(values.shape, np.nan)
+    if n_months < window:
+        return pd.DataFrame(scores, index=excess_returns.index, columns=excess_returns.columns)
+
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    zeros = np.zeros((1, values.shape[1]))
+    cum_sum = np.concatenate((zeros, np.cumsum(filled, axis=0)))
+    cum_sq = np.concatenate((zeros, np.cumsum(filled ** 2, axis=0)))
+    cum_count = np.concatenate((zeros, np.cumsum(valid, axis=0)))
+
+    window_sum = cum_sum[window:] - cum_sum[:-window]
+    window_sq = cum_sq[window:] - cum_sq[:-window]
+    complete = (cum_count[window:] - cum_count[:-window]) == window
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = window_sum / window
+        if metric == "Sharpe_Ratio_Arithmetic":
+            variance = np.maximum(window_sq - window_sum * mean, 0.0) / (window - 1)
+            score = mean / np.sqrt(variance) * np.sqrt(annualization_factor)
+        else:
+            score = annualization_factor * 100 * mean
+    scores[window - 1:] = np.where(complete, score, np.nan)
+    return pd.DataFrame(scores, index=excess_returns.index, columns=excess_returns.columns)
+
+
+@instrumented()
+def walk_forward(price_data_daily, param_grid, rf_monthly, window=60, step=12, metric="Sharpe_Ratio_Arithmetic",
+                 lookback_period=6, nLong=20, nShort=0, holding_period=6, trx_cost=0, annualization_factor=12,
+                 start=None, n_jobs=None):
+    """
+    Walk-forward selection of the momentum strategy's parameters.
+
+    At every re-estimation date the configuration with the best in-sample score over the
+    trailing window is picked and traded out-of-sample until the next re-estimation date,
+    step months later. Each configuration is backtested once over the full history (the
+    backtest only uses past prices, so its return in a month does not depend on when the
+    evaluation starts); the windows then reuse these return series through
+    rolling_window_scores instead of re-running backtests per window.
+
+    Switching configurations is assumed to cost nothing beyond the transaction costs already
+    in each configuration's returns.
+
+    Parameters:
+    - price_data_daily: pd.DataFrame, daily prices with a DateTime index and one column per asset, or a MarketData.
+    - param_grid: dict or list, configurations to choose from (see expand_param_grid).
+    - rf_monthly: pd.DataFrame, monthly risk-free rate (indexed by date). May be None for a MarketData.
+    - window: int, months per in-sample window.
+    - step: int, months traded out-of-sample before re-estimating.
+    - metric: str, in-sample selection criterion from SELECTION_METRICS.
+    - lookback_period, nLong, nShort, holding_period, trx_cost: values used for parameters
+      that are not part of the grid.
+    - annualization_factor: int, periods per year.
+    - start: date-like, first out-of-sample month. Defaults to the first month after the
+      longest lookback plus one full window, so no window covers the backtests' warm-up.
+    - n_jobs: int, number of worker processes for the backtests. None uses all CPUs.
+
+    Returns:
+    - excess_returns: pd.DataFrame, out-of-sample excess returns ('Strategy_Returns').
+    - selections: pd.DataFrame, one row per re-estimation date (the last in-sample month)
+      with the chosen parameters and their in-sample score.
+    """
+    configs, config_returns = sweep_excess_returns(
+        price_data_daily, param_grid, rf_monthly, lookback_period=lookback_period, nLong=nLong, nShort=nShort,
+        holding_period=holding_period, trx_cost=trx_cost, n_jobs=n_jobs,
+    )
+    scores = rolling_window_scores(config_returns, window, metric, annualization_factor).to_numpy()
+    months = config_returns.index
+
+    if start is None:
+        first = int(configs["lookback_period"].max()) + 1 + window
+    else:
+        first = max(int(months.searchsorted(pd.Timestamp(start))), window)
+    if first >= len(months):
+        raise ValueError("Not enough months for one in-sample window before the out-of-sample period.")
+
+    values = config_returns.to_numpy(dtype=float)
+    out_of_sample = []
+    selections = []
+    for oos_start in range(first, len(months), step):
+        in_sample_end = oos_start - 1
+        window_scores = scores[in_sample_end]
+        if np.isnan(window_scores).all():
+            continue
+        best = int(np.nanargmax(window_scores))
+        oos_end = min(oos_start + step, len(months))
+        out_of_sample.append(pd.Series(values[oos_start:oos_end, best], index=months[oos_start:oos_end]))
+        selections.append({"date": months[in_sample_end], **configs.iloc[best].to_dict(), metric: window_scores[best]})
+
+    if not out_of_sample:
+        raise ValueError("No configuration could be scored on any in-sample window.")
+    excess_returns = pd.concat(out_of_sample).to_frame(name='Strategy_Returns')
+    excess_returns.index.name = months.name
+    return excess_returns, pd.DataFrame(selections).set_index("date")
@@ -0,0 +1,342 @@
+# src/benchmarks/run_benchmarks.py
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Determine the project root (two levels up from the current file)
+project_root = Path(__file__).resolve().parents[2]
+sys.path.append(str(project_root))
+
+from src.analysis.large_universe import synthetic_universe
+from src.analysis.load_data import load_data
+from src.analysis.market_data import monthly_returns_from_prices
+from src.analysis.momentum_strategy_backtest import momentum_strategy
+from src.analysis.parameter_sweep import run_parameter_sweep
+from src.analysis.summarize_performance import summarize_performance, summarize_performance_batch
+
+RESULTS_DIR = project_root / "data" / "results" / "benchmarks"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+# Panel sizes (assets, months); the loop engine only runs on the smaller ones
+QUICK_SIZES = [(50, 120), (200, 300)]
+FULL_SIZES = QUICK_SIZES + [(1000, 300), (5000, 300)]
+LOOP_MAX_ASSETS = 200
+
+# Configurations per parameter sweep and strategies per batch summary
+SWEEP_GRIDS = {
+    4: {"lookback_period": [3, 6], "holding_period": [3, 6]},
+    36: {"lookback_period": [3, 6, 9], "holding_period": [3, 6, 9], "nLong": [10, 20, 30, 40]},
+    144: {"lookback_period": [1, 3, 6, 9, 12, 18], "holding_period": [1, 3, 6, 12], "nLong": [5, 10, 20, 40, 60, 80]},
+}
+BATCH_WIDTHS = [10, 100, 1000]
+
+# Ratio to the baseline above which a benchmark counts as a regression
+DEFAULT_THRESHOLD = 1.25
+
+_PANELS = {}
+
+
+def synthetic_panel(n_assets, n_months, seed=0):
+    """
+    Daily prices, monthly risk-free returns and benchmark excess returns of a synthetic universe.
+
+    Panels are generated once per size and reused by every benchmark.
+    """
+    key = (n_assets, n_months, seed)
+    if key not in _PANELS:
+        start = pd.Timestamp("2000-01-01")
+        end = start + pd.DateOffset(months=n_months) - pd.Timedelta(days=1)
+        prices, rf_monthly = synthetic_universe(n_assets, start=start, end=end, seed=seed, float32=False)
+        market = monthly_returns_from_prices(prices).mean(axis=1)
+        factor_xs_returns = (market - rf_monthly['monthly_return']).dropna().to_frame(name='Benchmark')
+        _PANELS[key] = (prices, rf_monthly, factor_xs_returns)
+    return _PANELS[key]
+
+
+def _backtest_cases(sizes):
+    for n_assets, n_months in sizes:
+        for engine in ("loop", "vectorized", "large"):
+            if engine == "loop" and n_assets > LOOP_MAX_ASSETS:
+                continue
+
+            def setup(n_assets=n_assets, n_months=n_months, engine=engine):
+                prices, rf_monthly, _ = synthetic_panel(n_assets, n_months)
+                return lambda: momentum_strategy(prices, 6, 20, 0, 6, rf_monthly, 0.001, engine=engine)
+
+            yield "momentum_strategy", {"engine": engine, "assets": n_assets, "months": n_months}, setup
+
+
+def _statistics_cases(sizes):
+    for n_assets, n_months in sizes[:2]:
+        def setup(n_assets=n_assets, n_months=n_months):
+            prices, rf_monthly, factor_xs_returns = synthetic_panel(n_assets, n_months)
+            xs_returns, _, _, _ = momentum_strategy(prices, 6, 20, 0, 6, rf_monthly, 0.001, engine="vectorized")
+            return lambda: summarize_performance(xs_returns, rf_monthly, factor_xs_returns, 12)
+
+        yield "summarize_performance", {"assets": n_assets, "months": n_months}, setup
+
+    n_assets, n_months = sizes[1]
+    for width in BATCH_WIDTHS:
+        def setup(width=width):
+            _, rf_monthly, factor_xs_returns = synthetic_panel(n_assets, n_months)
+            rng = np.random.default_rng(0)
+            xs_returns = pd.DataFrame(rng.normal(0.005, 0.04, (len(rf_monthly), width)), index=rf_monthly.index)
+            return lambda: summarize_performance_batch(xs_returns, rf_monthly, factor_xs_returns, 12)
+
+        yield "summarize_performance_batch", {"strategies": width, "months": n_months}, setup
+
+
+def _sweep_cases(sizes):
+    n_assets, n_months = sizes[1]
+    for width, grid in SWEEP_GRIDS.items():
+        def setup(grid=grid):
+            prices, rf_monthly, factor_xs_returns = synthetic_panel(n_assets, n_months)
+            return lambda: run_parameter_sweep(prices, grid, rf_monthly, factor_xs_returns, n_jobs=1)
+
+        yield "run_parameter_sweep", {"configs": width, "assets": n_assets, "months": n_months}, setup
+
+
+def _io_cases(sizes, workdir):
+    for n_assets, n_months in sizes:
+        def setup(n_assets=n_assets, n_months=n_months):
+            csv_path = workdir / f"prices_{n_assets}x{n_months}.csv"
+            if not csv_path.exists():
+                synthetic_panel(n_assets, n_months)[0].to_csv(csv_path)
+            return lambda: load_data(csv_path)
+
+        yield "load_data", {"format": "csv", "assets": n_assets, "months": n_months}, setup
+
+        def setup(n_assets=n_assets, n_months=n_months):
+            from src.data_processing.columnar_storage import save_frame
+            feather_path = workdir / f"prices_{n_assets}x{n_months}.feather"
+            if not feather_path.exists():
+                save_frame(synthetic_panel(n_assets, n_months)[0], feather_path)
+            return lambda: load_data(feather_path)
+
+        yield "load_data", {"format": "feather", "assets": n_assets, "months": n_months}, setup
+
+
+def write_refinitiv_workbook(path, prices):
+    """
+    Writes prices in the layout of the Datastream exports (three header rows, names, currency, dates).
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet("RI")
+    for _ in range(3):
+        worksheet.append([None])
+    worksheet.append(["Name"] + list(prices.columns))
+    worksheet.append(["CURRENCY"] + ["CHF"] * prices.shape[1])
+    for date, row in zip(prices.index, prices.to_numpy()):
+        worksheet.append([date.strftime("%d.%m.%Y")] + [None if np.isnan(value) else float(value) for value in row])
+    workbook.save(path)
+
+
+def _excel_cases(workdir):
+    # openpyxl is slow to write and read, so the workbook stays small
+    n_assets, n_months = 50, 60
+    xlsx_path = workdir / f"constituents_{n_assets}x{n_months}.xlsx"
+
+    def workbook():
+        if not xlsx_path.exists():
+            write_refinitiv_workbook(xlsx_path, synthetic_panel(n_assets, n_months)[0])
+        return xlsx_path
+
+    def setup_read_excel():
+        from src.data_processing.constituents_data_processing import load_and_clean_data
+        path = workbook()
+        return lambda: load_and_clean_data(path, use_cache=False)
+
+    def setup_stream():
+        from src.data_processing.constituents_data_processing import load_and_clean_data
+        path = workbook()
+        # A fresh cache folder per call measures the streaming conversion, not a cache hit
+        return lambda: load_and_clean_data(path, use_cache=True, cache_dir=tempfile.mkdtemp(dir=workdir))
+
+    params = {"assets": n_assets, "months": n_months}
+    yield "constituents_data_processing", {"reader": "read_excel", **params}, setup_read_excel
+    yield "constituents_data_processing", {"reader": "streamed", **params}, setup_stream
+
+
+def collect_benchmarks(quick, workdir):
+    """
+    Lists (name, params, setup) for every benchmark; setup returns the function to time.
+    """
+    sizes = QUICK_SIZES if quick else FULL_SIZES
+    yield from _backtest_cases(sizes)
+    yield from _statistics_cases(sizes)
+    yield from _sweep_cases(sizes)
+    yield from _io_cases(sizes, workdir)
+    yield from _excel_cases(workdir)
+
+
+def measure(func, repeat):
+    """
+    Times func and records its peak traced memory.
+
+    Parameters:
+    - func: callable without arguments.
+    - repeat: int, number of timed calls.
+
+    Returns:
+    - dict: 'seconds_min' and 'seconds_median' over the timed calls, and 'peak_mb', the peak
+      memory allocated by one extra call (traced separately, as tracing slows the calls down).
+    """
+    func()  # warm-up: imports, caches, first-call allocations
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": float(np.median(timings)),
+        "peak_mb": peak / 1024 ** 2,
+    }
+
+
+def benchmark_id(name, params):
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def run_benchmarks(quick=False, repeat=3, select=None):
+    """
+    Runs the benchmark suite.
+
+    Parameters:
+    - quick: bool, only use the small panel sizes.
+    - repeat: int, timed calls per benchmark.
+    - select: str, optional substring; only benchmarks whose id contains it are run.
+
+    Returns:
+    - dict: run metadata and one result per benchmark ('id', 'name', 'params' and the
+      measurements of measure, or 'skipped' with the reason).
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, params, setup in collect_benchmarks(quick, Path(workdir)):
+            bench_id = benchmark_id(name, params)
+            if select and select not in bench_id:
+                continue
+            try:
+                func = setup()
+                measurement = measure(func, repeat)
+            except ImportError as error:
+                # Optional dependencies (openpyxl, pyarrow) may be missing
+                print(f"{bench_id}: skipped ({error})")
+                results.append({"id": bench_id, "name": name, "params": params, "skipped": str(error)})
+                continue
+            print(f"{bench_id}: {measurement['seconds_min']:.4f} s, {measurement['peak_mb']:.1f} MB")
+            results.append({"id": bench_id, "name": name, "params": params, **measurement})
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "quick": quick,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_to_baseline(run, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares a run with a baseline run.
+
+    Parameters:
+    - run, baseline: dict, outputs of run_benchmarks.
+    - threshold: float, time or memory ratio above which a benchmark is flagged.
+
+    Returns:
+    - pd.DataFrame: one row per benchmark in both runs with the baseline and current
+      minimum time and peak memory, their ratios and a 'regression' flag.
+    """
+    previous = {result["id"]: result for result in baseline["results"] if "skipped" not in result}
+    rows = []
+    for result in run["results"]:
+        if "skipped" in result or result["id"] not in previous:
+            continue
+        old = previous[result["id"]]
+        time_ratio = result["seconds_min"] / old["seconds_min"] if old["seconds_min"] > 0 else np.nan
+        memory_ratio = result["peak_mb"] / old["peak_mb"] if old["peak_mb"] > 0 else np.nan
+        rows.append({
+            "id": result["id"],
+            "baseline_s": old["seconds_min"],
+            "current_s": result["seconds_min"],
+            "time_ratio": time_ratio,
+            "baseline_mb": old["peak_mb"],
+            "current_mb": result["peak_mb"],
+            "memory_ratio": memory_ratio,
+            "regression": bool(time_ratio > threshold or memory_ratio > threshold),
+        })
+    columns = ["id", "baseline_s", "current_s", "time_ratio", "baseline_mb", "current_mb", "memory_ratio", "regression"]
+    return pd.DataFrame(rows, columns=columns).set_index("id")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the backtest, statistics and I/O hot paths on synthetic data.")
+    parser.add_argument("--quick", action="store_true", help="only run the small panel sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed calls per benchmark")
+    parser.add_argument("--select", help="only run benchmarks whose id contains this text")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json", help="where to write the results")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="ratio to the baseline that counts as a regression")
+    args = parser.parse_args(argv)
+
+    run = run_benchmarks(quick=args.quick, repeat=args.repeat, select=args.select)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    comparison = compare_to_baseline(run, baseline, args.threshold)
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(comparison.round(3).to_string())
+    regressions = comparison.index[comparison["regression"]]
+    if len(regressions) > 0:
+        print(f"{len(regressions)} benchmark(s) slower or larger than {args.threshold:.2f}x the baseline.")
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import warnings
+import pandas as pd
+from pathlib import Path
+
+# File suffixes of the supported storage formats
+COLUMNAR_SUFFIXES = {".feather": "feather", ".arrow": "feather", ".parquet": "parquet"}
+CSV_SUFFIX = ".csv"
+
+# Preferred order when several copies of the same dataset were modified at the same time
+SUFFIX_PREFERENCE = (".feather", ".arrow", ".parquet", ".csv")
+
+
+def require_pyarrow():
+    """
+    Imports pyarrow, which is needed for the Feather and Parquet formats.
+    """
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Reading and writing Feather/Parquet files requires pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+def is_columnar_path(path):
+    """
+    Returns True if the file suffix is one of the columnar formats.
+    """
+    return Path(path).suffix.lower() in COLUMNAR_SUFFIXES
+
+
+def find_data_file(directory, name):
+    """
+    Locates a dataset stored under any supported suffix.
+
+    When several copies exist, the most recently modified one is used, so a CSV that was
+    edited or regenerated after the columnar copy is not shadowed by the stale copy. Copies
+    modified at the same time are ranked by SUFFIX_PREFERENCE (columnar formats first), and
+    a warning names the preferred copies that were passed over because they are older.
+
+    Parameters:
+    - directory (str or Path): Folder to look in.
+    - name (str): File name without suffix, e.g. "constituents_data".
+
+    Returns:
+    - Path: The newest existing copy, or the CSV path if none exists.
+    """
+    directory = Path(directory)
+    candidates = [directory / f"{name}{suffix}" for suffix in SUFFIX_PREFERENCE]
+    candidates = [(path, path.stat().st_mtime) for path in candidates if path.exists()]
+    if not candidates:
+        return directory / f"{name}{CSV_SUFFIX}"
+
+    # max keeps the first of equally recent copies, i.e. the preferred format
+    position = max(range(len(candidates)), key=lambda k: candidates[k][1])
+    path = candidates[position][0]
+    if position > 0:
+        skipped = ", ".join(other.name for other, _ in candidates[:position])
+        warnings.warn(f"Using {path.name}, which is newer than {skipped}.")
+    return path
+
+
+def save_frame(data, path, index=True):
+    """
+    Saves a DataFrame in the format given by the file suffix (.feather/.arrow, .parquet or .csv).
+
+    Feather files are written uncompressed so that they can be memory-mapped on load.
+    Column names are stored as strings; the index is stored as a regular column.
+
+    Parameters:
+    - data (pd.DataFrame or pd.Series): Data to save.
+    - path (str or Path): Output file.
+    - index (bool): Whether to store the index (as for DataFrame.to_csv).
+    """
+    path = Path(path)
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+
+    if not is_columnar_path(path):
+        data.to_csv(path, index=index)
+        return
+
+    require_pyarrow()
+    if index:
+        data = data.reset_index()
+    else:
+        data = data.reset_index(drop=True)
+    data.columns = [str(column) for column in data.columns]
+
+    if COLUMNAR_SUFFIXES[path.suffix.lower()] == "feather":
+        data.to_feather(path, compression="uncompressed")
+    else:
+        data.to_parquet(path, engine="pyarrow", index=False)
+
+
+def load_frame(path, columns=None, index_col="date", memory_map=True):
+    """
+    Loads a Feather or Parquet file with typed columns, reading only the requested columns.
+
+    Parameters:
+    - path (str or Path): Input file (.feather/.arrow or .parquet).
+    - columns (list, optional): Columns to load besides index_col. Loads all columns if None.
+    - index_col (str, optional): Column to use as the index, if present.
+    - memory_map (bool): Memory-map the file instead of reading it into a buffer.
+
+    Returns:
+    - pd.DataFrame
+    """
+    path = Path(path)
+    if not is_columnar_path(path):
+        raise ValueError(f"{path} is not a Feather or Parquet file.")
+    require_pyarrow()
+
+    if columns is not None:
+        columns = list(columns)
+        if index_col is not None and index_col not in columns:
+            columns = [index_col] + columns
+
+    if COLUMNAR_SUFFIXES[path.suffix.lower()] == "feather":
+        from pyarrow import feather
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    else:
+        from pyarrow import parquet
+        table = parquet.read_table(path, columns=columns, memory_map=memory_map)
+    data = table.to_pandas()
+
+    if index_col is not None and index_col in data.columns:
+        data = data.set_index(index_col)
+    return data
+
+
+def export_csv(path, csv_path=None, index_col="date"):
+    """
+    Writes a CSV copy of a Feather or Parquet file.
+
+    Parameters:
+    - path (str or Path): Columnar input file.
+    - csv_path (str or Path, optional): Output file. Defaults to the input path with a .csv suffix.
+    - index_col (str, optional): Column that was stored as the index.
+
+    Returns:
+    - Path: The written CSV file.
+    """
+    csv_path = Path(csv_path) if csv_path is not None else Path(path).with_suffix(CSV_SUFFIX)
+    data = load_frame(path, index_col=index_col)
+    data.to_csv(csv_path, index=index_col is not None and data.index.name == index_col)
+    return csv_path
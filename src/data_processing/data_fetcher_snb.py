@@ -1,81 +1,264 @@
+import json
 import os
 import requests
 import pandas as pd
-from joblib import Memory
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from .fetch_cache import FetchCache
+except ImportError:  # run as a script from src/data_processing
+    from fetch_cache import FetchCache
 
 # Define the base path for file locations
 BASE_PATH = Path(__file__).resolve().parents[2]
 DATA_PATH = BASE_PATH / "data" / "raw"
-CACHE_DIR = DATA_PATH / "cache"
+CACHE_DIR = DATA_PATH / "cache" / "fetch"
+
+# SNB data portal and the default series (1-year Swiss Confederation bond yield)
+API_BASE_URL = "https://data.snb.ch/api/cube"
+DEFAULT_CUBE = "rendoblid"
+DEFAULT_DIM_SEL = "D0(1J,E)"
+DEFAULT_START_DATE = "1999-01-01"
+REQUEST_TIMEOUT = 30
+
+# Cube/dimension selections for alternative risk-free proxies: Confederation bond yields by
+# maturity and the SARON money-market rate
+RATE_SELECTIONS = [
+    {"name": "confed_1y", "cube": "rendoblid", "dim_sel": "D0(1J,E)"},
+    {"name": "confed_2y", "cube": "rendoblid", "dim_sel": "D0(2J,E)"},
+    {"name": "confed_5y", "cube": "rendoblid", "dim_sel": "D0(5J,E)"},
+    {"name": "confed_10y", "cube": "rendoblid", "dim_sel": "D0(10J,E)"},
+    {"name": "saron", "cube": "zimoma", "dim_sel": "D0(SARON)"},
+]
+
+# HTTP status codes that are retried with exponential backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def build_url(cube, dim_sel, from_date, to_date=None, base_url=API_BASE_URL):
+    """
+    Builds the JSON data URL of an SNB cube for a date range.
+
+    Parameters:
+    - cube (str): Cube id, e.g. "rendoblid".
+    - dim_sel (str): Dimension selection, e.g. "D0(1J,E)".
+    - from_date (str): First date (YYYY-MM-DD).
+    - to_date (str, optional): Last date (YYYY-MM-DD). Open-ended if None.
+    - base_url (str): API root, e.g. a local stub server for testing.
+
+    Returns:
+    - str: The request URL.
+    """
+    url = f"{base_url}/{cube}/data/json/en?dimSel={dim_sel}&fromDate={from_date}"
+    if to_date is not None:
+        url += f"&toDate={to_date}"
+    return url
+
+def parse_timeseries(data_json):
+    """
+    Converts an SNB JSON response into a DataFrame with 'date' and 'value' columns.
+    """
+    # Convert timeseries data to a list of dictionaries for each date and value
+    records = []
+    for series in data_json.get("timeseries", []):
+        for value in series.get("values", []):
+            records.append({
+                "date": value["date"],
+                "value": value["value"]
+            })
+    return pd.DataFrame(records, columns=["date", "value"])
 
-# Updated API URL for JSON data
-API_URL = "https://data.snb.ch/api/cube/rendoblid/data/json/en?dimSel=D0(1J,E)&fromDate=1999-01-01&toDate=2024-10-31"
+# Bounded cache of API responses, revalidated with the server once a day
+fetch_cache = FetchCache(CACHE_DIR)
 
-# Initialize memoization cache
-memory = Memory(CACHE_DIR, verbose=0)
+def read_store(store_path):
+    """
+    Reads a local store of observations ('date', 'value'); empty if it does not exist yet.
+    """
+    store_path = Path(store_path)
+    if not store_path.exists() or store_path.stat().st_size == 0:
+        return pd.DataFrame(columns=["date", "value"])
+    return pd.read_csv(store_path)
 
-@memory.cache
-def fetch_json_data(url):
+def update_store(store_path, cube=DEFAULT_CUBE, dim_sel=DEFAULT_DIM_SEL, start_date=DEFAULT_START_DATE,
+                 base_url=API_BASE_URL, session=None, cache=fetch_cache):
     """
-    Fetches JSON data from the specified API URL and processes it into a DataFrame.
-    Memoizes the result to avoid redundant API calls.
-    
+    Brings an append-only local store of SNB observations up to date.
+
+    Only dates after the last stored observation are requested from the API; the new
+    observations are appended to the store, so earlier rows are never rewritten.
+
     Parameters:
-    - url (str): The API endpoint to fetch data from.
+    - store_path (str or Path): CSV store with 'date' and 'value' columns.
+    - cube (str): Cube id.
+    - dim_sel (str): Dimension selection.
+    - start_date (str): First date to fetch when the store is empty.
+    - base_url (str): API root, e.g. a local stub server for testing.
+    - session (requests.Session, optional): Session to issue the request with. Defaults to a
+      retrying session from make_session.
+    - cache (FetchCache, optional): Response cache, so repeated runs reuse or revalidate the
+      download. None always requests the URL.
 
     Returns:
-    - pd.DataFrame: Processed data as a DataFrame.
+    - pd.DataFrame: The full store after the update.
     """
+    store_path = Path(store_path)
+    stored = read_store(store_path)
+
+    if len(stored) > 0:
+        last_date = pd.to_datetime(stored["date"]).max()
+        from_date = (last_date + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        last_date = None
+        from_date = start_date
+
+    url = build_url(cube, dim_sel, from_date, base_url=base_url)
     print(f"Fetching data from API: {url}")
+    own_session = session is None
+    if own_session:
+        session = make_session(pool_size=1)
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raises an error if the request failed
-
-        # Parse JSON response
-        data_json = response.json()
-        
-        # Extract timeseries values
-        timeseries = data_json.get("timeseries", [])
-        
-        # Convert timeseries data to a list of dictionaries for each date and value
-        records = []
-        for series in timeseries:
-            for value in series.get("values", []):
-                records.append({
-                    "date": value["date"],
-                    "value": value["value"]
-                })
-        
-        # Convert to DataFrame
-        data_df = pd.DataFrame(records)
-        return data_df
-
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err} - URL: {url}")
-        return None
-    except Exception as err:
-        print(f"Other error occurred: {err} - URL: {url}")
-        return None
-
-def save_data(data, filename="snb_yield_data.csv"):
-    """
-    Saves the DataFrame to a CSV file in the specified data directory.
-    
+        new_data = parse_timeseries(get_json(session, url, cache=cache))
+    finally:
+        if own_session:
+            session.close()
+
+    # The API may return the boundary date again; keep strictly newer observations only
+    if last_date is not None and len(new_data) > 0:
+        new_data = new_data[pd.to_datetime(new_data["date"]) > last_date]
+    new_data = new_data.sort_values("date")
+
+    if len(new_data) > 0:
+        store_path.parent.mkdir(parents=True, exist_ok=True)
+        write_header = len(stored) == 0
+        if not write_header:
+            # Start the appended rows on a new line even if the store lacks a trailing newline
+            with open(store_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    with open(store_path, "a") as g:
+                        g.write("\n")
+        new_data.to_csv(store_path, mode="w" if write_header else "a", header=write_header, index=False)
+        print(f"Appended {len(new_data)} observations to {store_path}")
+    else:
+        print(f"{store_path} is up to date")
+
+    return read_store(store_path)
+
+def make_session(pool_size=8, retries=3, backoff_factor=0.5):
+    """
+    Creates a requests session with a connection pool and retries with exponential backoff.
+
     Parameters:
-    - data (pd.DataFrame): Data to save.
-    - filename (str): The filename to save the data as.
+    - pool_size (int): Connections kept open per host.
+    - retries (int): Retries per request on connection errors and RETRY_STATUS_CODES.
+    - backoff_factor (float): Sleep between retries is backoff_factor * 2 ** (retry - 1) seconds.
+
+    Returns:
+    - requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_json(session, url, timeout=REQUEST_TIMEOUT, cache=None):
+    """
+    GETs a URL and decodes the JSON body, going through the response cache if one is given.
+
+    Raises:
+    - requests.exceptions.RequestException: If the request fails (and nothing is cached).
+    """
+    if cache is not None:
+        return json.loads(cache.fetch(session, url, timeout=timeout))
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+def fetch_cube(session, selection, from_date=DEFAULT_START_DATE, to_date=None, base_url=API_BASE_URL,
+               timeout=REQUEST_TIMEOUT, cache=None):
+    """
+    Fetches one cube/dimension selection.
+
+    Parameters:
+    - session (requests.Session): Session to issue the request with.
+    - selection (dict): 'cube' and 'dim_sel', optionally 'name'.
+    - from_date, to_date (str): Date range (YYYY-MM-DD); to_date None is open-ended.
+    - base_url (str): API root.
+    - timeout (float): Connect and read timeout in seconds.
+    - cache (FetchCache, optional): Response cache.
+
+    Returns:
+    - pd.Series: Values indexed by date, named after the selection.
     """
-    save_path = DATA_PATH / filename
-    data.to_csv(save_path, index=False)
-    print(f"Data saved to {save_path}")
+    url = build_url(selection["cube"], selection["dim_sel"], from_date, to_date, base_url=base_url)
+    data = parse_timeseries(get_json(session, url, timeout=timeout, cache=cache))
+    name = selection.get("name", f"{selection['cube']}:{selection['dim_sel']}")
+    return pd.Series(
+        pd.to_numeric(data["value"], errors="coerce").to_numpy(),
+        index=pd.DatetimeIndex(pd.to_datetime(data["date"]), name="date"),
+        name=name,
+    )
+
+def fetch_cubes(selections, from_date=DEFAULT_START_DATE, to_date=None, base_url=API_BASE_URL, max_workers=4,
+                timeout=REQUEST_TIMEOUT, retries=3, backoff_factor=0.5, session=None, cache=None):
+    """
+    Downloads several SNB cube selections concurrently and combines them into one frame.
+
+    Requests share one pooled session and at most max_workers run at the same time. Each
+    request has a timeout and is retried with backoff on connection errors and transient
+    HTTP statuses; a selection that still fails raises instead of being skipped.
+
+    Parameters:
+    - selections (list of dict): Cube selections, see RATE_SELECTIONS.
+    - from_date, to_date (str): Date range (YYYY-MM-DD); to_date None is open-ended.
+    - base_url (str): API root, e.g. a local stand-in server for testing.
+    - max_workers (int): Maximum number of concurrent requests.
+    - timeout (float): Connect and read timeout per request in seconds.
+    - retries (int), backoff_factor (float): Retry policy, see make_session.
+    - session (requests.Session, optional): Session to use instead of a new pooled one.
+    - cache (FetchCache, optional): Response cache shared by the requests, e.g. fetch_cache.
+
+    Returns:
+    - pd.DataFrame: One column per selection, indexed by date (outer join).
+
+    Raises:
+    - requests.exceptions.RequestException: If a selection could not be fetched.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(pool_size=max_workers, retries=retries, backoff_factor=backoff_factor)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(fetch_cube, session, selection, from_date, to_date, base_url, timeout, cache)
+                for selection in selections
+            ]
+            series = [future.result() for future in futures]
+    finally:
+        if own_session:
+            session.close()
+
+    if not series:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+    return pd.concat(series, axis=1).sort_index()
 
 def main():
-    # Fetch and save SNB yield data
+    # Fetch new SNB yield observations and append them to the local store
     print("Fetching SNB yield data...")
-    data = fetch_json_data(API_URL)
-    if data is not None:
-        save_data(data)
+    try:
+        update_store(DATA_PATH / "snb_yield_data.csv", cache=fetch_cache)
+    except requests.exceptions.RequestException as err:
+        print(f"Error fetching SNB yield data: {err}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,205 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .columnar_storage import require_pyarrow
+except ImportError:  # run as a script from src/data_processing
+    from columnar_storage import require_pyarrow
+
+# Rows converted and written per record batch
+CHUNK_ROWS = 2000
+
+# Block size used when hashing workbook contents
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def content_hash(filepath):
+    """
+    SHA-256 of the file contents, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stream_sheet_rows(filepath, sheet_name="RI", skiprows=3):
+    """
+    Yields the cell values of a worksheet row by row without loading the whole workbook.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name]
+        for i, row in enumerate(worksheet.iter_rows(values_only=True)):
+            if i >= skiprows:
+                yield row
+    finally:
+        workbook.close()
+
+
+def _parse_date(value):
+    """
+    Converts a date cell (datetime or 'dd.mm.yyyy' text) to a datetime, or None if it is not a date.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value.strip(), "%d.%m.%Y")
+        except ValueError:
+            return None
+    return None
+
+
+def _to_float(value):
+    """
+    Converts a price cell to float; text such as error codes or 'NA' becomes NaN.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def write_sheet_cache(filepath, cache_path, sheet_name="RI", skiprows=3, chunk_rows=CHUNK_ROWS):
+    """
+    Streams a Refinitiv worksheet into a typed Arrow (Feather) file, one chunk of rows at a time.
+
+    The first streamed row holds the series names and the second the currency, which is
+    dropped. Every following non-blank row is a date followed by one price per series. Only
+    one chunk of rows is held in memory as float64 while writing.
+
+    Parameters:
+    - filepath (str or Path): Excel workbook.
+    - cache_path (str or Path): Output Feather file.
+    - sheet_name (str): Worksheet to read.
+    - skiprows (int): Rows before the row with the series names.
+    - chunk_rows (int): Rows per record batch.
+    """
+    pa = require_pyarrow()
+    from pyarrow import ipc
+
+    rows = stream_sheet_rows(filepath, sheet_name=sheet_name, skiprows=skiprows)
+    header = next(rows)
+    next(rows, None)  # Drop the row with "CURRENCY"
+
+    names = ["" if name is None else str(name) for name in header[1:]]
+    n_series = len(names)
+    # Series names can repeat, so the file uses positional field names and keeps the real ones in metadata
+    schema = pa.schema(
+        [("date", pa.timestamp("ns"))] + [(f"c{j}", pa.float64()) for j in range(n_series)],
+        metadata={b"columns": json.dumps(names).encode()},
+    )
+
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+
+    dates = []
+    values = np.full((chunk_rows, n_series), np.nan)
+    n_batches = 0
+
+    def write_chunk(writer):
+        nonlocal n_batches
+        n_rows = len(dates)
+        arrays = [pa.array(dates, type=pa.timestamp("ns"))]
+        arrays += [pa.array(values[:n_rows, j]) for j in range(n_series)]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        dates.clear()
+        values.fill(np.nan)
+        n_batches += 1
+
+    with pa.OSFile(str(tmp_path), "wb") as sink, ipc.new_file(sink, schema) as writer:
+        for row in rows:
+            # Blank rows (e.g. formatted but empty rows at the end of the sheet) carry no data
+            if not row or all(value is None for value in row):
+                continue
+            cells = row[1:n_series + 1]
+            values[len(dates), :len(cells)] = [_to_float(value) for value in cells]
+            dates.append(_parse_date(row[0]))
+            if len(dates) == chunk_rows:
+                write_chunk(writer)
+        if dates or n_batches == 0:
+            write_chunk(writer)
+
+    tmp_path.replace(cache_path)
+
+
+def cached_sheet_path(filepath, cache_dir=None, sheet_name="RI", skiprows=3):
+    """
+    Returns the typed cache of a worksheet, building it only if the workbook changed.
+
+    The cache is keyed on the workbook's content hash. A manifest records the size and
+    modification time seen for that hash, so an untouched workbook is not even re-hashed;
+    a workbook whose mtime changed but whose contents did not reuses the existing cache.
+
+    Parameters:
+    - filepath (str or Path): Excel workbook.
+    - cache_dir (str or Path, optional): Cache folder. Defaults to cache/excel next to the workbook.
+    - sheet_name (str): Worksheet to read.
+    - skiprows (int): Rows before the row with the series names.
+
+    Returns:
+    - Path: Feather file with the typed sheet.
+    """
+    filepath = Path(filepath)
+    cache_dir = Path(cache_dir) if cache_dir is not None else filepath.parent / "cache" / "excel"
+    manifest_path = cache_dir / f"{filepath.name}.{sheet_name}.{skiprows}.json"
+    stat = filepath.stat()
+
+    manifest = None
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        cache_path = cache_dir / manifest["cache_file"]
+        if manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns and cache_path.exists():
+            return cache_path
+
+    sha256 = content_hash(filepath)
+    cache_path = cache_dir / f"{filepath.stem}.{sheet_name}.{skiprows}.{sha256[:16]}.feather"
+    if not cache_path.exists():
+        write_sheet_cache(filepath, cache_path, sheet_name=sheet_name, skiprows=skiprows)
+        if manifest is not None and manifest["cache_file"] != cache_path.name:
+            (cache_dir / manifest["cache_file"]).unlink(missing_ok=True)
+
+    with open(manifest_path, "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256, "cache_file": cache_path.name}, f)
+    return cache_path
+
+
+def load_sheet(filepath, cache_dir=None, sheet_name="RI", skiprows=3):
+    """
+    Loads a Refinitiv worksheet as floats indexed by date, going through the typed cache.
+
+    Parameters:
+    - filepath (str or Path): Excel workbook.
+    - cache_dir (str or Path, optional): Cache folder, see cached_sheet_path.
+    - sheet_name (str): Worksheet to read.
+    - skiprows (int): Rows before the row with the series names.
+
+    Returns:
+    - pd.DataFrame: One float column per series with a 'date' index (NaT where the date cell is not a date).
+    """
+    require_pyarrow()
+    from pyarrow import feather
+
+    cache_path = cached_sheet_path(filepath, cache_dir=cache_dir, sheet_name=sheet_name, skiprows=skiprows)
+    table = feather.read_table(cache_path, memory_map=True)
+    names = json.loads(table.schema.metadata[b"columns"])
+
+    df = table.to_pandas()
+    df = df.set_index("date")
+    df.columns = pd.Index(names)
+    return df
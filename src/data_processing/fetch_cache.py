@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Defaults: keep at most 50 MB and 90 days of responses, revalidate after one day
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_AGE = 90 * 24 * 3600
+DEFAULT_TTL = 24 * 3600
+
+
+def request_key(url):
+    """
+    Host-independent cache key of a GET request: SHA-256 of the URL with sorted query parameters.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), safe="(),")
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class FetchCache:
+    """
+    Bounded on-disk cache of HTTP GET responses.
+
+    Response bodies are stored gzip-compressed under the SHA-256 of their content, so the
+    same payload is kept once; an index maps request keys (see request_key) to the body hash,
+    fetch time and validators (ETag / Last-Modified). Nothing depends on the host, the
+    working directory or pickled Python objects, so a cache directory can be shared.
+
+    Entries younger than ttl are served without a request. Older entries are revalidated
+    with a conditional GET; a 304 keeps the stored body. Entries not used for max_age are
+    evicted, and the least recently used entries go first once the bodies exceed max_bytes.
+
+    Attributes:
+    - cache_dir (Path): Folder with index.json and the objects/ bodies.
+    - max_bytes (int): Upper bound on the stored (compressed) body size.
+    - max_age (float): Seconds after which an unused entry is evicted.
+    - ttl (float): Seconds during which an entry is served without revalidation.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, ttl=DEFAULT_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index_path = self.cache_dir / "index.json"
+        self._objects_dir = self.cache_dir / "objects"
+
+    def _load_index(self):
+        if not self._index_path.exists():
+            return {}
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # A damaged index only costs a re-download
+            return {}
+
+    def _save_index(self, index):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path.with_name(f"index.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        tmp_path.replace(self._index_path)
+
+    def _object_path(self, content_hash):
+        return self._objects_dir / f"{content_hash}.json.gz"
+
+    def _read_body(self, entry):
+        with gzip.open(self._object_path(entry["content_sha256"]), "rb") as f:
+            return f.read()
+
+    def _store(self, index, key, url, response, now):
+        body = response.content
+        content_hash = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(content_hash)
+        if not object_path.exists():
+            self._objects_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = object_path.with_name(f"{content_hash}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(body)
+            tmp_path.replace(object_path)
+        index[key] = {
+            "url": url,
+            "content_sha256": content_hash,
+            "size": object_path.stat().st_size,
+            "fetched_at": now,
+            "last_used": now,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        return body
+
+    def fetch(self, session, url, timeout=None):
+        """
+        Returns the body of a GET request, from the cache when it is fresh or still valid.
+
+        Parameters:
+        - session (requests.Session): Session used for requests and revalidation.
+        - url (str): Request URL.
+        - timeout (float, optional): Request timeout in seconds.
+
+        Returns:
+        - bytes: Response body.
+
+        Raises:
+        - requests.exceptions.RequestException: If the request fails and nothing is cached.
+        """
+        key = request_key(url)
+        now = time.time()
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is not None and not self._object_path(entry["content_sha256"]).exists():
+                entry = None
+
+            if entry is not None and now - entry["fetched_at"] < self.ttl:
+                entry["last_used"] = now
+                self._save_index(index)
+                return self._read_body(entry)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except Exception:
+            if entry is None:
+                raise
+            # Serve the stale copy rather than failing when the server is unreachable
+            print(f"Revalidation failed, using cached response for {url}")
+            return self._read_body(entry)
+
+        with self._lock:
+            index = self._load_index()
+            if response.status_code != 304:
+                body = self._store(index, key, url, response, now)
+            elif key in index and self._object_path(index[key]["content_sha256"]).exists():
+                index[key]["fetched_at"] = now
+                index[key]["last_used"] = now
+                body = self._read_body(index[key])
+            else:
+                # The entry was evicted or cleared while revalidating; a 304 has no body to keep
+                body = None
+            if body is not None:
+                self._evict(index, now)
+                self._save_index(index)
+        if body is not None:
+            return body
+
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        with self._lock:
+            index = self._load_index()
+            body = self._store(index, key, url, response, now)
+            self._evict(index, now)
+            self._save_index(index)
+        return body
+
+    def _evict(self, index, now):
+        """
+        Drops expired entries, then least recently used ones until the bodies fit max_bytes.
+        """
+        for key in [key for key, entry in index.items() if now - entry["last_used"] > self.max_age]:
+            del index[key]
+
+        # Entries can share a body; count each stored object once
+        def total_size():
+            return sum({entry["content_sha256"]: entry["size"] for entry in index.values()}.values())
+
+        for key in sorted(index, key=lambda key: index[key]["last_used"]):
+            if total_size() <= self.max_bytes:
+                break
+            del index[key]
+
+        referenced = {entry["content_sha256"] for entry in index.values()}
+        if self._objects_dir.exists():
+            for object_path in self._objects_dir.glob("*.json.gz"):
+                if object_path.name[:-len(".json.gz")] not in referenced:
+                    object_path.unlink(missing_ok=True)
+
+    def clear(self):
+        """
+        Removes every entry and stored body.
+        """
+        with self._lock:
+            self._evict({}, time.time())
+            self._save_index({})
@@ -1,5 +1,9 @@
 import pandas as pd
 from pathlib import Path
+try:
+    from .excel_ingest import load_sheet
+except ImportError:  # run as a script from src/data_processing
+    from excel_ingest import load_sheet
 
 def load_data(filepath):
     """
@@ -32,15 +36,24 @@ def clean_data(df):
     
     return df
 
-def load_and_clean_index_data(filepath):
+def load_and_clean_index_data(filepath, use_cache=True, cache_dir=None):
     """
     Load and clean the data from the specified Excel file provided in the filepath.
+
+    With use_cache, the sheet is streamed row by row into a typed cache keyed on the
+    workbook's contents (see excel_ingest.load_sheet), so unchanged workbooks are not parsed
+    again. Prices are returned as floats, with non-numeric cells as NaN.
     """
     # Check if the file exists
     filepath = Path(filepath)
     if not filepath.exists():
         raise FileNotFoundError(f"Data file not found at {filepath}. Please ensure the file is in the correct location.")
 
+    if use_cache:
+        print("Loading data...")
+        df = load_sheet(filepath, cache_dir=cache_dir)
+        return df
+
     # Load and clean data
     df = load_data(filepath)
     df = clean_data(df)
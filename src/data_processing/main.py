@@ -2,53 +2,110 @@ from constituents_data_processing import load_and_clean_data
 from index_data_processing import load_and_clean_index_data
 from snb_data_processing import load_and_clean_snb_data
 from process_risk_free_yield import process_risk_free_yield
+from columnar_storage import save_frame
+from pipeline import Stage, run_pipeline
 from pathlib import Path
+import sys
+import pandas as pd
+
+# Processed data is stored as Feather for fast, typed loading; CSV copies are kept for export
+PROCESSED_SUFFIX = ".feather"
+EXPORT_CSV = True
+
+
+def save_processed(df, save_path, index=True):
+    """
+    Save processed data in PROCESSED_SUFFIX format and, if EXPORT_CSV is set, as CSV.
+    """
+    # Store prices as floats so the columnar files load without a conversion pass
+    object_columns = df.columns[df.dtypes == object]
+    if len(object_columns) > 0:
+        df = df.copy()
+        df[object_columns] = df[object_columns].apply(pd.to_numeric, errors='coerce')
+
+    saved = [save_path.with_suffix(PROCESSED_SUFFIX)]
+    save_frame(df, saved[0], index=index)
+    if EXPORT_CSV and PROCESSED_SUFFIX != ".csv":
+        saved.append(save_path.with_suffix(".csv"))
+        save_frame(df, saved[1], index=index)
+    return saved
+
+
+def build_constituents(raw_path, save_path):
+    """
+    Refinitiv data of constituents -> data/processed/constituents_data.
+    """
+    print("Processing Constituents data...")
+    cleaned_consituents_df = load_and_clean_data(raw_path)
+    for saved_path in save_processed(cleaned_consituents_df, save_path):
+        print(f"Constituents data saved at {saved_path}")
+
+def build_index(raw_path, save_path):
+    """
+    Refinitiv data of the SPI index -> data/processed/index_data.
+    """
+    print("Processing Index data...")
+    cleaned_index_df = load_and_clean_index_data(raw_path)
+    for saved_path in save_processed(cleaned_index_df, save_path):
+        print(f"Index data saved at {saved_path}")
+
+def build_snb(raw_path, save_path):
+    """
+    Raw SNB yields -> data/interim/snb_yield_data.csv.
+    """
+    print("Processing SNB yield data...")
+    cleaned_snb_df = load_and_clean_snb_data(raw_path)
+    cleaned_snb_df.to_csv(save_path, index=False)
+    print(f"SNB yield data saved at {save_path}")
+
+def build_risk_free(snb_path, save_path):
+    """
+    Cleaned SNB yields -> data/processed/risk_free.
+    """
+    print("Processing risk-free yield data...")
+    processed_risk_free = process_risk_free_yield(snb_path)
+    for saved_path in save_processed(processed_risk_free, save_path, index=False):
+        print(f"Risk-free yield data saved at {saved_path}")
+
+def processed_outputs(save_path):
+    """
+    Files written by save_processed for save_path.
+    """
+    outputs = [save_path.with_suffix(PROCESSED_SUFFIX)]
+    if EXPORT_CSV and PROCESSED_SUFFIX != ".csv":
+        outputs.append(save_path.with_suffix(".csv"))
+    return outputs
+
+def build_stages(base_path):
+    """
+    Stage graph of the data processing pipeline. Constituents, index and SNB cleaning are
+    independent; the risk-free series depends on the cleaned SNB data.
+    """
+    raw_path = base_path / "data" / "raw"
+    interim_path = base_path / "data" / "interim"
+    processed_path = base_path / "data" / "processed"
+
+    save_path_consituents = processed_path / "constituents_data.csv"
+    save_path_index = processed_path / "index_data.csv"
+    save_path_snb = interim_path / "snb_yield_data.csv"
+    save_path_risk_free = processed_path / "risk_free.csv"
+
+    return [
+        Stage("constituents", build_constituents, [raw_path / "SPI_Constituents_Data.xlsx"],
+              processed_outputs(save_path_consituents), args=(raw_path / "SPI_Constituents_Data.xlsx", save_path_consituents)),
+        Stage("index", build_index, [raw_path / "SPI_Index_Data.xlsx"],
+              processed_outputs(save_path_index), args=(raw_path / "SPI_Index_Data.xlsx", save_path_index)),
+        Stage("snb", build_snb, [raw_path / "snb_yield_data.csv"], [save_path_snb]),
+        Stage("risk_free", build_risk_free, [save_path_snb],
+              processed_outputs(save_path_risk_free), args=(save_path_snb, save_path_risk_free)),
+    ]
 
 if __name__ == "__main__":
-    try:
-        # Define the base path for file locations
-        base_path = Path(__file__).resolve().parents[2]
-
-        # Refinitiv Data of Constituents Processing
-        print("Processing Constituents data...")
-        constituents_file_path = base_path / "data" / "raw" / "SPI_Constituents_Data.xlsx"
-        cleaned_consituents_df = load_and_clean_data(constituents_file_path)
-
-        # Save Data of Constituents
-        save_path_consituents = base_path / "data" / "processed" / "constituents_data.csv"
-        cleaned_consituents_df.to_csv(save_path_consituents)
-        print(f"Constituents data saved at {save_path_consituents}")
-
-       # Data of Index Processing
-        print("Processing Index data...")
-        index_file_path = base_path / "data" / "raw" / "SPI_Index_Data.xlsx"
-        cleaned_index_df = load_and_clean_index_data(index_file_path)
-
-        # Save Data of Index 
-        save_path_index = base_path / "data" / "processed" / "index_data.csv"
-        cleaned_index_df.to_csv(save_path_index)
-        print(f"Index data saved at {save_path_index}")
-
-        # SNB Yield Data Processing
-        print("\nProcessing SNB yield data...")
-        snb_file_path = base_path / "data" / "raw" / "snb_yield_data.csv"
-        cleaned_snb_df = load_and_clean_snb_data(snb_file_path)
-
-        # Save SNB data 
-        save_path_snb = base_path / "data" / "interim" / "snb_yield_data.csv"
-        cleaned_snb_df.to_csv(save_path_snb, index=False)
-        print(f"SNB yield data saved at {save_path_snb}")
-
-        # Risk-Free Yield Processing
-        print("\nProcessing risk-free yield data...")
-        processed_risk_free = process_risk_free_yield(save_path_snb)  
-
-        # Save Risk-Free Data to processed folder
-        save_path_risk_free = base_path / "data" / "processed" / "risk_free.csv"
-        processed_risk_free.to_csv(save_path_risk_free, index=False)
-        print(f"Risk-free yield data saved at {save_path_risk_free}")
-
-    except FileNotFoundError as e:
-        print(e)
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    # Define the base path for file locations
+    base_path = Path(__file__).resolve().parents[2]
+
+    # Only stages whose inputs changed since the last run are rerun; pass --force to rebuild all
+    state_path = base_path / "data" / "interim" / "pipeline_state.json"
+    status = run_pipeline(build_stages(base_path), state_path, force="--force" in sys.argv[1:])
+    for name, outcome in status.items():
+        print(f"{name}: {outcome}")
@@ -0,0 +1,215 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+try:
+    from .excel_ingest import content_hash
+except ImportError:  # run as a script from src/data_processing
+    from excel_ingest import content_hash
+
+# Stage outcomes reported by run_pipeline
+RAN, UP_TO_DATE, FAILED, SKIPPED = "ran", "up to date", "failed", "skipped"
+
+
+class Stage:
+    """
+    One step of the data processing pipeline.
+
+    Attributes:
+    - name (str): Unique stage name.
+    - func (callable): Module-level function called as func(*args); it must write every file
+      in outputs. Module-level so that it can run in a worker process.
+    - inputs (list of Path): Files the stage reads.
+    - outputs (list of Path): Files the stage writes.
+    - args (tuple, optional): Positional arguments for func. Defaults to (*inputs, outputs[0]).
+    - version (str): Bump to force a rerun after changing the stage's code.
+    """
+
+    def __init__(self, name, func, inputs, outputs, args=None, version="1"):
+        self.name = name
+        self.func = func
+        self.inputs = [Path(path) for path in inputs]
+        self.outputs = [Path(path) for path in outputs]
+        self.args = tuple(args) if args is not None else (*self.inputs, self.outputs[0])
+        self.version = version
+
+
+def stage_dependencies(stages):
+    """
+    Maps each stage name to the names of the stages that write one of its inputs.
+    """
+    producers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            if path in producers:
+                raise ValueError(f"{path} is written by both {producers[path]} and {stage.name}.")
+            producers[path] = stage.name
+
+    dependencies = {stage.name: {producers[path] for path in stage.inputs if path in producers} for stage in stages}
+
+    # Reject cycles, which would leave stages waiting forever
+    done = set()
+    pending = dict(dependencies)
+    while pending:
+        ready = [name for name, deps in pending.items() if deps <= done]
+        if not ready:
+            raise ValueError(f"Stage graph has a cycle among {sorted(pending)}.")
+        for name in ready:
+            done.add(name)
+            del pending[name]
+    return dependencies
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Size, modification time and content hash of a file.
+
+    If the size and mtime match the previous fingerprint, its hash is reused instead of
+    reading the file again.
+    """
+    stat = Path(path).stat()
+    if previous is not None and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+        sha256 = previous["sha256"]
+    else:
+        sha256 = content_hash(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+
+def load_state(state_path):
+    """
+    Reads the recorded stage fingerprints, or returns an empty state.
+    """
+    state_path = Path(state_path)
+    if not state_path.exists():
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_state(state, state_path):
+    state_path = Path(state_path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp_path.replace(state_path)
+
+
+def stage_fingerprint(stage, previous=None):
+    """
+    Fingerprints of a stage's inputs and version; raises FileNotFoundError for a missing input.
+    """
+    previous_inputs = (previous or {}).get("inputs", {})
+    inputs = {}
+    for path in stage.inputs:
+        if not path.exists():
+            raise FileNotFoundError(f"Input {path} of stage '{stage.name}' not found.")
+        inputs[str(path)] = file_fingerprint(path, previous_inputs.get(str(path)))
+    return {"version": stage.version, "inputs": inputs}
+
+
+def is_stale(stage, fingerprint, previous):
+    """
+    A stage is stale if it never ran, its version or input contents changed, or an output is missing.
+    """
+    if previous is None or previous.get("version") != fingerprint["version"]:
+        return True
+    previous_inputs = previous.get("inputs", {})
+    if set(previous_inputs) != set(fingerprint["inputs"]):
+        return True
+    for path, current in fingerprint["inputs"].items():
+        if previous_inputs[path]["sha256"] != current["sha256"]:
+            return True
+    return not all(path.exists() for path in stage.outputs)
+
+
+def _run_stage(func, args):
+    func(*args)
+
+
+def run_pipeline(stages, state_path, force=False, n_jobs=None):
+    """
+    Runs the stale stages of a pipeline, executing independent stages concurrently.
+
+    A stage is considered once all stages producing its inputs have finished. It reruns only
+    if is_stale says so (or force is set), so a stage whose upstream rewrote identical
+    content is skipped as well. Fingerprints of successful stages are saved to state_path.
+
+    Parameters:
+    - stages (list of Stage): Pipeline stages.
+    - state_path (str or Path): JSON file with the recorded fingerprints.
+    - force (bool): Rerun every stage.
+    - n_jobs (int): Number of worker processes. None uses up to one per stage, 1 runs in-process.
+
+    Returns:
+    - dict: Stage name -> one of "ran", "up to date", "failed" or "skipped" (upstream failed).
+    """
+    dependencies = stage_dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    state = load_state(state_path)
+    status = {}
+    errors = {}
+
+    if n_jobs is None:
+        n_jobs = min(len(stages), os.cpu_count() or 1)
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+    running = {}
+    try:
+        while len(status) < len(stages):
+            # Start every stage whose upstream stages have all finished
+            for name, deps in dependencies.items():
+                if name in status or name in running.values() or not deps <= set(status):
+                    continue
+                stage = by_name[name]
+                if any(status[dep] in (FAILED, SKIPPED) for dep in deps):
+                    status[name] = SKIPPED
+                    continue
+                try:
+                    fingerprint = stage_fingerprint(stage, state.get(name))
+                except FileNotFoundError as e:
+                    status[name] = FAILED
+                    errors[name] = e
+                    continue
+                if not force and not is_stale(stage, fingerprint, state.get(name)):
+                    status[name] = UP_TO_DATE
+                    continue
+
+                print(f"Running stage '{name}'...")
+                if executor is None:
+                    try:
+                        _run_stage(stage.func, stage.args)
+                    except Exception as e:
+                        status[name] = FAILED
+                        errors[name] = e
+                    else:
+                        status[name] = RAN
+                        state[name] = fingerprint
+                        save_state(state, state_path)
+                else:
+                    future = executor.submit(_run_stage, stage.func, stage.args)
+                    future.fingerprint = fingerprint
+                    running[future] = name
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    status[name] = FAILED
+                    errors[name] = error
+                else:
+                    status[name] = RAN
+                    state[name] = future.fingerprint
+                    save_state(state, state_path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for name, error in errors.items():
+        print(f"Stage '{name}' failed: {error}")
+    return status
@@ -2,7 +2,6 @@
 
 # Import libraries
 import pandas as pd
-import numpy as np
 import seaborn as sns
 from pathlib import Path
 import sys
@@ -24,6 +23,11 @@ from src.analysis.summarize_performance import summarize_performance, save_summa
 from src.analysis.momentum_strategy_backtest import momentum_strategy
 from src.visualization.create_summary_table import create_summary_table
 from src.analysis.load_data import load_data
+from src.analysis.market_data import MarketData
+from src.analysis.sparse_weights import write_sparse_weights
+from src.analysis.walk_forward import walk_forward
+from src.analysis.instrumentation import PROFILER, stage
+from src.data_processing.columnar_storage import find_data_file, save_frame
 from src.analysis.robustness_checks import (
     run_holding_period_check,
     run_lookback_period_check,
@@ -35,19 +39,27 @@ def main():
     venv_path = os.getenv('VIRTUAL_ENV')
     print(f"Virtual Environment Path: {venv_path}")
     warnings.simplefilter(action='ignore', category=FutureWarning)
+    PROFILER.enable()
     
     # Define the base path for file locations
     base_path = Path(__file__).resolve().parents[1]
     print(f"Base Path: {base_path}")
     
     # Construct file paths dynamically
-    constituents_data_path = base_path / "data" / "processed" / "constituents_data.csv"
-    rf_monthly_path = base_path / "data" / "processed" / "risk_free.csv"
+    # Processed data is read from the newest of its Feather/Parquet/CSV copies
+    processed_path = base_path / "data" / "processed"
+    constituents_data_path = find_data_file(processed_path, "constituents_data")
+    rf_monthly_path = find_data_file(processed_path, "risk_free")
     results_path = base_path / "data" / "results"
-    spi_path = base_path / "data" / "processed" / "index_data.csv"
+    spi_path = find_data_file(processed_path, "index_data")
+    # Format of the result tables: ".csv", ".feather" or ".parquet"
+    results_format = ".csv"
     summary_file_path_longOnly = results_path / "summary_performance_longOnly.tex"
     summary_file_path_longShort = results_path / "summary_performance_longShort.tex"
     summary_file_path_bm = results_path / "summary_performance_benchmark.tex"
+    summary_file_path_walkForward = results_path / "summary_performance_walkForward.tex"
+    # Timing report of the run, written as timing_report.json and timing_report.csv
+    timing_report_path = results_path / "timing_report"
     visualization_path = base_path / "reports" / "figures"
     
     # Debug: Print the constructed file paths
@@ -59,7 +71,8 @@ def main():
     results_path.mkdir(parents=True, exist_ok=True)
     
     # Load risk-free monthly returns
-    rf_monthly = load_data(rf_monthly_path)
+    with stage("Load data"):
+        rf_monthly = load_data(rf_monthly_path)
     
     # Strategy parameters
     lookback_period = 6  # Number of months to look back
@@ -67,78 +80,84 @@ def main():
     nShort = 20          # Number of assets to short
     holding_period = 6   # Rebalance every month
     
-    price_data_daily = load_data(constituents_data_path)
+    with stage("Load data"):
+        # A CSV constituents file is parsed once and then read from its binary sidecar cache
+        price_data_daily = load_data(constituents_data_path, cache=True)
+        
+        # Read SPI index data
+        spi_price_daily = load_data(spi_path)
     
-    # Read SPI index data
-    spi_price_daily = load_data(spi_path)
-    
-    # Resample data to monthly frequency and calculate returns
-    spi_price_monthly = spi_price_daily.resample('ME').last()
-    
-    # Calculate Returns
-    spi_returns_monthly = spi_price_monthly.pct_change()
-    if isinstance(spi_returns_monthly, pd.Series):
-        spi_returns_monthly = spi_returns_monthly.to_frame()
-     
-    # Avoid massive outliers
-    spi_returns_monthly = np.clip(spi_returns_monthly, -0.5, 0.5)
-    spi_XsReturns_monthly = spi_returns_monthly['SWISS PERFORMANCE INDEX - TOT RETURN IND'] - rf_monthly['monthly_return']
-    if isinstance(spi_XsReturns_monthly, pd.Series):
-        spi_XsReturns_monthly = spi_XsReturns_monthly.to_frame()
-    
-    # Rename Columns for consistency
-    spi_XsReturns_monthly.columns = ['Benchmark']
-    spi_returns_monthly.columns = ['Benchmark']
+    # Resample, compute returns and align constituents, risk-free and SPI once for the whole run
+    with stage("Prepare market data"):
+        market_data = MarketData.from_daily(
+            price_data_daily,
+            rf_monthly,
+            benchmark_price_daily=spi_price_daily,
+            benchmark_column='SWISS PERFORMANCE INDEX - TOT RETURN IND'
+        )
+    spi_returns_monthly = market_data.benchmark_returns_monthly
+    spi_XsReturns_monthly = market_data.benchmark_xs_returns_monthly
     
     # ----- Run Backtest LONGONLY -----
-    excess_returns_longOnly, portfolio_weights_longOnly, turnover_series_longOnly, portfolio_returns_longOnly = momentum_strategy(
-        price_data_daily=price_data_daily,
-        lookback_period=lookback_period,
-        nLong=nLong,
-        nShort=0,
-        holding_period=holding_period,
-        rf_monthly=rf_monthly,
-        trx_cost=0
-    )
+    with stage("Backtest long-only"):
+        excess_returns_longOnly, portfolio_weights_longOnly, turnover_series_longOnly, portfolio_returns_longOnly = momentum_strategy(
+            price_data_daily=market_data,
+            lookback_period=lookback_period,
+            nLong=nLong,
+            nShort=0,
+            holding_period=holding_period,
+            rf_monthly=rf_monthly,
+            trx_cost=0,
+            sparse_weights=True
+        )
     
     excess_returns_longOnly.columns = ['Xs Returns LongOnly']
     portfolio_returns_longOnly.columns = ['Returns LongOnly']
     
     # Save results
-    excess_returns_longOnly.to_csv(results_path / "excess_returns_longOnly.csv", index=True, header=True)
-    portfolio_weights_longOnly.to_csv(results_path / "portfolio_weights_longOnly.csv", index=True, header=True)
-    turnover_series_longOnly.to_csv(results_path / "turnover_series_longOnly.csv", index=True, header=True)
-    stats_longOnly = summarize_performance(excess_returns_longOnly, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=False)
-    save_summary_to_latex(stats_longOnly, summary_file_path_longOnly)
+    with stage("Save results"):
+        save_frame(excess_returns_longOnly, results_path / f"excess_returns_longOnly{results_format}")
+        write_sparse_weights(portfolio_weights_longOnly, results_path / f"portfolio_weights_longOnly{results_format}")
+        save_frame(turnover_series_longOnly, results_path / f"turnover_series_longOnly{results_format}")
+    with stage("Performance statistics"):
+        stats_longOnly = summarize_performance(excess_returns_longOnly, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=False, market_data=market_data)
+    with stage("LaTeX export"):
+        save_summary_to_latex(stats_longOnly, summary_file_path_longOnly)
     
     # ----- Run Backtest LONG / SHORT -----
-    excess_returns_longShort, portfolio_weights_longShort, turnover_series_longShort, portfolio_returns_longShort = momentum_strategy(
-        price_data_daily=price_data_daily,
-        lookback_period=lookback_period,
-        nLong=nLong,
-        nShort=nShort,
-        holding_period=holding_period,
-        rf_monthly=rf_monthly,
-        trx_cost=0
-    )
+    with stage("Backtest long/short"):
+        excess_returns_longShort, portfolio_weights_longShort, turnover_series_longShort, portfolio_returns_longShort = momentum_strategy(
+            price_data_daily=market_data,
+            lookback_period=lookback_period,
+            nLong=nLong,
+            nShort=nShort,
+            holding_period=holding_period,
+            rf_monthly=rf_monthly,
+            trx_cost=0,
+            sparse_weights=True
+        )
     excess_returns_longShort.columns = ['Xs Returns LongShort']
     portfolio_returns_longShort.columns = ['Returns LongShort']
     
     # Save results
-    excess_returns_longShort.to_csv(results_path / "excess_returns_longShort.csv", index=True, header=True)
-    portfolio_weights_longShort.to_csv(results_path / "portfolio_weights_longShort.csv", index=True, header=True)
-    turnover_series_longShort.to_csv(results_path / "turnover_series_longShort.csv", index=True, header=True)
-    stats_longShort = summarize_performance(excess_returns_longShort, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=False)
-    save_summary_to_latex(stats_longShort, summary_file_path_longShort)
+    with stage("Save results"):
+        save_frame(excess_returns_longShort, results_path / f"excess_returns_longShort{results_format}")
+        write_sparse_weights(portfolio_weights_longShort, results_path / f"portfolio_weights_longShort{results_format}")
+        save_frame(turnover_series_longShort, results_path / f"turnover_series_longShort{results_format}")
+    with stage("Performance statistics"):
+        stats_longShort = summarize_performance(excess_returns_longShort, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=False, market_data=market_data)
+    with stage("LaTeX export"):
+        save_summary_to_latex(stats_longShort, summary_file_path_longShort)
     
     # -----
     
     ### Put together and print stats
     # stats for benchmark itself
-    stats_bm = summarize_performance(spi_XsReturns_monthly, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=True)
+    with stage("Performance statistics"):
+        stats_bm = summarize_performance(spi_XsReturns_monthly, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=True, market_data=market_data)
 
-    # Create Summary Table
-    summaryTable = create_summary_table([stats_longOnly, stats_longShort, stats_bm], ['Long Only', 'Long Short', "Benchmark"])
+        # Create Summary Table
+        summaryTable = create_summary_table([stats_longOnly, stats_longShort, stats_bm], ['Long Only', 'Long Short', "Benchmark"])
     print(summaryTable)
     
     # Custom labels
@@ -153,8 +172,9 @@ def main():
     }
     
     # Create plot and save it
-    combined_returns = pd.concat([portfolio_returns_longOnly, portfolio_returns_longShort], axis=1)
-    plot_cumulative_returns(combined_returns, spi_returns_monthly, labels, filename=visualization_path / "cumulative_returns")
+    with stage("Plotting"):
+        combined_returns = pd.concat([portfolio_returns_longOnly, portfolio_returns_longShort], axis=1)
+        plot_cumulative_returns(combined_returns, spi_returns_monthly, labels, filename=visualization_path / "cumulative_returns")
     
     print("Performance summary saved successfully!")
     
@@ -164,52 +184,83 @@ def main():
     nLong_range = range(5, 51)
     
     # Run Holding Period Robustness Check
-    run_holding_period_check(
-        price_data_daily=price_data_daily,
-        lookback_period=lookback_period,
-        nLong=nLong,
-        rf_monthly=rf_monthly,
-        spi_XsReturns_monthly=spi_XsReturns_monthly,
-        visualization_path=visualization_path
-    )
+    with stage("Robustness check: holding period"):
+        run_holding_period_check(
+            price_data_daily=market_data,
+            lookback_period=lookback_period,
+            nLong=nLong,
+            rf_monthly=rf_monthly,
+            spi_XsReturns_monthly=spi_XsReturns_monthly,
+            visualization_path=visualization_path
+        )
     
     # Run Lookback Period Robustness Check
-    run_lookback_period_check(
-        price_data_daily=price_data_daily,
-        lookback_period_range=lookback_period_range,
-        nLong=nLong,
-        nShort=0,
-        holding_period=holding_period,
-        rf_monthly=rf_monthly,
-        spi_XsReturns_monthly=spi_XsReturns_monthly,
-        visualization_path=visualization_path
-    )
+    with stage("Robustness check: lookback period"):
+        run_lookback_period_check(
+            price_data_daily=market_data,
+            lookback_period_range=lookback_period_range,
+            nLong=nLong,
+            nShort=0,
+            holding_period=holding_period,
+            rf_monthly=rf_monthly,
+            spi_XsReturns_monthly=spi_XsReturns_monthly,
+            visualization_path=visualization_path
+        )
     
     # Run Number of Assets Robustness Check
-    run_number_assets_check(
-        price_data_daily=price_data_daily,
-        lookback_period=lookback_period,
-        nLong_range=nLong_range,
-        nShort=0,
-        holding_period=holding_period,
-        rf_monthly=rf_monthly,
-        spi_XsReturns_monthly=spi_XsReturns_monthly,
-        visualization_path=visualization_path
-    )
+    with stage("Robustness check: number of assets"):
+        run_number_assets_check(
+            price_data_daily=market_data,
+            lookback_period=lookback_period,
+            nLong_range=nLong_range,
+            nShort=0,
+            holding_period=holding_period,
+            rf_monthly=rf_monthly,
+            spi_XsReturns_monthly=spi_XsReturns_monthly,
+            visualization_path=visualization_path
+        )
     
     # Run Transaction Cost Robustness Check
-    run_trx_cost_check(
-        price_data_daily=price_data_daily,
-        lookback_period=lookback_period,
-        nLong=nLong,
-        nShort=0,
-        holding_period=holding_period,
-        rf_monthly=rf_monthly,
-        spi_returns_monthly=spi_returns_monthly,
-        visualization_path=visualization_path
-    )
+    with stage("Robustness check: transaction costs"):
+        run_trx_cost_check(
+            price_data_daily=market_data,
+            lookback_period=lookback_period,
+            nLong=nLong,
+            nShort=0,
+            holding_period=holding_period,
+            rf_monthly=rf_monthly,
+            spi_returns_monthly=spi_returns_monthly,
+            visualization_path=visualization_path
+        )
     
     print("All robustness checks completed successfully!")
+    
+    # ----- Walk-Forward Parameter Selection -----
+    # Re-pick the long-only parameters every year from the trailing five years and trade them out-of-sample
+    with stage("Walk-forward selection"):
+        excess_returns_walkForward, selections_walkForward = walk_forward(
+            price_data_daily=market_data,
+            param_grid={'lookback_period': range(1, 13), 'holding_period': range(1, 13), 'nLong': [10, 20, 30, 40]},
+            rf_monthly=rf_monthly,
+            window=60,
+            step=12,
+            nShort=0,
+            trx_cost=0
+        )
+    with stage("Save results"):
+        save_frame(excess_returns_walkForward, results_path / f"excess_returns_walkForward{results_format}")
+        save_frame(selections_walkForward, results_path / f"selections_walkForward{results_format}")
+    with stage("Performance statistics"):
+        stats_walkForward = summarize_performance(excess_returns_walkForward, rf_monthly, spi_XsReturns_monthly, 12, isBenchmark=False, market_data=market_data)
+    with stage("LaTeX export"):
+        save_summary_to_latex(stats_walkForward, summary_file_path_walkForward)
+    
+    print("Walk-forward selection completed successfully!")
+    
+    # Per-stage wall time, CPU time, peak memory and call counts of this run
+    timing_report = PROFILER.save_report(timing_report_path)
+    print(timing_report.round(3).to_string(index=False))
+    print(f"Timing report saved to {timing_report_path.with_suffix('.json')}")
 
 if __name__ == '__main__':
     main()
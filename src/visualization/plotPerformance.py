@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+from src.analysis.market_data import MarketData
 
 def plot_cumulative_returns(df, benchmark=None, labels=None, title='Cumulative Returns Over Time', x_label='Date', y_label='Cumulative Returns', figsize=(12,6), grid=True, savefig=True, filename='cumulative_returns.png'):
     """
@@ -9,7 +10,7 @@ def plot_cumulative_returns(df, benchmark=None, labels=None, title='Cumulative R
 
     Parameters:
         df (pd.DataFrame or pd.Series): DataFrame or Series with dates as index and assets as columns (for DataFrame).
-        benchmark (pd.DataFrame or pd.Series): Benchmark returns series or DataFrame with the same index as df.
+        benchmark (pd.DataFrame, pd.Series or MarketData): Benchmark returns series or DataFrame with the same index as df.
         labels (dict): A dictionary mapping the columns or series names to custom labels for the legend.
         title (str): Title of the plot.
         x_label (str): Label for x-axis.
@@ -26,6 +27,9 @@ def plot_cumulative_returns(df, benchmark=None, labels=None, title='Cumulative R
         else:
             df = df.to_frame()
 
+    if isinstance(benchmark, MarketData):
+        benchmark = benchmark.benchmark_returns_monthly
+
     # Set plot style
     sns.set(style='whitegrid', context='talk')
     
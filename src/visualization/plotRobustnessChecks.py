@@ -3,7 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def plotRobustnessChecks(df, label='Series', title='Robustness Check', x_label='Variable', y_label='Value', figsize=(12,6), grid=True, savefig=False, filename='robustness_check.png', linewidth=3):
+def plotRobustnessChecks(df, label='Series', title='Robustness Check', x_label='Variable', y_label='Value', figsize=(12,6), grid=True, savefig=False, filename='robustness_check.png', linewidth=3, bands=None):
     """
     Plots robustness checks over a variable (e.g., holding period) for each asset or strategy.
 
@@ -17,6 +17,8 @@ def plotRobustnessChecks(df, label='Series', title='Robustness Check', x_label='
         grid (bool): Whether to show grid lines.
         savefig (bool): Whether to save the figure.
         filename (str): Filename to save the figure.
+        bands (pd.DataFrame, optional): Lower and upper bounds (first and second column) indexed like df,
+            e.g. bootstrap confidence intervals, shaded around the line of a single series.
     """
     # If df is a Series, convert it to a DataFrame
     if isinstance(df, pd.Series):
@@ -38,6 +40,9 @@ def plotRobustnessChecks(df, label='Series', title='Robustness Check', x_label='
     plt.figure(figsize=figsize)
     for i, column in enumerate(df.columns):
         plt.plot(df.index, df[column], label=label if len(df.columns) == 1 else column, color=palette[i], linewidth=linewidth)
+    if bands is not None and len(df.columns) == 1:
+        bands = bands.reindex(df.index)
+        plt.fill_between(df.index, bands.iloc[:, 0], bands.iloc[:, 1], color=palette[0], alpha=0.2, label='95% Confidence Interval')
     
     plt.title(title)
     plt.xlabel(x_label)
@@ -0,0 +1,211 @@
+# tests/test_data_fetcher_snb.py
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import requests
+
+from src.data_processing.data_fetcher_snb import fetch_cubes, update_store
+
+SELECTIONS = [
+    {"name": "confed_1y", "cube": "rendoblid", "dim_sel": "D0(1J,E)"},
+    {"name": "confed_2y", "cube": "rendoblid", "dim_sel": "D0(2J,E)"},
+    {"name": "saron", "cube": "zimoma", "dim_sel": "D0(SARON)"},
+]
+
+
+class StubSNBServer:
+    """
+    Local stand-in for the SNB data portal, serving monthly observations on 127.0.0.1.
+
+    Like the portal, a request for fromDate returns every month from the month of fromDate
+    on, so the boundary month is sent again.
+
+    Attributes:
+    - observations (dict): (cube, dim_sel) -> list of (YYYY-MM, value); other selections get a 404.
+    - failures (dict): (cube, dim_sel) -> HTTP statuses answered, one per request, before the data.
+    - delay (float): Seconds every response is held back.
+    - requests (list): Query parameters (cube, dimSel, fromDate, toDate) of every request received.
+    - max_in_flight (int): Largest number of requests handled at the same time.
+    """
+
+    def __init__(self):
+        self.observations = {}
+        self.failures = defaultdict(list)
+        self.delay = 0.0
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}/api/cube"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, handler):
+        parts = urlsplit(handler.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        cube = parts.path.split("/")[3]
+        key = (cube, query.get("dimSel"))
+        with self._lock:
+            self.requests.append({"cube": cube, **query})
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            status = self.failures[key].pop(0) if self.failures[key] else None
+        try:
+            time.sleep(self.delay)
+            if status is None and key not in self.observations:
+                status = 404
+            if status is not None:
+                handler.send_response(status)
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            from_month = query["fromDate"][:7]
+            to_month = query.get("toDate", "9999-12")[:7]
+            values = [
+                {"date": date, "value": value}
+                for date, value in self.observations[key]
+                if from_month <= date <= to_month
+            ]
+            body = json.dumps({"timeseries": [{"values": values}]}).encode()
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+def monthly_observations(first_month, values):
+    """
+    (YYYY-MM, value) pairs for consecutive months from first_month on.
+    """
+    months = pd.period_range(first_month, periods=len(values), freq="M").astype(str)
+    return list(zip(months, values))
+
+
+class FetchCubesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSNBServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        for i, selection in enumerate(SELECTIONS):
+            self.server.observations[(selection["cube"], selection["dim_sel"])] = monthly_observations(
+                "2024-01", [i + 0.1, i + 0.2, i + 0.3]
+            )
+
+    def fetch(self, **kwargs):
+        kwargs.setdefault("backoff_factor", 0)
+        return fetch_cubes(SELECTIONS, from_date="2024-01-01", base_url=self.server.base_url, **kwargs)
+
+    def test_combines_selections_by_date(self):
+        rates = self.fetch()
+        self.assertEqual(list(rates.columns), ["confed_1y", "confed_2y", "saron"])
+        self.assertEqual(len(rates), 3)
+        self.assertAlmostEqual(rates.loc["2024-03-01", "saron"], 2.3)
+
+    def test_requests_run_concurrently_up_to_max_workers(self):
+        self.server.delay = 0.2
+        self.fetch(max_workers=2)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_transient_status_is_retried(self):
+        self.server.failures[("zimoma", "D0(SARON)")] = [503, 502]
+        rates = self.fetch(retries=3)
+        self.assertAlmostEqual(rates.loc["2024-01-01", "saron"], 2.1)
+        saron_requests = [r for r in self.server.requests if r["cube"] == "zimoma"]
+        self.assertEqual(len(saron_requests), 3)
+
+    def test_exhausted_retries_raise(self):
+        self.server.failures[("zimoma", "D0(SARON)")] = [503] * 5
+        with self.assertRaises(requests.exceptions.RetryError):
+            self.fetch(retries=2)
+        saron_requests = [r for r in self.server.requests if r["cube"] == "zimoma"]
+        self.assertEqual(len(saron_requests), 3)
+
+    def test_timeout_raises_after_retries(self):
+        self.server.delay = 1.0
+        started = time.perf_counter()
+        with self.assertRaises(requests.exceptions.RequestException):
+            fetch_cubes(SELECTIONS[:1], base_url=self.server.base_url, timeout=0.1, retries=1, backoff_factor=0)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_missing_selection_fails_without_retry(self):
+        with self.assertRaises(requests.exceptions.HTTPError):
+            fetch_cubes([{"cube": "unknown", "dim_sel": "D0(X)"}], base_url=self.server.base_url, backoff_factor=0)
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class UpdateStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubSNBServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.key = ("rendoblid", "D0(1J,E)")
+        self.server.observations[self.key] = monthly_observations("2024-01", [0.1, 0.2, 0.3, 0.4, 0.5])
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.store_path = Path(tmp_dir.name) / "snb_yield_data.csv"
+
+    def update(self):
+        return update_store(self.store_path, start_date="2024-01-01", base_url=self.server.base_url, cache=None)
+
+    def test_initial_fill_fetches_from_start_date(self):
+        store = self.update()
+        self.assertEqual(self.server.requests[-1]["fromDate"], "2024-01-01")
+        self.assertEqual(list(store["date"]), ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05"])
+        self.assertEqual(self.store_path.read_text().splitlines()[0], "date,value")
+
+    def test_only_new_months_are_appended(self):
+        self.store_path.write_text("date,value\n2024-01,0.1\n2024-02,0.2\n2024-03,0.3\n")
+        before = self.store_path.read_bytes()
+        store = self.update()
+        # The request starts after the last stored month; the resent boundary month is dropped
+        self.assertEqual(self.server.requests[-1]["fromDate"], "2024-03-02")
+        self.assertEqual(list(store["date"]), ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05"])
+        self.assertTrue(self.store_path.read_bytes().startswith(before))
+
+    def test_store_without_trailing_newline(self):
+        self.store_path.write_text("date,value\n2024-01,0.1\n2024-02,0.2")
+        store = self.update()
+        self.assertEqual(list(store["date"]), ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05"])
+        self.assertEqual(list(store["value"]), [0.1, 0.2, 0.3, 0.4, 0.5])
+
+    def test_up_to_date_store_is_left_unchanged(self):
+        self.update()
+        before = self.store_path.read_bytes()
+        store = self.update()
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.store_path.read_bytes(), before)
+        self.assertEqual(len(store), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()